@@ -3,7 +3,14 @@
 import pytest
 
 from weasyprint import CSS, default_url_fetcher
-from weasyprint.css import find_stylesheets, get_all_computed_styles
+from weasyprint.css import (
+    AnonymousStyle,
+    Style,
+    find_stylesheets,
+    get_all_computed_styles,
+)
+from weasyprint.css.targets import TargetCollector
+from weasyprint.stats import Statistics
 from weasyprint.urls import path2url
 
 from ..testing_utils import (  # isort:skip
@@ -36,6 +43,88 @@ def test_find_stylesheets():
     # TODO: Test that the values are correct too.
 
 
+@assert_no_logs
+def test_find_stylesheets_imports_cache():
+    for i in range(2):
+        html = FakeHTML(resource_path('doc1.html'))
+        with Statistics().collect() as statistics:
+            sheets = list(find_stylesheets(
+                html.wrapper_element, 'print', default_url_fetcher,
+                html.base_url, font_config=None, counter_style=None,
+                page_rules=None))
+        rules = [
+            rule for sheet in sheets
+            for sheet_rules in sheet.matcher.lower_local_name_selectors.values()
+            for rule in sheet_rules]
+        assert len(rules) == 9
+        # Imported stylesheets are preprocessed once, then found in the cache.
+        if i:
+            assert statistics.counters['import_cache_hits'] == 2
+
+
+@assert_no_logs
+def test_imports_cache_nested():
+    sources = {
+        'a.css': '@import "b.css"; a { color: red }',
+        'b.css': 'b { color: red }',
+    }
+
+    def url_fetcher(url):
+        return {'string': sources[url.rsplit('/', 1)[-1]]}
+
+    def restricted_url_fetcher(url):
+        if url.endswith('b.css'):
+            raise ValueError('forbidden')
+        return url_fetcher(url)
+
+    def local_names(url_fetcher):
+        sheet = CSS(
+            string='@import "https://example.com/a.css"', url_fetcher=url_fetcher)
+        return sorted(sheet.matcher.lower_local_name_selectors)
+
+    assert local_names(url_fetcher) == ['a', 'b']
+    # Nested imports are fetched again, with the URL fetcher of the sheet.
+    sources['b.css'] = 'i { color: red }'
+    assert local_names(url_fetcher) == ['a', 'i']
+    with capture_logs() as logs:
+        assert local_names(restricted_url_fetcher) == ['a']
+    assert len(logs) == 1
+    assert 'Failed to load stylesheet' in logs[0]
+
+
+@assert_no_logs
+def test_imports_cache_pending_errors():
+    def url_fetcher(url):
+        return {'string': 'p { counter-increment: var(--var) }'}
+
+    # Errors of cached variables are reported for each document.
+    for _ in range(2):
+        with capture_logs() as logs:
+            FakeHTML(
+                string='<style>@import "https://example.com/a.css"</style><p>',
+                url_fetcher=url_fetcher).render()
+        assert len(logs) == 1
+        assert 'no value' in logs[0]
+
+
+@assert_no_logs
+def test_imports_cache_errors():
+    sources = {
+        'a.css': '@import "b.css"; a { color: red }',
+        'b.css': 'b { colour: red }',
+    }
+
+    def url_fetcher(url):
+        return {'string': sources[url.rsplit('/', 1)[-1]]}
+
+    # Stylesheets with errors are not cached, errors are logged each time.
+    for _ in range(2):
+        with capture_logs() as logs:
+            CSS(string='@import "https://example.com/a.css"', url_fetcher=url_fetcher)
+        assert len(logs) == 1
+        assert 'colour' in logs[0]
+
+
 @assert_no_logs
 def test_annotate_document():
     document = FakeHTML(resource_path('doc1.html'))
@@ -162,6 +251,28 @@ def test_important():
         assert paragraph.style['color'] == (0, 1, 0, 1)  # lime (light green)
 
 
+@assert_no_logs
+def test_ancestor_selectors():
+    document = FakeHTML(string='''
+      <style>
+        section p, div.b p, #c p, .b + div > p span { color: red }
+        div.a p, .a ~ div p, body > div > p span, html #d p { color: lime }
+      </style>
+      <div class="a"><p>a</p></div>
+      <div id="d"><p><span>b</span></p></div>
+    ''').render(stats=True)
+    assert document.stats.counters['rejected_selectors'] > 0
+    page, = document.pages
+    html, = page._page_box.children
+    body, = html.children
+    div_a, div_d = body.children
+    for div in (div_a, div_d):
+        paragraph, = div.children
+        line, = paragraph.children
+        text, = line.children
+        assert text.style['color'] == (0, 1, 0, 1)  # lime (light green)
+
+
 @assert_no_logs
 @pytest.mark.parametrize('value, width', (
     ('96px', 96),
@@ -173,9 +284,8 @@ def test_important():
     ('101.6q', 96),
     ('1.1em', 11),
     ('1.1rem', 17.6),
-    # TODO: ch and ex units don't work with font-face, see computed_values.py.
-    # ('1.1ch', 11),
-    # ('1.5ex', 12),
+    ('1.1ch', 11),
+    ('1.5ex', 12),
 ))
 def test_units(value, width):
     document = FakeHTML(base_url=BASE_URL, string='''
@@ -188,6 +298,141 @@ def test_units(value, width):
     assert p.margin_left == width
 
 
+@assert_no_logs
+def test_style_mapping():
+    document = FakeHTML(string='''
+      <div style="font-size: 20px; --a: 1"><p style="margin: 1em">a</p></div>
+    ''')
+    style_for = get_all_computed_styles(document)
+    _head, body = document.etree_element
+    div, = body
+    p, = div
+    div_style, p_style = style_for(div), style_for(p)
+    assert p_style['font_size'] == 20
+    assert p_style['margin_top'] == (20, 'px')
+    assert p_style['__a'][0].value == 1
+    assert 'margin_top' in p_style
+    assert 'margin_bottom' not in p_style
+    assert p_style.get('margin_bottom') == (20, 'px')
+    assert 'margin_bottom' in p_style
+    assert set(p_style) >= {'font_size', 'margin_top', 'margin_bottom', '__a'}
+
+    # Modified values are not shared with parents, children and copies.
+    p_copy = p_style.copy()
+    p_style['font_size'] = 10
+    p_style['margin_top'] = 0
+    assert p_style['font_size'] == 10
+    assert p_style['margin_top'] == 0
+    assert div_style['font_size'] == 20
+    assert p_copy['font_size'] == 20
+    assert p_copy['margin_top'] == (20, 'px')
+    del p_copy['font_size']
+    assert 'font_size' not in p_copy
+    assert p_copy['font_size'] == 20
+
+
+@assert_no_logs
+def test_pseudo_element_styles():
+    document = FakeHTML(string='''
+      <style>
+        p::before { content: "a"; color: red }
+        p::after { content: "b"; -weasy-anchor: attr(class) }
+        p::marker { color: blue }
+      </style>
+      <p class="after" style="color: green">a</p>
+    ''')
+    target_collector = TargetCollector()
+    style_for = get_all_computed_styles(
+        document, target_collector=target_collector)
+    _head, body = document.etree_element
+    p, = body
+    computed_styles = style_for.get_computed_styles()
+
+    # Styles of pseudo-elements are computed when they are requested, unless
+    # they define an anchor.
+    assert (p, 'before') not in computed_styles
+    assert (p, 'after') in computed_styles
+    assert 'after' in target_collector.target_lookup_items
+    before_style = style_for(p, 'before')
+    assert computed_styles[p, 'before'] is before_style
+    assert before_style['color'] == (1, 0, 0, 1)
+    assert style_for(p, 'marker')['color'] == (0, 0, 1, 1)
+    assert style_for(p, 'first-line') is None
+    assert style_for(p, 'before') is before_style
+
+
+@assert_no_logs
+def test_anonymous_style():
+    document = FakeHTML(string='''
+      <p style="text-decoration: underline; page: a; white-space: pre">a</p>
+    ''')
+    style_for = get_all_computed_styles(document)
+    _head, body = document.etree_element
+    p, = body
+    p_style = style_for(p)
+    style_1, style_2 = AnonymousStyle(p_style), AnonymousStyle(p_style)
+    assert style_1['white_space'] == style_2['white_space'] == 'pre'
+    assert style_1['page'] == style_2['page'] == 'a'
+    assert style_1['text_decoration_line'] == {'underline'}
+    assert style_1['border_top_width'] == 0
+    assert style_1['margin_top'] == (0, 'px')
+
+    # Modified values are not shared with other anonymous styles.
+    style_1['white_space'] = 'normal'
+    style_1['position'] = 'absolute'
+    assert style_1['white_space'] == 'normal'
+    assert style_1['position'] == 'absolute'
+    assert style_2['white_space'] == p_style['white_space'] == 'pre'
+    assert style_2['position'] == p_style['position'] == 'static'
+    assert len(style_1) == len(list(style_1))
+    assert len(p_style) == len(list(p_style))
+    with pytest.raises(TypeError):
+        Style()
+
+
+@assert_no_logs
+def test_anonymous_style_shared_values():
+    document = FakeHTML(string='<p style="text-decoration: underline; page: a">a</p>')
+    style_for = get_all_computed_styles(document)
+    _head, body = document.etree_element
+    p, = body
+    p_style = style_for(p)
+    style_1, style_2 = AnonymousStyle(p_style), AnonymousStyle(p_style)
+    other_style = AnonymousStyle(style_for(body))
+
+    # Values computed for an anonymous style are shared with the other
+    # anonymous styles of the same parent.
+    assert style_1['page'] == 'a'
+    assert 'page' in style_2
+    assert style_2['page'] == 'a'
+    assert 'page' not in other_style
+    assert other_style['page'] == 'auto'
+
+    # Modified values are not shared.
+    style_1['page'] = 'b'
+    assert style_1['page'] == 'b'
+    assert style_2['page'] == AnonymousStyle(p_style)['page'] == 'a'
+
+
+@assert_no_logs
+def test_shared_computed_values():
+    document = FakeHTML(string='''
+      <style>p { margin: 2em 1in 1.5rem; line-height: 1.5 }</style>
+      <div style="font-size: 10px"><p>a</p></div>
+      <section style="font-size: 10px"><p>b</p></section>''')
+    page, = document.render().pages
+    html, = page._page_box.children
+    body, = html.children
+    div, section = body.children
+    paragraph_1, = div.children
+    paragraph_2, = section.children
+    assert paragraph_1.style['margin_top'] == (20, 'px')
+    assert paragraph_1.style['margin_right'] == (96, 'px')
+    assert paragraph_1.style['margin_bottom'] == (24, 'px')
+    for key in ('margin_top', 'margin_right', 'margin_bottom', 'line_height'):
+        assert paragraph_1.style[key] is paragraph_2.style[key]
+
+
 @pytest.mark.parametrize('media, width, warning', (
     ('@media screen { @page { size: 10px } }', 20, False),
     ('@media print { @page { size: 10px } }', 10, False),
@@ -1,13 +1,70 @@
 """Test the user-agent stylesheet."""
 
+import pickle
+import sys
+
 import pytest
 
-from weasyprint.html import CSS, HTML5_PH, HTML5_UA, HTML5_UA_FORM
+from weasyprint import VERSION
+from weasyprint.html import CSS, HTML5_PH, HTML5_UA, HTML5_UA_FORM, _parse_ua_stylesheet
 
-from ..testing_utils import assert_no_logs
+from ..testing_utils import FakeHTML, assert_no_logs
 
 
 @assert_no_logs
 @pytest.mark.parametrize('css', (HTML5_UA, HTML5_UA_FORM, HTML5_PH))
 def test_ua_stylesheets(css):
     CSS(string=css)
+
+
+@assert_no_logs
+def test_pickle_stylesheet():
+    stylesheet = pickle.loads(pickle.dumps(CSS(string='''
+      p:first-child > .a, #b { color: red }
+      @page { size: 10px }
+    ''')))
+    page, = FakeHTML(string='<p><span class="a">a</span> <span id="b">b</span>').render(
+        stylesheets=[stylesheet]).pages
+    assert page.width == 10
+    html, = page._page_box.children
+    body, = html.children
+    paragraph, = body.children
+    line, = paragraph.children
+    a, space, b = line.children
+    assert a.style['color'] == b.style['color'] == (1, 0, 0, 1)
+    assert space.style['color'] == (0, 0, 0, 1)
+
+
+@assert_no_logs
+def test_ua_stylesheet_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    _parse_ua_stylesheet('p { color: red }', 'test', folder=tmp_path)
+    path, = tmp_path.iterdir()
+    assert path.name.startswith('ua-test-')
+    stylesheet = _parse_ua_stylesheet('p { color: red }', 'test', folder=tmp_path)
+    assert list(tmp_path.iterdir()) == [path]
+    assert stylesheet.matcher.lower_local_name_selectors['p']
+    _parse_ua_stylesheet('p { color: blue }', 'test', folder=tmp_path)
+    paths = set(tmp_path.iterdir())
+    assert len(paths) == 2
+    assert path in paths
+
+
+@assert_no_logs
+def test_ua_stylesheet_cache_not_writable(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    (tmp_path / 'file').touch()
+    stylesheet = _parse_ua_stylesheet(
+        'p { color: red }', 'test', folder=tmp_path / 'file' / 'cache')
+    assert stylesheet.matcher.lower_local_name_selectors['p']
+    assert [path.name for path in tmp_path.iterdir()] == ['file']
+
+
+@assert_no_logs
+def test_ua_stylesheet_user_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    monkeypatch.setattr(sys, 'platform', 'linux')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    _parse_ua_stylesheet('p { color: red }', 'test')
+    path, = tmp_path.rglob('ua-test-*.pickle')
+    assert path.parent == tmp_path / 'weasyprint' / VERSION
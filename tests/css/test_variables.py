@@ -139,6 +139,25 @@ def test_variable_chain_root():
     assert html.width == 10
 
 
+@assert_no_logs
+def test_variable_chain_scopes():
+    page, = render_pages('''
+      <style>
+        html { --foo: 10px; --var: var(--foo) }
+        div { --foo: 20px }
+        p { width: var(--var) }
+      </style>
+      <p></p><div><p></p></div><p></p><div><p></p></div>
+    ''')
+    html, = page.children
+    body, = html.children
+    paragraph_1, div_1, paragraph_2, div_2 = body.children
+    paragraph_3, = div_1.children
+    paragraph_4, = div_2.children
+    assert paragraph_1.width == paragraph_2.width == 10
+    assert paragraph_3.width == paragraph_4.width == 20
+
+
 def test_variable_self():
     page, = render_pages('''
       <style>
@@ -0,0 +1,72 @@
+"""Test page display lists."""
+
+from tinycss2.color4 import parse_color
+
+from weasyprint.draw.display_list import FILL, PAINT, TEXT, DisplayList
+
+from ..testing_utils import FakeHTML, assert_no_logs
+
+RED, BLUE = parse_color('red'), parse_color('blue')
+TRANSPARENT_RED = parse_color('rgba(255, 0, 0, 0.5)')
+
+
+def _paint(stream):  # pragma: no cover
+    pass
+
+
+def test_display_list_merge_fills():
+    display_list = DisplayList()
+    display_list.fill((0, 0, 10, 10), RED)
+    display_list.fill((10, 0, 10, 10), RED)
+    display_list.fill((0, 20, 10, 10), RED)
+    display_list.fill((0, 40, 10, 10), BLUE)
+    display_list.optimize((0, 0, 100, 100))
+    assert [operation[0] for operation in display_list.operations] == [FILL, FILL]
+    assert display_list.operations[0][2] == (
+        RED, [(0, 0, 20, 10), (0, 20, 10, 10)])
+    assert display_list.operations[1][2] == (BLUE, [(0, 40, 10, 10)])
+
+
+def test_display_list_remove_hidden():
+    display_list = DisplayList()
+    display_list.paint((5, 5, 10, 10), _paint)
+    display_list.text((5, 5, 10, 10), _paint)
+    display_list.fill((0, 0, 10, 10), TRANSPARENT_RED)
+    display_list.paint((200, 0, 10, 10), _paint)
+    display_list.fill((0, 0, 20, 20), BLUE)
+    display_list.paint(None, _paint)
+    display_list.optimize((0, 0, 100, 100))
+    kinds = [operation[0] for operation in display_list.operations]
+    assert kinds == [TEXT, FILL, PAINT]
+
+
+def test_display_list_keep_other_states():
+    display_list = DisplayList()
+    display_list.paint((5, 5, 10, 10), _paint)
+    display_list.push_state()
+    display_list.fill((0, 0, 20, 20), BLUE)
+    display_list.pop_state()
+    display_list.push_state()
+    display_list.transform(e=-500)
+    display_list.paint((500, 0, 10, 10), _paint)
+    display_list.pop_state()
+    display_list.optimize((0, 0, 100, 100))
+    assert len(display_list.operations) == 8
+
+
+@assert_no_logs
+def test_display_list_zoom():
+    document = FakeHTML(string='''
+        <style>
+          @page { size: 20px }
+          body { font-family: weasyprint; font-size: 4px; line-height: 1 }
+          div { background: red; height: 5px }
+          div + div { background: blue; margin-top: -5px }
+          p { break-before: page; opacity: 0.5 }
+        </style>
+        <div></div><div></div><p>abc</p>
+    ''').render()
+    pngs = document.write_png(split_images=True)
+    document.write_pdf(zoom=2)
+    assert document.write_png(split_images=True) == pngs
+    assert all(page._display_list is not None for page in document.pages)
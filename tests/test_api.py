@@ -3,8 +3,11 @@
 import contextlib
 import gzip
 import io
+import json
 import os
+import pickle
 import re
+import subprocess
 import sys
 import threading
 import unicodedata
@@ -20,6 +23,8 @@ from PIL import Image
 from weasyprint import CSS, HTML, __main__, default_url_fetcher
 from weasyprint.pdf.anchors import resolve_links
 from weasyprint.pdf.metadata import generate_rdf_metadata
+from weasyprint.stats import Profiler, Statistics
+from weasyprint.text import ffi
 from weasyprint.urls import path2url
 
 from .draw import parse_pixels
@@ -454,6 +459,95 @@ def test_command_line_render(tmp_path):
         _run('--version')
 
 
+@assert_no_logs
+def test_command_line_stats(capsys):
+    _run('--stats json - -', b'<p>abc</p>')
+    stats = json.loads(capsys.readouterr().err)
+    assert stats['steps']['layout_page']['calls'] == 1
+    assert stats['counters']['boxes'] > 0
+    assert stats['steps']['parse']['calls'] == 1
+
+
+def test_lazy_imports():
+    # Libraries and stylesheets only needed by some documents are not loaded
+    # when WeasyPrint is imported.
+    code = (
+        'import sys, weasyprint.html; '
+        'print(*(name for name in ("PIL", "fontTools", "HTML5_UA_STYLESHEET") '
+        'if name in sys.modules or name in vars(weasyprint.html)))')
+    result = subprocess.run(
+        (sys.executable, '-c', code), capture_output=True, check=True)
+    assert result.stdout.strip() == b''
+
+
+def test_lazy_harfbuzz_subset():
+    assert ffi.harfbuzz_subset is ffi.load_harfbuzz_subset()
+    with pytest.raises(AttributeError):
+        ffi.unknown_library
+
+
+@assert_no_logs
+def test_stats():
+    document = FakeHTML(
+        string='<link rel="stylesheet" href="sheet2.css"><p>abc</p>'
+        '<img src="pattern.png">',
+        base_url=resource_path('<inline HTML>')).render(stats=True)
+    steps = {'cascade', 'build', 'layout', 'layout_page'}
+    assert set(document.stats.steps) == steps
+    document.write_pdf()
+    steps |= {'paint', 'fonts', 'images', 'write'}
+    assert set(document.stats.steps) == steps
+    assert document.stats.steps['paint']['calls'] == 1
+    assert document.stats.steps['layout']['wall'] > 0
+    assert document.stats.counters['pango_layouts'] > 0
+    assert document.stats.counters['image_cache_misses'] == 1
+    assert document.stats.counters['image_bytes'] > 0
+    assert document.stats.counters['fetched_bytes'] >= len(
+        Path(resource_path('sheet2.css')).read_bytes())
+    assert 'repaginations' not in document.stats.counters
+
+
+@assert_no_logs
+def test_stats_parse():
+    statistics = Statistics()
+    with statistics.collect():
+        html = FakeHTML(string='<p>abc</p>')
+    assert set(statistics.steps) == {'parse'}
+    assert set(html.render(stats=True).stats.steps) == {
+        'cascade', 'build', 'layout', 'layout_page'}
+
+
+@assert_no_logs
+def test_stats_not_collected():
+    document = FakeHTML(string='<p>abc</p>').render()
+    assert document.stats is None
+    document.write_pdf()
+    assert document.stats is None
+
+
+@assert_no_logs
+def test_profiler():
+    profiler = Profiler()
+    with profiler.collect():
+        FakeHTML(string='''
+          <style>
+            @page { size: 20px }
+            body { font-family: weasyprint; font-size: 4px; line-height: 1 }
+          </style>
+          <p id="lorem" class="ipsum dolor">abc</p><p>def</p>''').render()
+    assert set(profiler.pages) == {1}
+    assert profiler.pages[1]['calls'] == 1
+    assert profiler.elements['p#lorem.ipsum.dolor']['calls'] >= 1
+    assert profiler.elements['body']['calls'] >= 1
+    stacks = profiler.collapsed_stacks().splitlines()
+    assert 'page 1;block_level_layout html;block_level_layout body' in {
+        stack.rsplit(' ', 1)[0] for stack in stacks}
+    assert all(stack.rsplit(' ', 1)[1].isdigit() for stack in stacks)
+    events = json.loads(json.dumps(profiler.chrome_trace()))['traceEvents']
+    assert {'page 1', 'block_level_layout', 'split_first_line'} <= {
+        event['name'] for event in events}
+
+
 @pytest.mark.parametrize('version, pdf_version', (
     (1, '1.4'),
     (2, '1.7'),
@@ -1310,3 +1404,42 @@ def test_page_copy_relative():
     duplicated_pages = document.copy([*document.pages, *document.pages])
     pngs = duplicated_pages.write_png(split_images=True)
     assert pngs[0] == pngs[1]
+
+
+@assert_no_logs
+def test_pickle_pages():
+    document = FakeHTML(string='''
+        <style>
+          @page { size: 20px }
+          body { font-family: weasyprint; font-size: 4px; line-height: 1 }
+          p + p { break-before: page }
+          img { width: 4px; height: 4px }
+        </style>
+        <p style="color: red; opacity: 0.5">abc</p>
+        <p><a href="#anchor" id="anchor">d</a><img src="pattern.png"></p>
+    ''', base_url=resource_path('<inline HTML>')).render()
+    pngs = document.write_png(split_images=True)
+    pages = pickle.loads(pickle.dumps(document.pages))
+    assert pages[1].anchors.keys() == {'anchor'}
+    copy = document.copy(pages)
+    assert copy.write_png(split_images=True) == pngs
+    copy = pickle.loads(pickle.dumps(copy))
+    assert copy.write_png(split_images=True) == pngs
+    with capture_logs() as logs:
+        copy.write_pdf(pdf_variant='pdf/ua-1')
+    assert len(logs) == 2
+    assert all('its content is not tagged' in log for log in logs)
+
+
+@assert_no_logs
+def test_pickle_document_shared_images():
+    document = FakeHTML(string='''
+        <style>img + img { break-before: page }</style>
+        <img src="pattern.png"><img src="pattern.png">
+    ''', base_url=resource_path('<inline HTML>')).render()
+    pngs = document.write_png(split_images=True)
+    data = pickle.dumps(document)
+    assert data.count(Path(resource_path('pattern.png')).read_bytes()) == 1
+    copy = pickle.loads(data)
+    assert copy.write_png(split_images=True) == pngs
+    assert copy.write_png(split_images=True) == pngs
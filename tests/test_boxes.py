@@ -1246,6 +1246,18 @@ def test_page_counters():
         assert text_box.text == f'Page {page_number} of 3.'
 
 
+@assert_no_logs
+def test_copy_counters_state():
+    state = ([0], {'pages': [0], 'page': [1, 2]}, [{'pages'}, {'page'}])
+    state_copy = build.copy_state(state)
+    build.update_counters(state_copy, {
+        'counter_reset': [('pages', 3)], 'counter_set': [],
+        'counter_increment': [('page', 1)]})
+    assert state == ([0], {'pages': [0], 'page': [1, 2]}, [{'pages'}, {'page'}])
+    assert state_copy == (
+        [0], {'pages': [0, 3], 'page': [1, 3]}, [{'pages'}, {'page', 'pages'}])
+
+
 @assert_no_logs
 @pytest.mark.parametrize('html', (
     '<html style="display: none">',
@@ -1257,3 +1269,39 @@ def test_display_none_root(html):
     box = parse_all(html)
     assert box.style['display'] == ('block', 'flow')
     assert not box.children
+
+
+@assert_no_logs
+def test_box_deepcopy():
+    page, = render_pages('<p style="width: 50px">abc</p>')
+    html, = page.children
+    body, = html.children
+    paragraph, = body.children
+    paragraph.link = 'def'
+    copy = paragraph.deepcopy()
+    assert copy is not paragraph
+    assert copy.width == 50
+    assert copy.position_y == paragraph.position_y
+    assert copy.link == 'def'
+    line, = copy.children
+    text, = line.children
+    assert text is not paragraph.children[0].children[0]
+    assert text.text == 'abc'
+    assert text.pango_layout is paragraph.children[0].children[0].pango_layout
+
+
+@pytest.mark.parametrize('box_class, args', (
+    (boxes.BlockBox, ([],)),
+    (boxes.TextBox, ('abc',)),
+    (boxes.BlockReplacedBox, (None,)),
+))
+def test_box_copy_slots(box_class, args):
+    box = box_class('p', None, None, *args)
+    slots = {
+        name for cls in box_class.__mro__
+        for name in getattr(cls, '__slots__', ())} - {'__dict__'}
+    for name in slots:
+        setattr(box, name, object())
+    copy = box.copy()
+    for name in slots:
+        assert getattr(copy, name) is getattr(box, name), name
@@ -1,6 +1,10 @@
 """Test the fonts features."""
 
-from .testing_utils import assert_no_logs, render_pages
+from weasyprint import CSS
+from weasyprint.text.ffi import ffi, fontconfig
+from weasyprint.text.fonts import FontConfiguration
+
+from .testing_utils import assert_no_logs, render_pages, resource_path
 
 
 @assert_no_logs
@@ -16,6 +20,40 @@ def test_font_face():
     assert line.width == 3 * 16
 
 
+@assert_no_logs
+def test_font_configuration_base():
+    font_config = FontConfiguration()
+    base_font_map = font_config.font_map
+    assert FontConfiguration().font_map == base_font_map
+    font_config.warm_up(families=('serif', 'weasyprint'))
+    assert font_config.font_map == base_font_map
+    CSS(
+        string='@font-face { src: url(weasyprint.otf); font-family: weasyprint }',
+        base_url=resource_path('<test>'), font_config=font_config)
+    assert font_config.font_map != base_font_map
+    assert font_config.character_ratios is not FontConfiguration().character_ratios
+    assert FontConfiguration().font_map == base_font_map
+
+
+@assert_no_logs
+def test_font_configuration_overlay():
+    # Installed fonts are shared with the base, not scanned again
+    base_config = FontConfiguration()._config
+    installed_fonts = fontconfig.FcConfigGetFonts(base_config, fontconfig.FcSetSystem)
+    font_config = FontConfiguration()
+    CSS(
+        string='@font-face { src: url(weasyprint.otf); font-family: weasyprint }',
+        base_url=resource_path('<test>'), font_config=font_config)
+    config = font_config._config
+    assert config != base_config
+    assert fontconfig.FcConfigGetFonts(config, fontconfig.FcSetSystem) == ffi.NULL
+    fonts = fontconfig.FcConfigGetFonts(config, fontconfig.FcSetApplication)
+    assert fonts.nfont == installed_fonts.nfont + 1
+    patterns = {fonts.fonts[i] for i in range(fonts.nfont)}
+    assert all(
+        installed_fonts.fonts[i] in patterns for i in range(installed_fonts.nfont))
+
+
 @assert_no_logs
 def test_kerning_default():
     # Kerning and ligatures are on by default
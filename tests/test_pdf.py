@@ -540,6 +540,166 @@ def test_embed_images_from_pages():
     assert document.count(b'/Filter /DCTDecode') == 2
 
 
+@assert_no_logs
+def test_embed_image_dpi():
+    # Image resized once, to the highest resolution needed by its uses
+    pdf = FakeHTML(
+        base_url=resource_path('dummy.html'),
+        string='''
+          <img src="not-optimized.jpg" style="width: 2.5px">
+          <img src="not-optimized.jpg" style="width: 5px">
+        ''').write_pdf(dpi=96)
+    assert pdf.count(b'/Filter /DCTDecode') == 1
+    assert b'/Width 5/Height 5' in pdf
+
+
+@assert_no_logs
+def test_embed_image_dpi_cache(monkeypatch):
+    # Resized images are shared between documents using the same cache
+    cache = {}
+    html = FakeHTML(
+        base_url=resource_path('dummy.html'),
+        string='<img src="not-optimized.jpg" style="width: 5px">')
+    html.write_pdf(dpi=96, cache=cache)
+    resized_keys = [key for key in cache if key.endswith('-5x5--0')]
+    assert len(resized_keys) == 1
+
+    def resize(*args, **kwargs):  # pragma: no cover
+        raise AssertionError('Image resized twice')
+    monkeypatch.setattr('PIL.Image.Image.resize', resize)
+    pdf = html.write_pdf(dpi=96, cache=cache)
+    assert b'/Width 5/Height 5' in pdf
+
+
+@assert_no_logs
+def test_embed_svg_once():
+    # SVG image drawn multiple times with the same size, embedded once
+    pdf = FakeHTML(
+        base_url=resource_path('dummy.html'),
+        string='''
+          <img src="pattern.svg">
+          <img src="pattern.svg">
+          <img src="pattern.svg" style="width: 8px">
+        ''').write_pdf()
+    assert pdf.count(b'/Subtype /Form') == 2
+    assert pdf.count(b' Do') == 3
+    assert b'/BBox [0 0 4 4]' in pdf
+    assert b'/BBox [0 0 8 8]' in pdf
+    assert b'/Transparency' not in pdf
+
+
+@assert_no_logs
+def test_gradient_shading_once():
+    # Identical gradients share the same shading and function
+    pdf = FakeHTML(string='''
+      <style>
+        div { height: 10px; width: 10px; background: linear-gradient(red, blue) }
+      </style>
+      <div></div><div></div><div></div>
+    ''').write_pdf()
+    assert pdf.count(b'/ShadingType 2') == 1
+    assert pdf.count(b'/FunctionType 2') == 1
+    assert b'/FunctionType 3' not in pdf
+
+
+@assert_no_logs
+@pytest.mark.parametrize('content, groups', (
+    ('"Header"', 1),
+    ('counter(page)', 3),
+))
+def test_margin_boxes_groups(content, groups):
+    # Identical margin boxes are drawn once in a group shared by pages
+    pdf = FakeHTML(string=f'''
+      <style>
+        @page {{ size: 100px; @top-center {{ content: {content} }} }}
+        div + div {{ break-before: page }}
+      </style>
+      <div>a</div><div>b</div><div>c</div>
+    ''').write_pdf()
+    assert pdf.count(b'/Subtype /Form') == groups
+    assert pdf.count(b' Do') == 3
+
+
+@assert_no_logs
+def test_margin_boxes_groups_bbox():
+    # Margin boxes groups are bound to their ink rectangle, with no transparency
+    pdf = FakeHTML(string='''
+      <style>
+        @page {
+          size: 100px; margin: 20px;
+          @top-left-corner { content: ""; background: red; font-size: 0 } }
+      </style>
+    ''').write_pdf()
+    assert b'/BBox [0 0 20 20]' in pdf
+    assert b'/Transparency' not in pdf
+
+
+@assert_no_logs
+def test_margin_boxes_groups_image_dpi():
+    # Images in margin boxes groups are resized with the scale of the page
+    pdf = FakeHTML(
+        base_url=resource_path('dummy.html'),
+        string='''
+          <style>
+            @page {
+              @top-center { content: url(not-optimized.jpg);
+                            image-resolution: 2dppx } }
+          </style>
+        ''').write_pdf(dpi=96)
+    assert b'/Width 5/Height 5' in pdf
+
+
+@assert_no_logs
+def test_groups_not_drawn():
+    # Groups of boxes that are not drawn are removed
+    pdf = FakeHTML(string='''
+      <style>
+        @page { size: 100px }
+        div { opacity: 0.5; transform: scale(0); background: red }
+      </style>
+      <div>a</div>
+    ''').write_pdf()
+    assert b'/Subtype /Form' not in pdf
+
+
+@assert_no_logs
+def test_opacity_group_bbox():
+    pdf = FakeHTML(string='''
+      <style>
+        @page { size: 100px }
+        div { position: absolute; top: 10px; left: 10px; opacity: 0.5;
+              width: 20px; height: 10px; background: red }
+      </style>
+      <div></div>
+    ''').write_pdf()
+    assert b'/BBox [10 10 30 20]' in pdf
+
+
+@assert_no_logs
+def test_opacity_groups_shared():
+    pdf = FakeHTML(string='''
+      <style>
+        @page { size: 100px }
+        div { position: fixed; top: 10px; left: 10px; opacity: 0.5;
+              width: 20px; height: 10px; background: red }
+        p + p { break-before: page }
+      </style>
+      <div></div><p></p><p></p>
+    ''').write_pdf()
+    assert pdf.count(b'/Subtype /Form') == 1
+    assert pdf.count(b' Do') == 2
+
+
+@assert_no_logs
+def test_text_state_coalesced():
+    pdf = FakeHTML(string='''
+      <p style="font-family: weasyprint; font-size: 10px; width: 10px">a b c</p>
+    ''').write_pdf()
+    assert pdf.count(b' Tf\n') == 1
+    assert pdf.count(b' Tm\n') == 1
+    assert pdf.count(b'\n0 -10 Td\n') == 2
+
+
 @assert_no_logs
 def test_document_info():
     pdf = FakeHTML(string='''
@@ -1,9 +1,20 @@
 """Test URLs."""
 
+import io
 import re
 
 import pytest
 
+from weasyprint import default_url_fetcher
+from weasyprint.stats import Statistics
+from weasyprint.urls import (
+    BufferReader,
+    CountingReader,
+    fetch,
+    map_local_file,
+    read_fetch_result,
+)
+
 from .testing_utils import FakeHTML, capture_logs, resource_path
 
 
@@ -30,3 +41,61 @@ def test_malformed_url_link(url, base_url):
     assert uris.pop(0) == url.encode()
     assert subtypes.pop(0) == b'/Link'
     assert types.pop(0) == b'/URI'
+
+
+def test_map_local_file(tmp_path):
+    """Test shared memory maps of local files."""
+    path = tmp_path / 'image.png'
+    path.write_bytes(resource_path('pattern.png').read_bytes())
+    mapping = map_local_file(path)
+    assert mapping is map_local_file(str(path))
+    assert mapping[:] == path.read_bytes()
+
+    reader = BufferReader(mapping)
+    assert reader.read(4) == b'\x89PNG'
+    reader.seek(-4, io.SEEK_END)
+    assert reader.tell() == len(mapping) - 4
+    assert reader.read() == path.read_bytes()[-4:]
+
+    empty_path = tmp_path / 'empty'
+    empty_path.touch()
+    assert map_local_file(empty_path) == b''
+
+
+def test_fetch_file_object():
+    """Test file objects wrapped to count fetched bytes."""
+    url = resource_path('sheet2.css').as_uri()
+    with fetch(default_url_fetcher, url) as result:
+        file_obj = result['file_obj']
+        assert not isinstance(file_obj, CountingReader)
+        data = file_obj.read()
+
+    statistics = Statistics()
+    with statistics.collect(), fetch(default_url_fetcher, url) as result:
+        file_obj = result['file_obj']
+        assert isinstance(file_obj, CountingReader)
+        assert file_obj.read(4) == data[:4]
+        assert file_obj.tell() == 4
+        file_obj.seek(0)
+        assert file_obj.read() == data
+    assert statistics.counters['fetched_bytes'] == len(data) + 4
+
+
+def test_read_fetch_result():
+    """Test local files mapped only with the default URL fetcher."""
+    path = resource_path('sheet2.css')
+    url = path.as_uri()
+    data = path.read_bytes()
+
+    statistics = Statistics()
+    with statistics.collect(), fetch(default_url_fetcher, url) as result:
+        content, filename = read_fetch_result(default_url_fetcher, result)
+    assert content is map_local_file(path)
+    assert filename == str(path)
+    assert statistics.counters['fetched_bytes'] == len(data)
+
+    def url_fetcher(url):
+        return {'file_obj': io.BytesIO(b'custom')}
+
+    with fetch(url_fetcher, url) as result:
+        assert read_fetch_result(url_fetcher, result) == (b'custom', None)
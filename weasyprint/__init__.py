@@ -12,7 +12,6 @@ from pathlib import Path
 from urllib.parse import urljoin
 
 import cssselect2
-import tinycss2
 import tinyhtml5
 
 VERSION = __version__ = '65.0'
@@ -63,6 +62,9 @@ VERSION = __version__ = '65.0'
 #: :param cache:
 #:     A dictionary used to cache images in memory, or a folder path where
 #:     images are temporarily stored.
+#: :param bool stats:
+#:     Whether rendering timings and counters are collected in
+#:     :attr:`Document.stats <weasyprint.document.Document.stats>`.
 DEFAULT_OPTIONS = {
     'stylesheets': None,
     'media_type': 'print',
@@ -81,6 +83,7 @@ DEFAULT_OPTIONS = {
     'full_fonts': False,
     'hinting': False,
     'cache': None,
+    'stats': False,
 }
 
 __all__ = [
@@ -92,6 +95,7 @@ __all__ = [
 from .urls import (  # noqa: I001, E402
     fetch, default_url_fetcher, path2url, ensure_url, url_is_absolute)
 from .logger import LOGGER, PROGRESS_LOGGER  # noqa: E402
+from .stats import step  # noqa: E402
 # Some imports are at the end of the file (after the CSS class)
 # to work around circular imports.
 
@@ -165,18 +169,20 @@ class HTML:
             getattr(file_obj, 'name', 'HTML string'))
         if isinstance(base_url, Path):
             base_url = str(base_url)
-        result = _select_source(
-            guess, filename, url, file_obj, string, base_url, url_fetcher)
-        with result as (source_type, source, base_url, protocol_encoding):
-            if isinstance(source, str):
-                result = tinyhtml5.parse(source, namespace_html_elements=False)
-            else:
-                kwargs = {'namespace_html_elements': False}
-                if protocol_encoding is not None:
-                    kwargs['transport_encoding'] = protocol_encoding
-                if encoding is not None:
-                    kwargs['override_encoding'] = encoding
-                result = tinyhtml5.parse(source, **kwargs)
+        with step('parse'):
+            result = _select_source(
+                guess, filename, url, file_obj, string, base_url, url_fetcher)
+            with result as (source_type, source, base_url, protocol_encoding):
+                if isinstance(source, str):
+                    result = tinyhtml5.parse(
+                        source, namespace_html_elements=False)
+                else:
+                    kwargs = {'namespace_html_elements': False}
+                    if protocol_encoding is not None:
+                        kwargs['transport_encoding'] = protocol_encoding
+                    if encoding is not None:
+                        kwargs['override_encoding'] = encoding
+                    result = tinyhtml5.parse(source, **kwargs)
         self.base_url = _find_base_url(result, base_url)
         self.url_fetcher = url_fetcher
         self.media_type = media_type
@@ -185,14 +191,17 @@ class HTML:
         self.etree_element = self.wrapper_element.etree_element
 
     def _ua_stylesheets(self, forms=False):
+        from .html import HTML5_UA_FORM_STYLESHEET, HTML5_UA_STYLESHEET
         if forms:
             return [HTML5_UA_STYLESHEET, HTML5_UA_FORM_STYLESHEET]
         return [HTML5_UA_STYLESHEET]
 
     def _ua_counter_style(self):
+        from .html import HTML5_UA_COUNTER_STYLE
         return [HTML5_UA_COUNTER_STYLE.copy()]
 
     def _ph_stylesheets(self):
+        from .html import HTML5_PH_STYLESHEET
         return [HTML5_PH_STYLESHEET]
 
     def render(self, font_config=None, counter_style=None, **options):
@@ -296,17 +305,18 @@ class CSS:
         with result as (source_type, source, base_url, protocol_encoding):
             if source_type == 'file_obj':
                 source = source.read()
-            if isinstance(source, str):
-                # unicode, no encoding
-                stylesheet = tinycss2.parse_stylesheet(source)
-            else:
-                stylesheet, encoding = tinycss2.parse_stylesheet_bytes(
-                    source, environment_encoding=encoding,
-                    protocol_encoding=protocol_encoding)
         self.base_url = base_url
-        self.matcher = matcher or cssselect2.Matcher()
+        self.matcher = matcher or Matcher()
         self.page_rules = [] if page_rules is None else page_rules
         counter_style = {} if counter_style is None else counter_style
+        if matcher is not None:
+            # Imported stylesheet, whose preprocessed rules can be cached.
+            preprocess_imported_stylesheet(
+                media_type, base_url, source, encoding, protocol_encoding,
+                url_fetcher, self.matcher, self.page_rules, font_config,
+                counter_style)
+            return
+        stylesheet = parse_stylesheet(source, encoding, protocol_encoding)
         preprocess_stylesheet(
             media_type, base_url, stylesheet, url_fetcher, self.matcher,
             self.page_rules, font_config, counter_style)
@@ -427,8 +437,7 @@ def _select_source(guess=None, filename=None, url=None, file_obj=None,
         yield 'string', string, base_url, None
 
 # Work around circular imports.
-from .css import preprocess_stylesheet  # noqa: I001, E402
-from .html import (  # noqa: E402
-    HTML5_UA_COUNTER_STYLE, HTML5_UA_STYLESHEET, HTML5_UA_FORM_STYLESHEET,
-    HTML5_PH_STYLESHEET)
+from .css import (  # noqa: I001, E402
+    parse_stylesheet, preprocess_imported_stylesheet, preprocess_stylesheet)
+from .css.selectors import Matcher  # noqa: E402
 from .document import Document, Page  # noqa: E402
@@ -1,6 +1,8 @@
 """Command-line interface to WeasyPrint."""
 
 import argparse
+import contextlib
+import json
 import logging
 import platform
 import sys
@@ -10,6 +12,7 @@ import pydyf
 
 from . import DEFAULT_OPTIONS, HTML, LOGGER, __version__
 from .pdf import VARIANTS
+from .stats import Statistics
 from .text.ffi import pango
 from .urls import default_url_fetcher
 
@@ -120,6 +123,9 @@ PARSER.add_argument(
 PARSER.add_argument(
     '-D', '--dpi', type=int,
     help='set maximum resolution of images embedded in the PDF')
+PARSER.add_argument(
+    '--stats', choices=('json',),
+    help='print rendering timings and counters on stderr')
 PARSER.add_argument(
     '-v', '--verbose', action='store_true',
     help='show warnings and information messages')
@@ -188,10 +194,17 @@ def main(argv=None, stdout=None, stdin=None, HTML=HTML):  # noqa: N803
             handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
         LOGGER.addHandler(handler)
 
-    html = HTML(
-        source, base_url=args.base_url, encoding=args.encoding,
-        media_type=args.media_type, url_fetcher=url_fetcher)
-    html.write_pdf(output, **options)
+    statistics = Statistics()
+    with statistics.collect() if args.stats else contextlib.nullcontext():
+        html = HTML(
+            source, base_url=args.base_url, encoding=args.encoding,
+            media_type=args.media_type, url_fetcher=url_fetcher)
+    document = html.render(**options)
+    document.write_pdf(output, **options)
+    if args.stats == 'json':
+        statistics.update(document.stats)
+        json.dump(statistics.to_dict(), sys.stderr, indent=2)
+        sys.stderr.write('\n')
 
 
 main.__doc__ += '\n\n' + PARSER.docstring
@@ -12,7 +12,10 @@ on other functions in this module.
 
 """
 
+from abc import abstractmethod
 from collections import namedtuple
+from collections.abc import MutableMapping
+from hashlib import md5
 from itertools import groupby
 from logging import DEBUG, WARNING
 
@@ -22,11 +25,13 @@ import tinycss2.ast
 import tinycss2.nth
 
 from .. import CSS
-from ..logger import LOGGER, PROGRESS_LOGGER
+from ..logger import LOGGER, PROGRESS_LOGGER, collect_logs
+from ..stats import count
 from ..urls import URLFetchingError, get_url_attribute, url_join
 from . import counters, media_queries
 from .computed_values import COMPUTER_FUNCTIONS
 from .properties import INHERITED, INITIAL_NOT_COMPUTED, INITIAL_VALUES, ZERO_PIXELS
+from .selectors import Ancestors
 from .validation import preprocess_declarations
 from .validation.descriptors import preprocess_descriptors
 
@@ -42,10 +47,72 @@ PSEUDO_ELEMENTS = (
 PageSelectorType = namedtuple(
     'PageSelectorType', ['side', 'blank', 'first', 'index', 'name'])
 
+# Rules of imported stylesheets, see preprocess_imported_stylesheet.
+_IMPORTED_RULES = {}
+
+# Computed values are stored in lists, one for each group of properties.
+# Inherited properties are split into groups whose values are often inherited
+# together, other properties into groups whose values are often computed
+# together.
+_INHERITED_GROUPS = (
+    {key for key in INHERITED if key.startswith('font_')} |
+    {'letter_spacing', 'line_height', 'word_spacing'},
+    {key for key in INHERITED if key.startswith(('text_', 'hyphen'))} |
+    {'block_ellipsis', 'direction', 'lang', 'overflow_wrap', 'quotes',
+     'tab_size', 'white_space', 'word_break'},
+)
+_INHERITED_GROUPS += (INHERITED.difference(*_INHERITED_GROUPS),)
+_OTHER_KEYS = set(INITIAL_VALUES) - INHERITED
+_OTHER_GROUPS = (
+    {key for key in _OTHER_KEYS if key.startswith(
+        ('border_', 'margin_', 'outline_', 'padding_'))},
+    {key for key in _OTHER_KEYS if key.startswith('text_decoration_')} |
+    {'page'},
+    {key for key in _OTHER_KEYS if key.startswith(
+        ('bleed_', 'bookmark_', 'break_', 'counter_', 'footnote_'))} |
+    {'anchor', 'content', 'continue', 'marks', 'max_lines', 'size', 'string_set'},
+    {key for key in _OTHER_KEYS if key.startswith(
+        ('align_', 'column_', 'flex_', 'grid_', 'justify_'))} |
+    {'order', 'row_gap'},
+)
+_OTHER_GROUPS += (_OTHER_KEYS.difference(*_OTHER_GROUPS),)
+_PROPERTY_GROUPS = tuple(
+    sorted(keys) for keys in (*_INHERITED_GROUPS, *_OTHER_GROUPS))
+PROPERTY_INDEXES = {
+    key: (group, index) for group, keys in enumerate(_PROPERTY_GROUPS)
+    for index, key in enumerate(keys)}
+_VARIABLES = len(_PROPERTY_GROUPS)
+_MISSING = object()
+# Initial values used when they are computed values, other properties and
+# properties whose specified values are stored are computed when requested.
+_INITIAL_VALUES = tuple(
+    [_MISSING if key in INITIAL_NOT_COMPUTED or
+     key in ('float', 'page', 'position') or key[:16] == 'text_decoration_'
+     else INITIAL_VALUES[key] for key in keys]
+    for keys in _PROPERTY_GROUPS)
+# Initial values of anonymous boxes, inherited values are taken from parents.
+# border-*-style is none, so border-width computes to zero. Other than that,
+# properties that would need computing are border-*-color, but they do not
+# apply.
+_ANONYMOUS_VALUES = tuple(
+    [_MISSING if key in INHERITED or key == 'page' or key[:16] == 'text_decoration_'
+     else 0 if key in (
+         'border_top_width', 'border_bottom_width', 'border_left_width',
+         'border_right_width', 'outline_width')
+     else INITIAL_VALUES[key] for key in keys]
+    for keys in _PROPERTY_GROUPS)
+# Groups of non-inherited properties whose values are computed for anonymous
+# boxes, shared by the anonymous styles of the same parent.
+_ANONYMOUS_GROUPS = tuple(
+    group for group, values in enumerate(_ANONYMOUS_VALUES)
+    if group >= len(_INHERITED_GROUPS) and _MISSING in values)
+_ANONYMOUS_MASK = sum(1 << group for group in _ANONYMOUS_GROUPS)
+
 
 class StyleFor:
     """Convenience function to get the computed styles for an element."""
-    def __init__(self, html, sheets, presentational_hints, target_collector):
+    def __init__(self, html, sheets, presentational_hints, target_collector,
+                 font_config=None):
         # keys: (element, pseudo_element_type)
         #    element: an ElementTree Element or the '@page' string
         #    pseudo_element_type: a string such as 'first' (for @page) or
@@ -65,6 +132,7 @@ class StyleFor:
         self._computed_styles = {}
 
         self._sheets = sheets
+        self._font_config = font_config
 
         PROGRESS_LOGGER.info('Step 3 - Applying CSS')
         for specificity, attributes in find_style_attributes(
@@ -84,10 +152,13 @@ class StyleFor:
         # computed styles before their children, for inheritance.
 
         # Iterate on all elements, even if there is no cascaded style for them.
+        # Keep the keys of the ancestors to reject selectors early.
+        ancestors = Ancestors()
         for element in html.wrapper_element.iter_subtree():
+            ancestors.set_element(element)
             for sheet, origin, sheet_specificity in sheets:
                 # Add declarations for matched elements
-                for selector in sheet.matcher.match(element):
+                for selector in sheet.matcher.match(element, ancestors):
                     specificity, order, pseudo_type, declarations = selector
                     specificity = sheet_specificity or specificity
                     style = cascaded_styles.setdefault(
@@ -103,28 +174,40 @@ class StyleFor:
                 element.etree_element, root=html.etree_element, parent=parent,
                 base_url=html.base_url, target_collector=target_collector)
 
-        # Then computed styles for pseudo elements, in any order.
-        # Pseudo-elements inherit from their associated element so they come
-        # last. Do them in a second pass as there is no easy way to iterate
-        # on the pseudo-elements for a given element with the current structure
-        # of cascaded_styles. (Keys are (element, pseudo_type) tuples.)
-
-        # Only iterate on pseudo-elements that have cascaded styles. (Others
-        # might as well not exist.)
-        for element, pseudo_type in cascaded_styles:
-            if pseudo_type:
+        # Then keep the cascaded styles of pseudo-elements, their computed
+        # styles are set when they are requested, as most of them are never
+        # used. Pseudo-elements inherit from their associated element, whose
+        # style is already computed.
+        self._pseudo_cascaded_styles = {}
+        self._root = html.etree_element
+        self._base_url = html.base_url
+        self._target_collector = target_collector
+        for (element, pseudo_type), cascaded in cascaded_styles.items():
+            if not pseudo_type:
+                continue
+            if 'anchor' in cascaded:
+                # Anchors are collected before building boxes.
                 self.set_computed_styles(
-                    element, pseudo_type=pseudo_type,
-                    # The pseudo-element inherits from the element.
-                    root=html.etree_element, parent=element,
-                    base_url=html.base_url, target_collector=target_collector)
+                    element, pseudo_type=pseudo_type, root=self._root,
+                    parent=element, base_url=self._base_url,
+                    target_collector=target_collector)
+            else:
+                self._pseudo_cascaded_styles[element, pseudo_type] = cascaded
 
         # Clear the cascaded styles, we don't need them anymore. Keep the
         # dictionary, it is used later for page margins.
         self._cascaded_styles.clear()
 
     def __call__(self, element, pseudo_type=None):
-        if style := self._computed_styles.get((element, pseudo_type)):
+        style = self._computed_styles.get((element, pseudo_type))
+        if style is None and (element, pseudo_type) in self._pseudo_cascaded_styles:
+            cascaded = self._pseudo_cascaded_styles.pop((element, pseudo_type))
+            style = self._computed_styles[element, pseudo_type] = (
+                computed_from_cascaded(
+                    element, cascaded, self._computed_styles[element, None],
+                    pseudo_type, self._computed_styles[self._root, None],
+                    self._base_url, self._target_collector, self._font_config))
+        if style is not None:
             if 'table' in style['display'] and style['border_collapse'] == 'collapse':
                 # Padding does not apply.
                 for side in ('top', 'bottom', 'left', 'right'):
@@ -164,7 +247,7 @@ class StyleFor:
         cascaded = cascaded_styles.get((element, pseudo_type), {})
         computed_styles[element, pseudo_type] = computed_from_cascaded(
             element, cascaded, parent_style, pseudo_type, root_style, base_url,
-            target_collector)
+            target_collector, self._font_config)
 
     def add_page_declarations(self, page_type):
         for sheet, origin, sheet_specificity in self._sheets:
@@ -599,49 +682,251 @@ def resolve_var(computed, token, parent_style):
     return computed_value
 
 
-class AnonymousStyle(dict):
+def _find_variables(tokens, names):
+    """Append the names of the variables used in ``tokens`` to ``names``."""
+    for token in tokens:
+        if token.type != 'function':
+            continue
+        if token.lower_name == 'var':
+            for argument in token.arguments:
+                if argument.type == 'ident' and argument.value[:2] == '--':
+                    names.append(argument.value.replace('-', '_'))
+                if argument.type != 'whitespace':
+                    break
+        _find_variables(token.arguments, names)
+
+
+def solve_pending(computed, pending, key):
+    """Return the validated value of ``pending`` for ``key``.
+
+    Values are cached in ``pending``, for the values of the variables used by
+    ``pending`` in ``computed``, including variables used by these variables.
+
+    Raise :exc:`InvalidValues` if the value is invalid.
+
+    """
+    names, variables, values = [], set(), []
+    _find_variables(pending.tokens, names)
+    while names:
+        name = names.pop()
+        if name not in variables:
+            variables.add(name)
+            values.append(computed[name])
+            _find_variables(values[-1], names)
+
+    cache_key = (key, *(id(value) for value in values))
+    if cache_key in pending.solved:
+        cached_values, valid, value = pending.solved[cache_key]
+        # Identifiers of old values may have been reused by new ones.
+        if all(old is new for old, new in zip(cached_values, values)):
+            count('variable_cache_hits')
+            if valid:
+                return value
+            raise InvalidValues
+
+    solved_tokens = []
+    for token in pending.tokens:
+        tokens = resolve_var(computed, token, computed.parent_style)
+        if tokens is None:
+            solved_tokens.append(token)
+        else:
+            solved_tokens.extend(tokens)
+    try:
+        value = pending.solve(solved_tokens, key.replace('_', '-'))
+    except InvalidValues:
+        valid, value = False, None
+    else:
+        valid = True
+    if len(pending.solved) >= 256:
+        pending.solved.clear()
+    pending.solved[cache_key] = (values, valid, value)
+    if valid:
+        return value
+    raise InvalidValues
+
+
+class Style(MutableMapping):
+    """Computed values of a box, as a mapping of property names.
+
+    Values are computed when they are requested, and stored in lists of
+    property groups. Inherited groups are shared with the parent style when no
+    property of the group is cascaded, other groups keep the initial values
+    shared by all styles until a value is computed. Shared groups are copied
+    before being modified.
+
+    """
+    __slots__ = (
+        '_anonymous_groups', '_groups', '_initial', '_shared', '_variables',
+        'font_config', 'parent_style', 'specified')
+
+    def _set_values(self, initial_groups, cascaded):
+        """Set lists of values, sharing inherited groups with the parent."""
+        parent_style = self.parent_style
+        inherited = len(_INHERITED_GROUPS)
+        # Other groups are the initial values, shared by all the styles until
+        # a value of the group is cascaded or stored.
+        groups = list(initial_groups)
+        initial = (1 << len(groups)) - (1 << inherited)
+        if isinstance(parent_style, Style):
+            groups[:inherited] = parent_style._groups[:inherited]
+            variables = parent_style._variables
+            shared = (1 << inherited) - 1 | 1 << _VARIABLES | initial
+        else:
+            groups[:inherited] = (
+                values.copy() if parent_style is None else [_MISSING] * len(values)
+                for values in initial_groups[:inherited])
+            variables = {}
+            shared = initial
+        for key in cascaded:
+            if key in PROPERTY_INDEXES:
+                group, index = PROPERTY_INDEXES[key]
+                if shared & (1 << group):
+                    # Keep values already computed by the parent or initial.
+                    shared ^= 1 << group
+                    groups[group] = groups[group].copy()
+                groups[group][index] = _MISSING
+            elif key[:2] == '__' and shared & (1 << _VARIABLES):
+                shared ^= 1 << _VARIABLES
+                variables = {}
+        if shared & ~initial:
+            parent_style._shared |= shared & ~initial
+        self._groups = groups
+        self._variables = variables
+        self._shared = shared
+        self._initial = shared & initial
+        self._anonymous_groups = None
+
+    def _copy_values(self, style):
+        """Copy values to ``style``, a new style with the same parent."""
+        style._groups = [values.copy() for values in self._groups]
+        style._variables = self._variables.copy()
+        style._shared = style._initial = 0
+        return style
+
+    def _unshare(self, group):
+        """Copy the values of ``group`` if they are shared with other styles."""
+        if self._shared & (1 << group):
+            self._shared ^= 1 << group
+            self._initial &= ~(1 << group)
+            if group == _VARIABLES:
+                self._variables = self._variables.copy()
+            else:
+                self._groups[group] = self._groups[group].copy()
+
+    def _store(self, key, value):
+        """Store computed ``value``, even in values shared with other styles."""
+        # Writing in shared lists is only correct because styles share groups
+        # whose computed values are guaranteed to be equal: groups of inherited
+        # properties that are not cascaded, variables when no variable is
+        # cascaded, and computed values of anonymous styles with the same
+        # parent. Values that may differ between these styles are set by
+        # __setitem__, that copies shared groups first. Initial values shared
+        # by all styles are copied before storing any value.
+        if key in PROPERTY_INDEXES:
+            group, index = PROPERTY_INDEXES[key]
+            if self._initial & (1 << group):
+                self._unshare(group)
+            self._groups[group][index] = value
+        else:
+            self._variables[key] = value
+
+    def __getitem__(self, key):
+        try:
+            group, index = PROPERTY_INDEXES[key]
+        except KeyError:
+            value = self._variables.get(key, _MISSING)
+        else:
+            value = self._groups[group][index]
+        return self.__missing__(key) if value is _MISSING else value
+
+    def __setitem__(self, key, value):
+        if key in PROPERTY_INDEXES:
+            group, index = PROPERTY_INDEXES[key]
+            self._unshare(group)
+            self._groups[group][index] = value
+        else:
+            self._unshare(_VARIABLES)
+            self._variables[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in PROPERTY_INDEXES:
+            self[key] = _MISSING
+        else:
+            self._unshare(_VARIABLES)
+            del self._variables[key]
+
+    def __contains__(self, key):
+        if key in PROPERTY_INDEXES:
+            group, index = PROPERTY_INDEXES[key]
+            return self._groups[group][index] is not _MISSING
+        return key in self._variables
+
+    def __iter__(self):
+        for keys, values in zip(_PROPERTY_GROUPS, self._groups):
+            for key, value in zip(keys, values):
+                if value is not _MISSING:
+                    yield key
+        yield from self._variables
+
+    def __len__(self):
+        return len(self._variables) + sum(
+            len(values) - values.count(_MISSING) for values in self._groups)
+
+    @abstractmethod
+    def __missing__(self, key):
+        """Compute, store and return the value of ``key``."""
+
+
+class AnonymousStyle(Style):
     """Computed style used for anonymous boxes."""
+    __slots__ = ()
+
     def __init__(self, parent_style):
-        # border-*-style is none, so border-width computes to zero.
-        # Other than that, properties that would need computing are
-        # border-*-color, but they do not apply.
-        self.update({
-            'border_top_width': 0,
-            'border_bottom_width': 0,
-            'border_left_width': 0,
-            'border_right_width': 0,
-            'outline_width': 0,
-        })
         self.parent_style = parent_style
         self.specified = self
-        if parent_style:
-            self.cache = parent_style.cache
-        else:
-            self.cache = {'ratio_ch': {}, 'ratio_ex': {}}
+        self.font_config = (
+            None if parent_style is None else parent_style.font_config)
+        self._set_values(_ANONYMOUS_VALUES, cascaded=())
+        if isinstance(parent_style, Style):
+            # Values of anonymous styles only depend on their parent. Groups
+            # whose values are computed are shared by the anonymous styles of
+            # the same parent, so that these values are computed only once.
+            if parent_style._anonymous_groups is None:
+                parent_style._anonymous_groups = [
+                    _ANONYMOUS_VALUES[group].copy() for group in _ANONYMOUS_GROUPS]
+            for group, values in zip(
+                    _ANONYMOUS_GROUPS, parent_style._anonymous_groups):
+                self._groups[group] = values
+            self._initial &= ~_ANONYMOUS_MASK
 
     def copy(self):
-        copy = AnonymousStyle(self.parent_style)
-        copy.update(self)
-        return copy
+        return self._copy_values(AnonymousStyle(self.parent_style))
 
     def __missing__(self, key):
         if key in INHERITED or key[:2] == '__':
-            value = self[key] = self.parent_style[key]
+            value = self.parent_style[key]
         elif key == 'page':
             # page is not inherited but taken from the ancestor if 'auto'
-            value = self[key] = self.parent_style[key]
+            value = self.parent_style[key]
         elif key[:16] == 'text_decoration_':
-            value = self[key] = text_decoration(
+            value = text_decoration(
                 key, INITIAL_VALUES[key], self.parent_style[key], cascaded=False)
         else:
-            value = self[key] = INITIAL_VALUES[key]
+            value = INITIAL_VALUES[key]
+        self._store(key, value)
         return value
 
 
-class ComputedStyle(dict):
+class ComputedStyle(Style):
     """Computed style used for non-anonymous boxes."""
+    __slots__ = (
+        'base_url', 'cascaded', 'element', 'is_root_element', 'pseudo_type',
+        'root_style')
+
     def __init__(self, parent_style, cascaded, element, pseudo_type,
-                 root_style, base_url):
+                 root_style, base_url, font_config=None):
         self.specified = {}
         self.parent_style = parent_style
         self.cascaded = cascaded
@@ -650,18 +935,18 @@ class ComputedStyle(dict):
         self.pseudo_type = pseudo_type
         self.root_style = root_style
         self.base_url = base_url
-        if parent_style:
-            self.cache = parent_style.cache
+        if parent_style is not None:
+            self.font_config = parent_style.font_config
         else:
-            self.cache = {'ratio_ch': {}, 'ratio_ex': {}}
+            self.font_config = font_config
+        self._set_values(_INITIAL_VALUES, cascaded)
 
     def copy(self):
         copy = ComputedStyle(
             self.parent_style, self.cascaded, self.element, self.pseudo_type,
-            self.root_style, self.base_url)
-        copy.update(self)
+            self.root_style, self.base_url, self.font_config)
         copy.specified = self.specified.copy()
-        return copy
+        return self._copy_values(copy)
 
     def __missing__(self, key):
         if key == 'float':
@@ -692,34 +977,28 @@ class ComputedStyle(dict):
 
         if pending:
             # Property with pending values, validate them.
-            solved_tokens = []
-            for token in value.tokens:
-                tokens = resolve_var(self, token, parent_style)
-                if tokens is None:
-                    solved_tokens.append(token)
-                else:
-                    solved_tokens.extend(tokens)
-            original_key = key.replace('_', '-')
             try:
-                value = value.solve(solved_tokens, original_key)
+                value = solve_pending(self, value, key)
             except InvalidValues:
                 if key in INHERITED and parent_style is not None:
                     # Values in parent_style are already computed.
-                    self[key] = value = parent_style[key]
+                    value = parent_style[key]
+                    self._store(key, value)
                 else:
                     value = INITIAL_VALUES[key]
                     if key not in INITIAL_NOT_COMPUTED:
                         # The value is the same as when computed.
-                        self[key] = value
+                        self._store(key, value)
 
         if value == 'initial':
             value = [] if key[:2] == '__' else INITIAL_VALUES[key]
             if key not in INITIAL_NOT_COMPUTED:
                 # The value is the same as when computed.
-                self[key] = value
+                self._store(key, value)
         elif value == 'inherit':
             # Values in parent_style are already computed.
-            self[key] = value = parent_style[key]
+            value = parent_style[key]
+            self._store(key, value)
 
         if key[:16] == 'text_decoration_' and parent_style is not None:
             # Text decorations are not inherited but propagated. See
@@ -750,19 +1029,20 @@ class ComputedStyle(dict):
             # Value not computed yet: compute.
             value = COMPUTER_FUNCTIONS[key](self, key, value)
 
-        self[key] = value
+        self._store(key, value)
         return value
 
 
 def computed_from_cascaded(element, cascaded, parent_style, pseudo_type=None,
                            root_style=None, base_url=None,
-                           target_collector=None):
+                           target_collector=None, font_config=None):
     """Get a dict of computed style mixed from parent and cascaded styles."""
     if not cascaded and parent_style is not None:
         return AnonymousStyle(parent_style)
 
     style = ComputedStyle(
-        parent_style, cascaded, element, pseudo_type, root_style, base_url)
+        parent_style, cascaded, element, pseudo_type, root_style, base_url,
+        font_config)
     if target_collector and style['anchor']:
         target_collector.collect_anchor(style['anchor'])
     return style
@@ -885,6 +1165,139 @@ def parse_page_selectors(rule):
     return page_data
 
 
+def parse_stylesheet(source, encoding=None, protocol_encoding=None):
+    """Parse stylesheet ``source``, given as a string or as bytes."""
+    if isinstance(source, str):
+        # unicode, no encoding
+        return tinycss2.parse_stylesheet(source)
+    stylesheet, _ = tinycss2.parse_stylesheet_bytes(
+        source, environment_encoding=encoding,
+        protocol_encoding=protocol_encoding)
+    return stylesheet
+
+
+class ImportedRules:
+    """Preprocessed rules of an imported stylesheet.
+
+    Objects are given to :func:`preprocess_stylesheet` as matcher, font
+    configuration and counter styles, and record the rules they get. These
+    rules are then added to the stylesheets importing them.
+
+    The URLs of the stylesheets imported by the recorded stylesheet are
+    recorded too. These stylesheets are imported again each time the rules are
+    added, and are cached separately.
+
+    """
+    def __init__(self):
+        self.imports = []
+        self.selectors = []
+        self.page_rules = []
+        self.font_faces = []
+        self.counter_style = {}
+
+    def add_selector(self, selector, declarations):
+        self.selectors.append((selector, declarations))
+
+    def add_font_face(self, rule_descriptors, url_fetcher):
+        self.font_faces.append(rule_descriptors)
+
+    def add_to(self, device_media_type, matcher, page_rules, font_config,
+               counter_style, url_fetcher):
+        """Add recorded rules to a stylesheet and its document objects."""
+        # Import rules are before other rules.
+        for url in self.imports:
+            import_stylesheet(
+                device_media_type, url, url_fetcher, matcher, page_rules,
+                font_config, counter_style)
+        # Pending values keep validated values and reported errors, they are
+        # copied for each stylesheet.
+        copies = {}
+        for selector, declarations in self.selectors:
+            matcher.add_selector(
+                selector, _copy_pending_values(declarations, copies))
+        for rule, selector_list, declarations in self.page_rules:
+            page_rules.append((
+                rule, selector_list, _copy_pending_values(declarations, copies)))
+        if font_config is not None:
+            for rule_descriptors in self.font_faces:
+                font_config.add_font_face(rule_descriptors, url_fetcher)
+        for name, counter in self.counter_style.items():
+            if name.lower() in ('decimal', 'disc') and name.lower() in counter_style:
+                # See counters.parse_counter_style_name.
+                continue
+            # Counter styles are modified when they are resolved.
+            counter_style[name] = counter.copy()
+
+
+def preprocess_imported_stylesheet(device_media_type, base_url, source, encoding,
+                                   protocol_encoding, url_fetcher, matcher,
+                                   page_rules, font_config, counter_style):
+    """Preprocess imported stylesheet ``source``, using cached rules.
+
+    Rules are cached for each source, base URL and media type, so that the
+    stylesheets imported by multiple documents are parsed and preprocessed
+    only once. Stylesheets with errors are not cached, so that the errors are
+    logged for each document.
+
+    """
+    is_string = isinstance(source, str)
+    data = source.encode('utf-8', 'surrogatepass') if is_string else source
+    key = (
+        device_media_type, base_url, encoding, protocol_encoding, is_string,
+        md5(data, usedforsecurity=False).digest())
+    if (rules := _IMPORTED_RULES.get(key)) is not None:
+        count('import_cache_hits')
+    else:
+        rules = ImportedRules()
+        with collect_logs() as records:
+            preprocess_stylesheet(
+                device_media_type, base_url,
+                parse_stylesheet(source, encoding, protocol_encoding),
+                url_fetcher, rules, rules.page_rules, rules, rules.counter_style)
+        if not records:
+            if len(_IMPORTED_RULES) >= 256:
+                _IMPORTED_RULES.clear()
+            _IMPORTED_RULES[key] = rules
+    rules.add_to(
+        device_media_type, matcher, page_rules, font_config, counter_style,
+        url_fetcher)
+
+
+def _copy_pending_values(declarations, copies):
+    """Get ``declarations`` with copies of their pending values.
+
+    ``copies`` is a dictionary of the copies of declarations and values already
+    made, keyed by their ids, so that shared objects are copied once.
+
+    """
+    if id(declarations) not in copies:
+        if any(isinstance(value, Pending) for _, value, _ in declarations):
+            new_declarations = []
+            for name, value, important in declarations:
+                if isinstance(value, Pending):
+                    if id(value) not in copies:
+                        copies[id(value)] = value.copy()
+                    value = copies[id(value)]
+                new_declarations.append((name, value, important))
+            copies[id(declarations)] = new_declarations
+        else:
+            copies[id(declarations)] = declarations
+    return copies[id(declarations)]
+
+
+def import_stylesheet(device_media_type, url, url_fetcher, matcher, page_rules,
+                      font_config, counter_style):
+    """Fetch and preprocess stylesheet imported from ``url``."""
+    try:
+        CSS(
+            url=url, url_fetcher=url_fetcher, media_type=device_media_type,
+            font_config=font_config, counter_style=counter_style,
+            matcher=matcher, page_rules=page_rules)
+    except URLFetchingError as exception:
+        LOGGER.error('Failed to load stylesheet at %s : %s', url, exception)
+        LOGGER.debug('Error while loading stylesheet:', exc_info=exception)
+
+
 def preprocess_stylesheet(device_media_type, base_url, stylesheet_rules, url_fetcher,
                           matcher, page_rules, font_config, counter_style,
                           ignore_imports=False):
@@ -971,15 +1384,13 @@ def preprocess_stylesheet(device_media_type, base_url, stylesheet_rules, url_fet
                 continue
             if not media_queries.evaluate_media_query(media, device_media_type):
                 continue
-            if url is not None:
-                try:
-                    CSS(
-                        url=url, url_fetcher=url_fetcher, media_type=device_media_type,
-                        font_config=font_config, counter_style=counter_style,
-                        matcher=matcher, page_rules=page_rules)
-                except URLFetchingError as exception:
-                    LOGGER.error('Failed to load stylesheet at %s : %s', url, exception)
-                    LOGGER.debug('Error while loading stylesheet:', exc_info=exception)
+            if isinstance(matcher, ImportedRules):
+                # Imported when the recorded rules are added.
+                matcher.imports.append(url)
+            else:
+                import_stylesheet(
+                    device_media_type, url, url_fetcher, matcher, page_rules,
+                    font_config, counter_style)
 
         elif rule.type == 'at-rule' and rule.lower_at_keyword == 'media':
             media = media_queries.parse_media_query(rule.prelude)
@@ -1143,4 +1554,5 @@ def get_all_computed_styles(html, user_stylesheets=None, presentational_hints=Fa
     for sheet in (user_stylesheets or []):
         sheets.append((sheet, 'user', None))
 
-    return StyleFor(html, sheets, presentational_hints, target_collector)
+    return StyleFor(
+        html, sheets, presentational_hints, target_collector, font_config)
@@ -1,5 +1,6 @@
 """Convert specified property values into computed values."""
 
+from functools import lru_cache
 from math import pi
 from urllib.parse import unquote
 
@@ -7,6 +8,7 @@ from tinycss2.color4 import parse_color
 
 from ..logger import LOGGER
 from ..text.ffi import FROM_UNITS, ffi, pango
+from ..text.fonts import FontConfiguration
 from ..text.line_break import Layout, first_line_metrics
 from ..urls import get_link_attribute
 from .properties import INITIAL_VALUES, ZERO_PIXELS, Dimension
@@ -280,22 +282,17 @@ def length(style, name, value, font_size=None, pixels_only=False):
     if unit == 'px':
         return value.value if pixels_only else value
     elif unit in LENGTHS_TO_PIXELS:
-        # Convert absolute lengths to pixels
-        result = value.value * LENGTHS_TO_PIXELS[unit]
+        return _pixels(value, 1, pixels_only)
     elif unit in ('em', 'ex', 'ch', 'rem'):
+        if unit == 'rem':
+            return _pixels(value, style.root_style['font_size'], pixels_only)
         if font_size is None:
             font_size = style['font_size']
-        if unit == 'ex':
-            # TODO: use context to use @font-face fonts
-            ratio = character_ratio(style, 'x')
-            result = value.value * font_size * ratio
-        elif unit == 'ch':
-            ratio = character_ratio(style, '0')
-            result = value.value * font_size * ratio
-        elif unit == 'em':
-            result = value.value * font_size
-        elif unit == 'rem':
-            result = value.value * style.root_style['font_size']
+        if unit == 'em':
+            return _pixels(value, font_size, pixels_only)
+        # Ratios depend on the font, results are not shared.
+        ratio = character_ratio(style, 'x' if unit == 'ex' else '0')
+        result = value.value * font_size * ratio
     else:
         # A percentage or 'auto': no conversion needed.
         return value
@@ -303,6 +300,21 @@ def length(style, name, value, font_size=None, pixels_only=False):
     return result if pixels_only else Dimension(result, 'px')
 
 
+@lru_cache(maxsize=4096)
+def _pixels(value, font_size, pixels_only):
+    """Convert absolute, ``em`` or ``rem`` length ``value`` to pixels.
+
+    ``font_size`` is the font size relative lengths depend on. Results are
+    cached, so that elements with the same lengths share their computed values.
+
+    """
+    if value.unit in LENGTHS_TO_PIXELS:
+        result = value.value * LENGTHS_TO_PIXELS[value.unit]
+    else:
+        result = value.value * font_size
+    return result if pixels_only else Dimension(result, 'px')
+
+
 @register_computer('bleed-left')
 @register_computer('bleed-right')
 @register_computer('bleed-top')
@@ -669,14 +681,20 @@ def line_height(style, name, value):
     if value == 'normal':
         return value
     elif not value.unit:
-        return ('NUMBER', value.value)
+        return _line_height('NUMBER', value.value)
     elif value.unit == '%':
         factor = value.value / 100
         font_size_value = style['font_size']
         pixels = factor * font_size_value
     else:
         pixels = length(style, name, value, pixels_only=True)
-    return ('PIXELS', pixels)
+    return _line_height('PIXELS', pixels)
+
+
+@lru_cache(maxsize=1024)
+def _line_height(kind, value):
+    """Get ``line-height`` value, shared by elements with the same value."""
+    return (kind, value)
 
 
 @register_computer('anchor')
@@ -793,13 +811,17 @@ def strut_layout(style, context=None):
 
 
 def character_ratio(style, character):
-    """Return the ratio of 1ex/font_size or 1ch/font_size."""
-    # TODO: use context to use @font-face fonts
+    """Return the ratio of 1ex/font_size or 1ch/font_size.
 
+    Ratios are measured with the fonts of the document, and cached in its font
+    configuration to be shared with the following documents.
+
+    """
     assert character in ('x', '0')
 
-    cache = style.cache[f'ratio_{"ex" if character == "x" else "ch"}']
-    cache_key = _font_style_cache_key(style)
+    font_config = style.font_config or FontConfiguration()
+    cache = font_config.character_ratios
+    cache_key = (character, _font_style_cache_key(style))
     if cache_key in cache:
         return cache[cache_key]
 
@@ -810,7 +832,7 @@ def character_ratio(style, character):
     # Random big value
     style['font_size'] = 1000
 
-    layout = Layout(context=None, style=style)
+    layout = Layout(context=None, style=style, font_config=font_config)
     layout.set_text(character)
     line, _ = layout.get_first_line()
 
@@ -0,0 +1,190 @@
+"""Compile and match selectors, rejecting selectors early using ancestors.
+
+Selectors with descendant or child combinators need ancestors with given tags,
+ids or classes. These requirements are stored with the compiled selectors, and
+the matcher rejects selectors whose required ancestors are missing, without
+testing the selectors against the elements.
+
+Matchers can be pickled, their selectors are compiled again when they are
+loaded.
+
+"""
+
+import cssselect2
+import tinycss2
+from cssselect2 import parser
+from cssselect2.compiler import CompiledSelector
+
+from ..stats import count
+
+
+def compile_selector_list(prelude):
+    """Compile a list of selectors, as :func:`cssselect2.compile_selector_list`.
+
+    Compiled selectors have an additional ``ancestor_keys`` attribute, a tuple
+    of keys of the tags, ids and classes required in the ancestors of the
+    matched elements, and a ``source`` attribute, a tuple of the serialized
+    selector list and of the index of the selector in this list.
+
+    """
+    text = prelude if isinstance(prelude, str) else tinycss2.serialize(prelude)
+    selectors = []
+    for index, parsed_selector in enumerate(parser.parse(prelude)):
+        selector = CompiledSelector(parsed_selector)
+        selector.ancestor_keys = _get_ancestor_keys(parsed_selector.parsed_tree)
+        selector.source = (text, index)
+        selectors.append(selector)
+    return selectors
+
+
+def _get_ancestor_keys(node):
+    """Get keys required in the ancestors of the subject of selector ``node``."""
+    keys = set()
+    while isinstance(node, parser.CombinedSelector):
+        combinator, node = node.combinator, node.left
+        if combinator in (' ', '>'):
+            # Compound selectors followed by a descendant or child combinator
+            # match ancestors of the subject, even through sibling combinators.
+            compound = node.right if isinstance(node, parser.CombinedSelector) else node
+            for selector in compound.simple_selectors:
+                if isinstance(selector, parser.LocalNameSelector):
+                    keys.add(selector.lower_local_name.lower())
+                elif isinstance(selector, parser.IDSelector):
+                    keys.add(f'#{selector.ident}')
+                elif isinstance(selector, parser.ClassSelector):
+                    keys.add(f'.{selector.class_name}')
+    return tuple(keys)
+
+
+def _get_element_keys(element):
+    """Get keys of the tag, id and classes of ``element``."""
+    keys = [element.local_name.lower()]
+    if element.id is not None:
+        keys.append(f'#{element.id}')
+    keys.extend(f'.{class_name}' for class_name in element.classes)
+    return keys
+
+
+class Ancestors:
+    """Keys of the ancestors of the current element, while walking a tree.
+
+    Elements must be given to :meth:`set_element` in tree order.
+
+    """
+    def __init__(self):
+        self._counts = {}
+        self._stack = []
+        self._current = None
+
+    def __contains__(self, key):
+        return key in self._counts
+
+    def set_element(self, element):
+        """Set ``element`` as current element, its parent as last ancestor."""
+        if self._current is not None:
+            # The previous element may be the parent of the new one.
+            _, keys = self._current
+            for key in keys:
+                self._counts[key] = self._counts.get(key, 0) + 1
+            self._stack.append(self._current)
+        parent = element.parent
+        parent = None if parent is None else parent.etree_element
+        while self._stack and self._stack[-1][0] is not parent:
+            _, keys = self._stack.pop()
+            for key in keys:
+                if self._counts[key] == 1:
+                    del self._counts[key]
+                else:
+                    self._counts[key] -= 1
+        self._current = (element.etree_element, _get_element_keys(element))
+
+
+class Matcher(cssselect2.Matcher):
+    """Selectors storage, using ancestors to reject selectors.
+
+    Selectors should be compiled by :func:`compile_selector_list`.
+
+    """
+    def __init__(self):
+        super().__init__()
+        self._sources = {}
+
+    def __getstate__(self):
+        # Selector tests are functions, keep the sources of their selectors.
+        state = self.__dict__.copy()
+        del state['_sources']
+        return _map_selector_tests(state, self._sources.__getitem__)
+
+    def __setstate__(self, state):
+        tests, sources = {}, {}
+
+        def compile_test(source):
+            text, index = source
+            if text not in tests:
+                tests[text] = [
+                    selector.test for selector in compile_selector_list(text)]
+            test = tests[text][index]
+            sources[test] = source
+            return test
+
+        self.__dict__.update(_map_selector_tests(state, compile_test))
+        self._sources = sources
+
+    def add_selector(self, selector, payload):
+        keys = getattr(selector, 'ancestor_keys', ())
+        if (source := getattr(selector, 'source', None)) is not None:
+            self._sources[selector.test] = source
+        super().add_selector(selector, (keys, payload))
+
+    def match(self, element, ancestors=None):
+        """Match selectors against the given element.
+
+        If ``ancestors`` is an :class:`Ancestors` object whose current element
+        is ``element``, selectors with missing ancestors are rejected.
+
+        """
+        relevant_selectors = []
+        rejected = 0
+        for selectors in self._candidates(element):
+            for test, specificity, order, pseudo, (keys, payload) in selectors:
+                if ancestors is not None and keys:
+                    if not all(key in ancestors for key in keys):
+                        rejected += 1
+                        continue
+                if test(element):
+                    relevant_selectors.append(
+                        (specificity, order, pseudo, payload))
+        if rejected:
+            count('rejected_selectors', rejected)
+        relevant_selectors.sort()
+        return relevant_selectors
+
+    def _candidates(self, element):
+        """Yield lists of selectors that may match ``element``."""
+        if element.id is not None and element.id in self.id_selectors:
+            yield self.id_selectors[element.id]
+        for class_name in element.classes:
+            if class_name in self.class_selectors:
+                yield self.class_selectors[class_name]
+        lower_name = cssselect2.compiler.ascii_lower(element.local_name)
+        if lower_name in self.lower_local_name_selectors:
+            yield self.lower_local_name_selectors[lower_name]
+        if element.namespace_url in self.namespace_selectors:
+            yield self.namespace_selectors[element.namespace_url]
+        if 'lang' in element.etree_element.attrib:
+            yield self.lang_attr_selectors
+        yield self.other_selectors
+
+
+def _map_selector_tests(matcher_attributes, function):
+    """Apply ``function`` to the selector tests of matcher attributes."""
+    attributes = {}
+    for key, value in matcher_attributes.items():
+        if isinstance(value, dict):
+            value = {
+                name: [(function(test), *entry) for test, *entry in entries]
+                for name, entries in value.items()}
+        elif isinstance(value, list):
+            value = [(function(test), *entry) for test, *entry in value]
+        attributes[key] = value
+    return attributes
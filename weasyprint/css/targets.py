@@ -6,8 +6,6 @@ targeted anchors has been done.
 
 """
 
-import copy
-
 from ..logger import LOGGER
 
 
@@ -134,9 +132,7 @@ class TargetCollector:
             # Store the counter_values in the target_box like
             # compute_content_list does.
             if target_box.cached_counter_values is None:
-                target_box.cached_counter_values = {
-                    key: value.copy() for key, value
-                    in target_counter_values.items()}
+                target_box.cached_counter_values = target_counter_values.copy()
 
     def collect_missing_counters(self, parent_box, css_token,
                                  parse_again_function, missing_counters,
@@ -188,8 +184,7 @@ class TargetCollector:
         if item and item.state == 'up-to-date':
             item.page_maker_index = page_maker_index
             if item.cached_page_counter_values != page_counter_values:
-                item.cached_page_counter_values = copy.deepcopy(
-                    page_counter_values)
+                item.cached_page_counter_values = page_counter_values.copy()
 
                 # Spread the news: update boxes affected by a change in the
                 # anchor's page counter values.
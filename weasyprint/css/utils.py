@@ -104,6 +104,16 @@ class Pending(ABC):
         self.tokens = tokens
         self.name = name
         self._reported_error = False
+        # Validated values, see weasyprint.css.solve_pending.
+        self.solved = {}
+
+    def copy(self):
+        """Get a copy of the value, with no validated values or reported error."""
+        pending = type(self).__new__(type(self))
+        pending.__dict__.update(self.__dict__)
+        pending._reported_error = False
+        pending.solved = {}
+        return pending
 
     @abstractmethod
     def validate(self, tokens, wanted_key):
@@ -1,7 +1,10 @@
 """Document generation management."""
 
+import contextlib
+import copy
 import functools
 import io
+import pickle
 from hashlib import md5
 from pathlib import Path
 
@@ -10,17 +13,44 @@ from .anchors import gather_anchors, make_page_bookmark_tree
 from .css import get_all_computed_styles
 from .css.counters import CounterStyle
 from .css.targets import TargetCollector
-from .draw import draw_page, stacked
+from .draw import build_display_list, stacked
 from .formatting_structure.build import build_formatting_structure
 from .html import get_html_metadata
 from .images import get_image_from_uri as original_get_image_from_uri
 from .layout import LayoutContext, layout_document
-from .logger import PROGRESS_LOGGER
+from .logger import LOGGER, PROGRESS_LOGGER
 from .matrix import Matrix
-from .pdf import VARIANTS, generate_pdf
+from .pdf import VARIANTS, generate_pdf, paint_page_form
 from .pdf.metadata import generate_rdf_metadata
+from .stats import Statistics, count, step
 from .text.fonts import FontConfiguration
 
+# Style properties used to draw form fields, kept when pages are serialized
+FORM_STYLE_KEYS = (
+    'color', 'font_family', 'font_size', 'font_stretch', 'font_style',
+    'font_variant_caps', 'font_variation_settings', 'font_weight')
+
+
+class _PaintingPickler(pickle.Pickler):
+    """Pickler storing registries used by a painted page as references."""
+    def __init__(self, file, registries):
+        super().__init__(file)
+        self._registries = {
+            id(registry): index for index, registry in enumerate(registries)}
+
+    def persistent_id(self, obj):
+        return self._registries.get(id(obj))
+
+
+class _PaintingUnpickler(pickle.Unpickler):
+    """Unpickler replacing references by registries used by a painted page."""
+    def __init__(self, file, registries):
+        super().__init__(file)
+        self._registries = registries
+
+    def persistent_load(self, index):
+        return self._registries[index]
+
 
 class Page:
     """Represents a single rendered page.
@@ -28,6 +58,12 @@ class Page:
     Should be obtained from :attr:`Document.pages` but not
     instantiated directly.
 
+    Pages can be pickled, so that pages laid out in different processes can be
+    combined into one PDF. Serialized pages keep their painted content instead
+    of their boxes, this content is not tagged when they are included in tagged
+    PDF files. The boxes of their :attr:`links` are :obj:`None`, and the styles
+    of their :attr:`forms` only keep the properties used to draw form fields.
+
     """
 
     def __init__(self, page_box):
@@ -79,12 +115,63 @@ class Page:
 
         gather_anchors(page_box, self.anchors, self.links, self.bookmarks, self.forms)
         self._page_box = page_box
+        self._display_list = None
+        self._painting = self._fonts = self._images = None
+
+    def _get_painted_state(self, fonts):
+        """Get attributes replacing the boxes by the painted page."""
+        form, fonts, images = paint_page_form(self, fonts)
+        # Fonts and images are kept out of the painted form, so that pages of
+        # a serialized document share their data.
+        painting = io.BytesIO()
+        _PaintingPickler(painting, (fonts, images)).dump(form)
+        return {
+            '_page_box': None,
+            '_display_list': None,
+            '_painting': painting.getvalue(),
+            '_fonts': fonts,
+            '_images': images,
+            'links': [
+                (link_type, target, rectangle, None)
+                for link_type, target, rectangle, _ in self.links],
+            'forms': {
+                form: [
+                    (element, {key: style[key] for key in FORM_STYLE_KEYS},
+                     rectangle)
+                    for element, style, rectangle in inputs]
+                for form, inputs in self.forms.items()},
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self._page_box is not None:
+            # Boxes hold Pango objects that can’t be serialized, keep the
+            # painted page and its resources instead.
+            state.update(self._get_painted_state({}))
+        return state
 
     def paint(self, stream, scale=1):
         """Paint the page into the PDF file."""
         with stacked(stream):
             stream.transform(a=scale, d=scale)
-            draw_page(self._page_box, stream)
+            if self._page_box is None:
+                if stream.tagged:
+                    LOGGER.warning(
+                        'Serialized page included in tagged PDF, '
+                        'its content is not tagged')
+                # Painted objects are loaded again for each PDF, as they are
+                # modified when the PDF is generated.
+                images = {
+                    name: {**image, 'dpi_ratios': set(image['dpi_ratios'])}
+                    for name, image in self._images.items()}
+                form = _PaintingUnpickler(
+                    io.BytesIO(self._painting), (self._fonts, images)).load()
+                stream.draw_x_object(stream.add_form(form, self._fonts, images))
+            else:
+                # The display list is built once, and drawn again for each PDF.
+                if self._display_list is None:
+                    self._display_list = build_display_list(self._page_box)
+                self._display_list.draw(stream)
 
 
 class DocumentMetadata:
@@ -201,6 +288,9 @@ class Document:
     <weasyprint.default_url_fetcher>` function, and a :class:`font_config
     <weasyprint.text.fonts.FontConfiguration>`.
 
+    Documents can be pickled. Their pages are then serialized as painted pages
+    sharing their fonts and images, see :class:`Page`.
+
     """
 
     @classmethod
@@ -213,16 +303,17 @@ class Document:
             cache = {}
         elif not isinstance(cache, (dict, DiskCache)):
             cache = DiskCache(cache)
-        for css in options['stylesheets'] or []:
-            if not hasattr(css, 'matcher'):
-                css = CSS(
-                    guess=css, media_type=html.media_type,
-                    font_config=font_config, counter_style=counter_style)
-            user_stylesheets.append(css)
-        style_for = get_all_computed_styles(
-            html, user_stylesheets, options['presentational_hints'],
-            font_config, counter_style, page_rules, target_collector,
-            options['pdf_forms'])
+        with step('cascade'):
+            for css in options['stylesheets'] or []:
+                if not hasattr(css, 'matcher'):
+                    css = CSS(
+                        guess=css, media_type=html.media_type,
+                        font_config=font_config, counter_style=counter_style)
+                user_stylesheets.append(css)
+            style_for = get_all_computed_styles(
+                html, user_stylesheets, options['presentational_hints'],
+                font_config, counter_style, page_rules, target_collector,
+                options['pdf_forms'])
         get_image_from_uri = functools.partial(
             original_get_image_from_uri, cache=cache,
             url_fetcher=html.url_fetcher, options=options)
@@ -234,26 +325,39 @@ class Document:
 
     @classmethod
     def _render(cls, html, font_config, counter_style, options):
-        if font_config is None:
-            font_config = FontConfiguration()
-
-        if counter_style is None:
-            counter_style = CounterStyle()
-
-        context = cls._build_layout_context(
-            html, font_config, counter_style, options)
-
-        root_box = build_formatting_structure(
-            html.etree_element, context.style_for, context.get_image_from_uri,
-            html.base_url, context.target_collector, counter_style,
-            context.footnotes)
-
-        page_boxes = layout_document(html, root_box, context)
-        rendering = cls(
-            [Page(page_box) for page_box in page_boxes],
-            DocumentMetadata(**get_html_metadata(html)),
-            html.url_fetcher, font_config)
+        if options['stats']:
+            statistics = Statistics()
+            collect = statistics.collect()
+        else:
+            statistics, collect = None, contextlib.nullcontext()
+        with collect:
+            if font_config is None:
+                font_config = FontConfiguration()
+
+            if counter_style is None:
+                counter_style = CounterStyle()
+
+            context = cls._build_layout_context(
+                html, font_config, counter_style, options)
+
+            with step('build'):
+                root_box = build_formatting_structure(
+                    html.etree_element, context.style_for,
+                    context.get_image_from_uri, html.base_url,
+                    context.target_collector, counter_style, context.footnotes)
+
+            with step('layout'):
+                page_boxes = list(layout_document(html, root_box, context))
+            if statistics is not None:
+                count('boxes', sum(
+                    1 for page_box in page_boxes
+                    for _ in page_box.descendants()))
+            rendering = cls(
+                [Page(page_box) for page_box in page_boxes],
+                DocumentMetadata(**get_html_metadata(html)),
+                html.url_fetcher, font_config)
         rendering._html = html
+        rendering.stats = statistics
         return rendering
 
     def __init__(self, pages, metadata, url_fetcher, font_config):
@@ -275,6 +379,34 @@ class Document:
         # rendering is destroyed. This is needed as font_config.__del__ removes
         # fonts that may be used when rendering
         self.font_config = font_config
+        #: A :class:`weasyprint.stats.Statistics` object, with timings and
+        #: counters collected while the document is rendered and written, or
+        #: :obj:`None` if the ``stats`` option is not set. HTML parsing is
+        #: measured only when the :class:`HTML <weasyprint.HTML>` object is
+        #: created in a :meth:`Statistics.collect()
+        #: <weasyprint.stats.Statistics.collect>` context.
+        self.stats = None
+
+    def __getstate__(self):
+        # Font configuration and HTML tree are only needed for layout.
+        state = self.__dict__.copy()
+        fonts = {}
+        state['pages'] = []
+        for page in self.pages:
+            if page._page_box is not None:
+                # Paint copies of pages to serialize fonts and images only
+                # once.
+                page = copy.copy(page)
+                page.__dict__.update(page._get_painted_state(fonts))
+            state['pages'].append(page)
+        state.pop('_html', None)
+        state['fonts'] = {}
+        state['font_config'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.font_config = FontConfiguration()
 
     def build_element_structure(self, structure, etree_element=None):
         if etree_element is None:
@@ -388,7 +520,15 @@ class Document:
             if 'identifier' in properties and not options['pdf_identifier']:
                 options['pdf_identifier'] = properties['identifier']
 
-        pdf = generate_pdf(self, target, zoom, **options)
+        if options['stats'] and self.stats is None:
+            self.stats = Statistics()
+        if self.stats is None:
+            collect = contextlib.nullcontext
+        else:
+            collect = self.stats.collect
+
+        with collect():
+            pdf = generate_pdf(self, target, zoom, **options)
 
         if finisher:
             finisher(self, pdf)
@@ -397,13 +537,14 @@ class Document:
         compress = not options['uncompressed_pdf']
         version = options['pdf_version']
 
-        if target is None:
-            output = io.BytesIO()
-            pdf.write(output, version, identifier, compress)
-            return output.getvalue()
+        with collect(), step('write'):
+            if target is None:
+                output = io.BytesIO()
+                pdf.write(output, version, identifier, compress)
+                return output.getvalue()
 
-        if hasattr(target, 'write'):
-            pdf.write(target, version, identifier, compress)
-        else:
-            with open(target, 'wb') as fd:
-                pdf.write(fd, version, identifier, compress)
+            if hasattr(target, 'write'):
+                pdf.write(target, version, identifier, compress)
+            else:
+                with open(target, 'wb') as fd:
+                    pdf.write(fd, version, identifier, compress)
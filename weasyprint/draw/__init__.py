@@ -4,45 +4,64 @@ import operator
 from math import floor
 from xml.etree import ElementTree
 
+from ..anchors import rectangle_aabb
 from ..formatting_structure import boxes
 from ..images import SVGImage
 from ..layout import replaced
+from ..layout.absolute import AbsolutePlaceholder
 from ..layout.background import BackgroundLayer
 from ..matrix import Matrix
 from ..stacking import StackingContext
+from ..stats import count
 from .border import draw_border, draw_line, draw_outline, rounded_box, set_mask_border
 from .color import styled_color
+from .display_list import DisplayList
 from .stack import stacked
 from .text import draw_text
 
 
-def draw_page(page, stream):
-    """Draw the given PageBox."""
+def build_display_list(page):
+    """Build the optimized display list of the given PageBox."""
+    count('display_lists')
+    display_list = DisplayList()
     marks = page.style['marks']
     stacking_context = StackingContext.from_page(page)
-    draw_background(
-        stream, stacking_context.box.background, clip_box=False, bleed=page.bleed,
-        marks=marks)
-    set_mask_border(stream, page)
-    draw_background(stream, page.canvas_background, clip_box=False)
-    draw_border(stream, page)
-    draw_stacking_context(stream, stacking_context)
+    add_background(
+        display_list, stacking_context.box.background, clip_box=False,
+        bleed=page.bleed, marks=marks)
+    add_mask_border(display_list, page)
+    add_background(display_list, page.canvas_background, clip_box=False)
+    add_border(display_list, page)
+    add_stacking_context(display_list, stacking_context)
+    display_list.optimize(page.bleed_area)
+    return display_list
+
+
+def add_stacking_context(display_list, stacking_context):
+    """Add a ``stacking_context`` to ``display_list``."""
+    box = stacking_context.box
+
+    if box.transformation_matrix and not box.transformation_matrix.determinant:
+        # Nothing is drawn, only keep the marked content.
+        with stacked(display_list):
+            display_list.begin_marked_content(box, mcid=True)
+            display_list.end_marked_content()
+        return
 
+    # Margin boxes are often identical on many pages, draw them in groups that
+    # are shared by these pages.
+    shared_group = isinstance(box, boxes.MarginBox)
+    if shared_group:
+        display_list.begin_group(get_ink_rectangle(box))
 
-def draw_stacking_context(stream, stacking_context):
-    """Draw a ``stacking_context`` on ``stream``."""
     # See https://www.w3.org/TR/CSS2/zindex.html.
-    with stacked(stream):
-        box = stacking_context.box
-
-        stream.begin_marked_content(box, mcid=True)
+    with stacked(display_list):
+        display_list.begin_marked_content(box, mcid=True)
 
         # Apply the viewport_overflow to the html box, see #35.
         if box.is_for_root_element and (
                 stacking_context.page.style['overflow'] != 'visible'):
-            rounded_box(stream, stacking_context.page.rounded_padding_box())
-            stream.clip()
-            stream.end()
+            display_list.clip(stacking_context.page.rounded_padding_box())
 
         if box.is_absolutely_positioned() and box.style['clip']:
             top, right, bottom, left = box.style['clip']
@@ -54,35 +73,28 @@ def draw_stacking_context(stream, stacking_context):
                 bottom = box.border_height()
             if left == 'auto':
                 left = box.border_width()
-            stream.rectangle(
+            display_list.clip((
                 box.border_box_x() + right, box.border_box_y() + top,
-                left - right, bottom - top)
-            stream.clip()
-            stream.end()
+                left - right, bottom - top, (0, 0), (0, 0), (0, 0), (0, 0)))
 
         if box.style['opacity'] < 1:
-            original_stream = stream
-            stream = stream.add_group(*stream.page_rectangle)
+            display_list.begin_group(get_ink_rectangle(box), box.style['opacity'])
 
         if box.transformation_matrix:
-            if box.transformation_matrix.determinant:
-                stream.transform(*box.transformation_matrix.values)
-            else:
-                stream.end_marked_content()
-                return
+            display_list.transform(*box.transformation_matrix.values)
 
-        # Point 1 is done in draw_page.
+        # Point 1 is done in build_display_list.
 
         # Point 2.
         if isinstance(box, (boxes.BlockBox, boxes.MarginBox,
                             boxes.InlineBlockBox, boxes.TableCellBox,
                             boxes.FlexContainerBox, boxes.ReplacedBox)):
-            set_mask_border(stream, box)
+            add_mask_border(display_list, box)
             # The canvas background was removed by layout_backgrounds
-            draw_background(stream, box.background)
-            draw_border(stream, box)
+            add_background(display_list, box.background)
+            add_border(display_list, box)
 
-        with stacked(stream):
+        with stacked(display_list):
             # Dont clip the page box, see #35.
             clip = (
                 box.style['overflow'] != 'visible' and
@@ -91,64 +103,188 @@ def draw_stacking_context(stream, stacking_context):
                 # Only clip the content and the children:
                 # - the background is already clipped,
                 # - the border must *not* be clipped.
-                rounded_box(stream, box.rounded_padding_box())
-                stream.clip()
-                stream.end()
+                display_list.clip(box.rounded_padding_box())
 
             # Point 3.
             for child_context in stacking_context.negative_z_contexts:
-                draw_stacking_context(stream, child_context)
+                add_stacking_context(display_list, child_context)
 
             # Point 4.
             for block in stacking_context.block_level_boxes:
-                set_mask_border(stream, block)
+                add_mask_border(display_list, block)
 
                 if isinstance(block, boxes.TableBox):
-                    draw_table(stream, block)
+                    add_table(display_list, block, stacking_context)
                 else:
-                    draw_background(stream, block.background)
-                    draw_border(stream, block)
+                    add_background(display_list, block.background)
+                    add_border(display_list, block)
 
             # Point 5.
             for child_context in stacking_context.float_contexts:
-                draw_stacking_context(stream, child_context)
+                add_stacking_context(display_list, child_context)
 
             # Point 6.
             if isinstance(box, boxes.InlineBox):
-                draw_inline_level(stream, stacking_context.page, box)
+                add_inline_level(display_list, stacking_context, box)
 
             # Point 7.
             for block in (box, *stacking_context.blocks_and_cells):
                 if isinstance(block, boxes.ReplacedBox):
-                    draw_replacedbox(stream, block)
+                    add_replacedbox(display_list, block)
                 elif block.children:
                     if block != box:
-                        stream.begin_marked_content(block, mcid=True)
+                        display_list.begin_marked_content(block, mcid=True)
                     if isinstance(block.children[-1], boxes.LineBox):
-                        for child in block.children:
-                            draw_inline_level(stream, stacking_context.page, child)
+                        for child in stacking_context.box_children(block):
+                            add_inline_level(display_list, stacking_context, child)
                     if block != box:
-                        stream.end_marked_content()
+                        display_list.end_marked_content()
 
             # Point 8.
             for child_context in stacking_context.zero_z_contexts:
-                draw_stacking_context(stream, child_context)
+                add_stacking_context(display_list, child_context)
 
             # Point 9.
             for child_context in stacking_context.positive_z_contexts:
-                draw_stacking_context(stream, child_context)
+                add_stacking_context(display_list, child_context)
 
         # Point 10.
-        draw_outline(stream, box)
+        display_list.paint(None, draw_outline, box, stacking_context)
 
         if box.style['opacity'] < 1:
-            group_id = stream.id
-            stream = original_stream
-            with stacked(stream):
-                stream.set_alpha(box.style['opacity'], stroke=True, fill=True)
-                stream.draw_x_object(group_id)
+            display_list.end_group()
+
+        display_list.end_marked_content()
+
+    if shared_group:
+        display_list.end_group()
 
-        stream.end_marked_content()
+
+def get_ink_rectangle(box):
+    """Get the rectangle including everything drawn for ``box``.
+
+    The rectangle is ``(x, y, width, height)``, it includes the children and the
+    transformation of ``box``. Return ``None`` if this rectangle is unknown.
+
+    """
+    boundaries = _get_ink_boundaries(box)
+    if boundaries is not None:
+        x1, y1, x2, y2 = boundaries
+        return x1, y1, x2 - x1, y2 - y1
+
+
+def _get_ink_boundaries(box):
+    if isinstance(box, AbsolutePlaceholder):
+        box = box._box
+
+    # Borders drawn outside of the border box are not supported.
+    style = box.style
+    if 'none' not in (style['border_image_source'][0], style['mask_border_source'][0]):
+        return
+    if isinstance(box, boxes.TableBox) and style['border_collapse'] == 'collapse':
+        return
+    if isinstance(box, boxes.ReplacedBox) and isinstance(box.replacement, SVGImage):
+        return
+
+    if isinstance(box, boxes.TextBox):
+        # Glyphs and text decorations may be drawn outside of the text box.
+        margin = style['font_size']
+        x1, y1 = box.position_x - margin, box.position_y - margin
+        x2 = box.position_x + box.width + margin
+        y2 = box.position_y + box.height + margin
+    else:
+        margin = max(0, style['outline_width'] + style['outline_offset'])
+        x1 = box.border_box_x() - margin
+        y1 = box.border_box_y() - margin
+        x2 = box.border_box_x() + box.border_width() + margin
+        y2 = box.border_box_y() + box.border_height() + margin
+    if isinstance(box, boxes.ReplacedBox):
+        width, height, x, y = replaced.replacedbox_layout(box)
+        x1, y1, x2, y2 = min(x1, x), min(y1, y), max(x2, x + width), max(y2, y + height)
+
+    for child in box.children:
+        child_boundaries = _get_ink_boundaries(child)
+        if child_boundaries is None:
+            return
+        child_x1, child_y1, child_x2, child_y2 = child_boundaries
+        x1, y1 = min(x1, child_x1), min(y1, child_y1)
+        x2, y2 = max(x2, child_x2), max(y2, child_y2)
+
+    return rectangle_aabb(box.transformation_matrix, x1, y1, x2 - x1, y2 - y1)
+
+
+def add_background(display_list, bg, clip_box=True, bleed=None, marks=()):
+    """Add the background color and image to ``display_list``.
+
+    Background colors clipped to rectangles are added as fills, other
+    backgrounds are drawn by :func:`draw_background`.
+
+    """
+    if bg is None:
+        return
+
+    if not clip_box:
+        display_list.paint(None, draw_background, bg, False, bleed, marks)
+        return
+
+    clipped_boxes = bg.layers[-1].clipped_boxes
+    color_only = all(layer.image is None or 0 in layer.size for layer in bg.layers)
+    if color_only:
+        if bg.color.alpha == 0:
+            return
+        rectangles = all(
+            0 in corner for box in clipped_boxes for corner in box[4:])
+        if rectangles and (len(clipped_boxes) == 1 or bg.color.alpha == 1):
+            for box in clipped_boxes:
+                rectangle = _intersect(box[:4], bg.layers[-1].painting_area)
+                if rectangle is not None:
+                    display_list.fill(rectangle, bg.color)
+            return
+
+    bounding_box = None
+    if clipped_boxes:
+        x1 = min(box[0] for box in clipped_boxes)
+        y1 = min(box[1] for box in clipped_boxes)
+        x2 = max(box[0] + box[2] for box in clipped_boxes)
+        y2 = max(box[1] + box[3] for box in clipped_boxes)
+        bounding_box = (x1, y1, x2 - x1, y2 - y1)
+    display_list.paint(bounding_box, draw_background, bg)
+
+
+def _intersect(rectangle, other):
+    x, y, width, height = rectangle
+    other_x, other_y, other_width, other_height = other
+    x1, y1 = max(x, other_x), max(y, other_y)
+    x2 = min(x + width, other_x + other_width)
+    y2 = min(y + height, other_y + other_height)
+    if x1 < x2 and y1 < y2:
+        return x1, y1, x2 - x1, y2 - y1
+
+
+def add_mask_border(display_list, box):
+    """Add the mask border of ``box`` as alpha state to ``display_list``."""
+    if box.style['mask_border_source'][0] != 'none':
+        display_list.set_state(set_mask_border, box)
+
+
+def add_border(display_list, box):
+    """Add the box borders and column rules to ``display_list``."""
+    if box.style['visibility'] != 'visible':
+        return
+    bounding_box = None
+    if box.style['border_image_source'][0] == 'none':
+        widths = (
+            box.border_top_width, box.border_right_width,
+            box.border_bottom_width, box.border_left_width)
+        columns = (
+            isinstance(box, boxes.BlockContainerBox) and
+            box.style['column_rule_width'])
+        if not (any(widths) or columns):
+            return
+        bounding_box = (
+            box.border_box_x(), box.border_box_y(),
+            box.border_width(), box.border_height())
+    display_list.paint(bounding_box, draw_border, box)
 
 
 def draw_background(stream, bg, clip_box=True, bleed=None, marks=()):
@@ -161,6 +297,7 @@ def draw_background(stream, bg, clip_box=True, bleed=None, marks=()):
     if bg is None:
         return
 
+    layers = bg.layers
     with stacked(stream):
         if clip_box:
             for box in bg.layers[-1].clipped_boxes:
@@ -244,9 +381,10 @@ def draw_background(stream, bg, clip_box=True, bleed=None, marks=()):
             layer = BackgroundLayer(
                 image, size, position, repeat, unbounded, painting_area,
                 positioning_area, clipped_boxes)
-            bg.layers.insert(0, layer)
+            # Layers are not modified, as pages can be drawn multiple times.
+            layers = [layer, *layers]
         # Paint in reversed order: first layer is "closest" to the viewer.
-        for layer in reversed(bg.layers):
+        for layer in reversed(layers):
             draw_background_image(stream, layer, bg.image_rendering)
 
 
@@ -335,34 +473,34 @@ def draw_background_image(stream, layer, image_rendering):
         stream.fill()
 
 
-def draw_table(stream, table):
-    # Draw backgrounds.
-    draw_background(stream, table.background)
+def add_table(display_list, table, stacking_context):
+    # Add backgrounds.
+    add_background(display_list, table.background)
     for column_group in table.column_groups:
-        draw_background(stream, column_group.background)
+        add_background(display_list, column_group.background)
         for column in column_group.children:
-            draw_background(stream, column.background)
-    for row_group in table.children:
-        draw_background(stream, row_group.background)
-        for row in row_group.children:
-            draw_background(stream, row.background)
-            for cell in row.children:
+            add_background(display_list, column.background)
+    for row_group in stacking_context.box_children(table):
+        add_background(display_list, row_group.background)
+        for row in stacking_context.box_children(row_group):
+            add_background(display_list, row.background)
+            for cell in stacking_context.box_children(row):
                 draw_cell_background = (
                     table.style['border_collapse'] == 'collapse' or
                     cell.style['empty_cells'] == 'show' or
                     not cell.empty)
                 if draw_cell_background:
-                    draw_background(stream, cell.background)
+                    add_background(display_list, cell.background)
 
-    # Draw borders.
+    # Add borders.
     if table.style['border_collapse'] == 'collapse':
-        return draw_collapsed_borders(stream, table)
-    draw_border(stream, table)
-    for row_group in table.children:
-        for row in row_group.children:
-            for cell in row.children:
+        return display_list.paint(None, draw_collapsed_borders, table)
+    add_border(display_list, table)
+    for row_group in stacking_context.box_children(table):
+        for row in stacking_context.box_children(row_group):
+            for cell in stacking_context.box_children(row):
                 if cell.style['empty_cells'] == 'show' or not cell.empty:
-                    draw_border(stream, cell)
+                    add_border(display_list, cell)
 
 
 def draw_collapsed_borders(stream, table):
@@ -482,6 +620,18 @@ def draw_collapsed_borders(stream, table):
             draw_line(stream, bx, by, bx + bw, by + bh, width, style, color)
 
 
+def add_replacedbox(display_list, box):
+    """Add the given :class:`boxes.ReplacedBox` to ``display_list``."""
+    if box.style['visibility'] != 'visible' or not box.width or not box.height:
+        return
+    bounding_box = None
+    if not isinstance(box.replacement, SVGImage):
+        # SVG images may be drawn outside of their box.
+        draw_width, draw_height, draw_x, draw_y = replaced.replacedbox_layout(box)
+        bounding_box = (draw_x, draw_y, draw_width, draw_height)
+    display_list.paint(bounding_box, draw_replacedbox, box)
+
+
 def draw_replacedbox(stream, box):
     """Draw the given :class:`boxes.ReplacedBox` to a ``pdf.stream.Stream``."""
     if box.style['visibility'] != 'visible' or not box.width or not box.height:
@@ -501,17 +651,16 @@ def draw_replacedbox(stream, box):
                 stream, draw_width, draw_height, box.style['image_rendering'])
 
 
-def draw_inline_level(stream, page, box, offset_x=0, text_overflow='clip',
-                      block_ellipsis='none'):
+def add_inline_level(display_list, stacking_context, box, offset_x=0,
+                     text_overflow='clip', block_ellipsis='none'):
     if isinstance(box, StackingContext):
-        stacking_context = box
         allowed_boxes = (boxes.InlineBlockBox, boxes.InlineFlexBox, boxes.InlineGridBox)
-        assert isinstance(stacking_context.box, allowed_boxes)
-        draw_stacking_context(stream, stacking_context)
+        assert isinstance(box.box, allowed_boxes)
+        add_stacking_context(display_list, box)
     else:
-        set_mask_border(stream, box)
-        draw_background(stream, box.background)
-        draw_border(stream, box)
+        add_mask_border(display_list, box)
+        add_background(display_list, box.background)
+        add_border(display_list, box)
         if isinstance(box, (boxes.InlineBox, boxes.LineBox)):
             link_annotation = None
             if isinstance(box, boxes.LineBox):
@@ -521,9 +670,10 @@ def draw_inline_level(stream, page, box, offset_x=0, text_overflow='clip',
                 link_annotation = box.link_annotation
             ellipsis = 'none'
             if link_annotation:
-                stream.begin_marked_content(box, mcid=True, tag='Link')
-            for i, child in enumerate(box.children):
-                if i == len(box.children) - 1:
+                display_list.begin_marked_content(box, mcid=True, tag='Link')
+            children = stacking_context.box_children(box)
+            for i, child in enumerate(children):
+                if i == len(children) - 1:
                     # Last child
                     ellipsis = block_ellipsis
                 if isinstance(child, StackingContext):
@@ -531,15 +681,28 @@ def draw_inline_level(stream, page, box, offset_x=0, text_overflow='clip',
                 else:
                     child_offset_x = offset_x + child.position_x - box.position_x
                 if isinstance(child, boxes.TextBox):
-                    draw_text(stream, child, child_offset_x, text_overflow, ellipsis)
+                    add_text(
+                        display_list, child, child_offset_x, text_overflow, ellipsis)
                 else:
-                    draw_inline_level(
-                        stream, page, child, child_offset_x, text_overflow, ellipsis)
+                    add_inline_level(
+                        display_list, stacking_context, child, child_offset_x,
+                        text_overflow, ellipsis)
             if link_annotation:
-                stream.end_marked_content()
+                display_list.end_marked_content()
         elif isinstance(box, boxes.InlineReplacedBox):
-            draw_replacedbox(stream, box)
+            add_replacedbox(display_list, box)
         else:
             assert isinstance(box, boxes.TextBox)
             # Should only happen for list markers.
-            draw_text(stream, box, offset_x, text_overflow)
+            add_text(display_list, box, offset_x, text_overflow, block_ellipsis)
+
+
+def add_text(display_list, textbox, offset_x, text_overflow, block_ellipsis):
+    """Add ``textbox`` to ``display_list``."""
+    # Glyphs and text decorations may be drawn outside of the text box.
+    margin = textbox.style['font_size']
+    bounding_box = (
+        textbox.position_x - margin, textbox.position_y - margin,
+        textbox.width + 2 * margin, textbox.height + 2 * margin)
+    display_list.text(
+        bounding_box, draw_text, textbox, offset_x, text_overflow, block_ellipsis)
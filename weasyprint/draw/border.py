@@ -664,7 +664,7 @@ def draw_line(stream, x1, y1, x2, y2, thickness, style, color, offset=0):
         stream.stroke()
 
 
-def draw_outline(stream, box):
+def draw_outline(stream, box, stacking_context):
     width = box.style['outline_width']
     offset = box.style['outline_offset']
     color = get_color(box.style, 'outline_color')
@@ -682,9 +682,9 @@ def draw_outline(stream, box):
                     stream, outline_box, 4 * (width,), style,
                     styled_color(style, color, side))
 
-    for child in box.children:
+    for child in stacking_context.box_children(box):
         if isinstance(child, boxes.Box):
-            draw_outline(stream, child)
+            draw_outline(stream, child, stacking_context)
 
 
 def rounded_box(stream, radii):
@@ -0,0 +1,235 @@
+"""Drawing operations of pages, optimized and replayed on streams."""
+
+from .border import rounded_box
+from .stack import stacked
+
+# Operations are (operation, bounding_box, arguments) tuples. Bounding boxes are
+# (x, y, width, height) rectangles in CSS pixels, or None when they are unknown.
+FILL, PAINT, TEXT, STATE = 'fill', 'paint', 'text', 'state'
+PUSH, POP, CLIP, TRANSFORM = 'push', 'pop', 'clip', 'transform'
+BEGIN_GROUP, END_GROUP = 'begin_group', 'end_group'
+BEGIN_MARKED_CONTENT, END_MARKED_CONTENT = 'begin_marked', 'end_marked'
+
+# Number of previous operations checked for each opaque fill hiding them.
+OCCLUSION_LOOKBACK = 64
+
+
+def _contains(rectangle, other):
+    x, y, width, height = rectangle
+    other_x, other_y, other_width, other_height = other
+    return (
+        x <= other_x and y <= other_y and
+        other_x + other_width <= x + width and
+        other_y + other_height <= y + height)
+
+
+def _join(rectangle, other):
+    """Get the union of two rectangles sharing a full side, or None."""
+    x, y, width, height = rectangle
+    other_x, other_y, other_width, other_height = other
+    if y == other_y and height == other_height:
+        if x + width == other_x:
+            return x, y, width + other_width, height
+        elif other_x + other_width == x:
+            return other_x, y, width + other_width, height
+    elif x == other_x and width == other_width:
+        if y + height == other_y:
+            return x, y, width, height + other_height
+        elif other_y + other_height == y:
+            return x, other_y, width, height + other_height
+
+
+class DisplayList:
+    """Drawing operations of a page.
+
+    Operations are added with methods named like the ones of
+    :class:`weasyprint.pdf.stream.Stream`, so that :func:`stacked` can be used.
+    The list is optimized once with :meth:`optimize`, and drawn with
+    :meth:`draw` as many times as needed, at any zoom factor.
+
+    """
+    def __init__(self):
+        self.operations = []
+
+    def fill(self, rectangle, color):
+        """Fill ``rectangle`` with ``color``."""
+        self.operations.append((FILL, rectangle, (color, [rectangle])))
+
+    def paint(self, bounding_box, function, *args):
+        """Call ``function(stream, *args)``, drawing in ``bounding_box``.
+
+        ``function`` must restore the state of the stream.
+
+        """
+        self.operations.append((PAINT, bounding_box, (function, *args)))
+
+    def text(self, bounding_box, function, *args):
+        """Call ``function(stream, *args)``, drawing text in ``bounding_box``."""
+        self.operations.append((TEXT, bounding_box, (function, *args)))
+
+    def set_state(self, function, *args):
+        """Call ``function(stream, *args)``, changing the state of the stream."""
+        self.operations.append((STATE, None, (function, *args)))
+
+    def push_state(self):
+        self.operations.append((PUSH, None, ()))
+
+    def pop_state(self):
+        self.operations.append((POP, None, ()))
+
+    def clip(self, rounded_box):
+        """Clip the following operations to ``rounded_box``."""
+        self.operations.append((CLIP, None, (rounded_box,)))
+
+    def transform(self, a=1, b=0, c=0, d=1, e=0, f=0):
+        self.operations.append((TRANSFORM, None, (a, b, c, d, e, f)))
+
+    def begin_group(self, rectangle=None, opacity=None):
+        """Draw the following operations in a group, until :meth:`end_group`.
+
+        Groups with an ``opacity`` are transparency groups. Groups without
+        opacity are shared by pages drawing the same content, except in tagged
+        PDF files. ``rectangle`` is the bounding box of the group, the page
+        rectangle is used when it’s ``None``.
+
+        """
+        self.operations.append((BEGIN_GROUP, rectangle, (opacity,)))
+
+    def end_group(self):
+        self.operations.append((END_GROUP, None, ()))
+
+    def begin_marked_content(self, box, mcid=False, tag=None):
+        self.operations.append((BEGIN_MARKED_CONTENT, None, (box, mcid, tag)))
+
+    def end_marked_content(self):
+        self.operations.append((END_MARKED_CONTENT, None, ()))
+
+    def optimize(self, page_rectangle):
+        """Remove operations that are not visible and merge fills.
+
+        Operations drawn outside of ``page_rectangle`` or hidden by following
+        opaque fills are removed. Consecutive fills with the same color are
+        drawn together, with rectangles sharing a side joined.
+
+        """
+        self.operations = self._merge_fills(
+            self._remove_hidden(self.operations, page_rectangle))
+
+    @staticmethod
+    def _remove_hidden(operations, page_rectangle):
+        page_x, page_y, page_width, page_height = page_rectangle
+        # Transformations of the current state and its parents.
+        transformed = [False]
+        kept = []
+        # Operations after this index are drawn with the same state.
+        start = 0
+        for operation in operations:
+            kind, bounding_box, arguments = operation
+            if kind not in (FILL, PAINT, TEXT):
+                if kind == PUSH:
+                    transformed.append(transformed[-1])
+                elif kind == POP:
+                    transformed.pop()
+                elif kind == TRANSFORM:
+                    transformed[-1] = True
+                kept.append(operation)
+                start = len(kept)
+                continue
+
+            if bounding_box is not None and not transformed[-1]:
+                x, y, width, height = bounding_box
+                outside = (
+                    x >= page_x + page_width or y >= page_y + page_height or
+                    x + width <= page_x or y + height <= page_y)
+                if outside:
+                    continue
+
+            if kind == FILL and arguments[0].alpha == 1:
+                # Text is kept, to be extracted from the PDF.
+                first = max(start, len(kept) - OCCLUSION_LOOKBACK)
+                for i in range(len(kept) - 1, first - 1, -1):
+                    hidden = kept[i]
+                    if hidden is None or hidden[0] == TEXT or hidden[1] is None:
+                        continue
+                    if _contains(bounding_box, hidden[1]):
+                        kept[i] = None
+            kept.append(operation)
+        return [operation for operation in kept if operation is not None]
+
+    @staticmethod
+    def _merge_fills(operations):
+        merged = []
+        for operation in operations:
+            kind, bounding_box, arguments = operation
+            if kind != FILL:
+                merged.append(operation)
+                continue
+            color, rectangles = arguments
+            if merged and merged[-1][0] == FILL and merged[-1][2][0] == color:
+                merged_rectangles = merged[-1][2][1]
+            else:
+                # Lists of rectangles are modified when fills are merged.
+                merged_rectangles = []
+                merged.append((FILL, bounding_box, (color, merged_rectangles)))
+            for rectangle in rectangles:
+                joined = merged_rectangles and _join(merged_rectangles[-1], rectangle)
+                if joined:
+                    merged_rectangles[-1] = joined
+                else:
+                    merged_rectangles.append(rectangle)
+        return merged
+
+    def draw(self, stream):
+        """Draw the operations on ``stream``."""
+        # Streams including the current groups, with the groups’ opacity.
+        groups = []
+        for kind, bounding_box, arguments in self.operations:
+            if kind == FILL:
+                color, rectangles = arguments
+                with stacked(stream):
+                    stream.set_color(color)
+                    for rectangle in rectangles:
+                        stream.rectangle(*rectangle)
+                        stream.fill()
+            elif kind in (PAINT, TEXT, STATE):
+                function, *args = arguments
+                function(stream, *args)
+            elif kind == PUSH:
+                stream.push_state()
+            elif kind == POP:
+                stream.pop_state()
+            elif kind == CLIP:
+                rounded_box(stream, *arguments)
+                stream.clip()
+                stream.end()
+            elif kind == TRANSFORM:
+                stream.transform(*arguments)
+            elif kind == BEGIN_GROUP:
+                opacity, = arguments
+                groups.append((stream, opacity))
+                if opacity is None and stream.tagged:
+                    # Marked content can’t be shared.
+                    continue
+                # Shared groups are not transparency groups, as their content
+                # is blended with the page.
+                rectangle = bounding_box or stream.page_rectangle
+                stream = stream.add_group(
+                    *rectangle, transparency=opacity is not None)
+            elif kind == END_GROUP:
+                group, (stream, opacity) = stream, groups.pop()
+                if group is stream:
+                    continue
+                if opacity is None:
+                    stream.draw_x_object(stream.reuse_group(group))
+                    continue
+                # Identical groups can be shared, unless they include marked
+                # content.
+                group_id = group.id if stream.tagged else stream.reuse_group(group)
+                with stacked(stream):
+                    stream.set_alpha(opacity, stroke=True, fill=True)
+                    stream.draw_x_object(group_id)
+            elif kind == BEGIN_MARKED_CONTENT:
+                stream.begin_marked_content(*arguments)
+            else:
+                assert kind == END_MARKED_CONTENT
+                stream.end_marked_content()
@@ -1,11 +1,8 @@
 """Draw text."""
 
-from io import BytesIO
 from xml.etree import ElementTree
 
-from PIL import Image
-
-from ..images import RasterImage, SVGImage
+from ..images import RasterImage, SVGImage, load_pillow_image
 from ..matrix import Matrix
 from ..text.ffi import FROM_UNITS, TO_UNITS, ffi, pango
 from ..text.fonts import get_hb_object_data
@@ -136,7 +133,8 @@ def draw_first_line(stream, textbox, text_overflow, block_ellipsis, matrix):
     utf8_text = textbox.pango_layout.text.encode()
     stream.set_text_matrix(*matrix.values)
     previous_pango_font = None
-    string = ''
+    # Parts of the glyphs array, joined when the text is shown.
+    string = []
     x_advance = 0
     emojis = []
     run = first_line.runs[0]
@@ -169,39 +167,38 @@ def draw_first_line(stream, textbox, text_overflow, block_ellipsis, matrix):
 
             # Go through the run glyphs.
             if string:
-                stream.show_text(string)
-            string = ''
+                stream.show_text(''.join(string))
+            string = []
             stream.set_font_size(font.hash, 1 if font.bitmap else font_size)
-        string += '<'
+            glyph_format = '02x' if font.bitmap else '04x'
+        string.append('<')
         for i in range(num_glyphs):
             glyph_info = glyphs[i]
             glyph = glyph_info.glyph
             width = glyph_info.geometry.width
             if (glyph == pango.PANGO_GLYPH_EMPTY or
                     glyph & pango.PANGO_GLYPH_UNKNOWN_FLAG):
-                string += f'>{-width / font_size}<'
+                string.append(f'>{-width / font_size}<')
                 continue
 
             offset = glyph_info.geometry.x_offset / font_size
             rise = glyph_info.geometry.y_offset / 1000
             if rise:
-                if string[-1] == '<':
-                    string = string[:-1]
+                if string[-1].endswith('<'):
+                    string[-1] = string[-1][:-1]
                 else:
-                    string += '>'
-                stream.show_text(string)
+                    string.append('>')
+                stream.show_text(''.join(string))
                 stream.set_text_rise(-rise)
-                string = ''
-                if offset:
-                    string = f'{-offset}'
-                string += f'<{glyph:02x}>' if font.bitmap else f'<{glyph:04x}>'
-                stream.show_text(string)
+                string = [f'{-offset}'] if offset else []
+                string.append(f'<{glyph:{glyph_format}}>')
+                stream.show_text(''.join(string))
                 stream.set_text_rise(0)
-                string = '<'
+                string = ['<']
             else:
                 if offset:
-                    string += f'>{-offset}<'
-                string += f'{glyph:02x}' if font.bitmap else f'{glyph:04x}'
+                    string.append(f'>{-offset}<')
+                string.append(f'{glyph:{glyph_format}}')
 
             # Get ink bounding box and logical widths in font.
             if glyph not in font.widths:
@@ -214,7 +211,7 @@ def draw_first_line(stream, textbox, text_overflow, block_ellipsis, matrix):
             kerning = int(
                 font.widths[glyph] + offset - width * 1000 * FROM_UNITS / font_size)
             if kerning:
-                string += f'>{kerning}<'
+                string.append(f'>{kerning}<')
 
             # Create mapping between glyphs and characters.
             if glyph not in font.cmap:
@@ -241,7 +238,7 @@ def draw_first_line(stream, textbox, text_overflow, block_ellipsis, matrix):
             elif font.png:
                 png_data = get_hb_object_data(font.hb_font, 'png', glyph)
                 if png_data:
-                    pillow_image = Image.open(BytesIO(png_data))
+                    pillow_image = load_pillow_image(png_data)
                     image_id = f'{font.hash}{glyph}'
                     image = RasterImage(pillow_image, image_id, png_data)
                     d = font.widths[glyph] / 1000
@@ -256,13 +253,13 @@ def draw_first_line(stream, textbox, text_overflow, block_ellipsis, matrix):
             x_advance += (font.widths[glyph] + offset - kerning) / 1000
 
         # Close the last glyphs list, remove if empty.
-        if string[-1] == '<':
-            string = string[:-1]
+        if string[-1].endswith('<'):
+            string[-1] = string[-1][:-1]
         else:
-            string += '>'
+            string.append('>')
 
     # Draw text.
-    stream.show_text(string)
+    stream.show_text(''.join(string))
 
     return emojis
 
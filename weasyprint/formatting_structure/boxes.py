@@ -55,6 +55,18 @@ from ..css import computed_from_cascaded
 
 class Box:
     """Abstract base class for all boxes."""
+    # Attributes set on all boxes, None until they are used. Other attributes
+    # are stored in __dict__.
+    __slots__ = (
+        '__dict__', 'background', 'baseline', 'border_bottom_left_radius',
+        'border_bottom_right_radius', 'border_bottom_width', 'border_left_width',
+        'border_right_width', 'border_top_left_radius', 'border_top_right_radius',
+        'border_top_width', 'children', 'element', 'element_tag', 'height',
+        'margin_bottom', 'margin_left', 'margin_right', 'margin_top', 'max_height',
+        'max_width', 'min_height', 'min_width', 'padding_bottom', 'padding_left',
+        'padding_right', 'padding_top', 'position_x', 'position_y',
+        'remove_decoration_sides', 'style', 'width')
+
     # Definitions for the rules generating anonymous table boxes
     # https://www.w3.org/TR/CSS21/tables.html#anonymous-boxes
     proper_table_child = False
@@ -96,6 +108,32 @@ class Box:
                 yield child
 
     def __init__(self, element_tag, style, element):
+        self.background = None
+        self.baseline = None
+        self.border_bottom_left_radius = None
+        self.border_bottom_right_radius = None
+        self.border_bottom_width = None
+        self.border_left_width = None
+        self.border_right_width = None
+        self.border_top_left_radius = None
+        self.border_top_right_radius = None
+        self.border_top_width = None
+        self.height = None
+        self.margin_bottom = None
+        self.margin_left = None
+        self.margin_right = None
+        self.margin_top = None
+        self.max_height = None
+        self.max_width = None
+        self.min_height = None
+        self.min_width = None
+        self.padding_bottom = None
+        self.padding_left = None
+        self.padding_right = None
+        self.padding_top = None
+        self.position_x = None
+        self.position_y = None
+        self.width = None
         self.element_tag = element_tag
         self.element = element
         self.style = style
@@ -118,10 +156,44 @@ class Box:
         # Create a new instance without calling __init__: parameters are
         # different depending on the class.
         new_box = cls.__new__(cls)
-        # Copy attributes
+        self._copy_slots(new_box)
         new_box.__dict__.update(self.__dict__)
         return new_box
 
+    def _copy_slots(self, new_box):
+        """Copy the values of slots to ``new_box``."""
+        new_box.background = self.background
+        new_box.baseline = self.baseline
+        new_box.border_bottom_left_radius = self.border_bottom_left_radius
+        new_box.border_bottom_right_radius = self.border_bottom_right_radius
+        new_box.border_bottom_width = self.border_bottom_width
+        new_box.border_left_width = self.border_left_width
+        new_box.border_right_width = self.border_right_width
+        new_box.border_top_left_radius = self.border_top_left_radius
+        new_box.border_top_right_radius = self.border_top_right_radius
+        new_box.border_top_width = self.border_top_width
+        new_box.children = self.children
+        new_box.element = self.element
+        new_box.element_tag = self.element_tag
+        new_box.height = self.height
+        new_box.margin_bottom = self.margin_bottom
+        new_box.margin_left = self.margin_left
+        new_box.margin_right = self.margin_right
+        new_box.margin_top = self.margin_top
+        new_box.max_height = self.max_height
+        new_box.max_width = self.max_width
+        new_box.min_height = self.min_height
+        new_box.min_width = self.min_width
+        new_box.padding_bottom = self.padding_bottom
+        new_box.padding_left = self.padding_left
+        new_box.padding_right = self.padding_right
+        new_box.padding_top = self.padding_top
+        new_box.position_x = self.position_x
+        new_box.position_y = self.position_y
+        new_box.remove_decoration_sides = self.remove_decoration_sides
+        new_box.style = self.style
+        new_box.width = self.width
+
     def deepcopy(self):
         """Return a copy of the box with recursive copies of its children."""
         return self.copy()
@@ -357,6 +429,8 @@ class Box:
 
 class ParentBox(Box):
     """A box that has children."""
+    __slots__ = ()
+
     def __init__(self, element_tag, style, element, children):
         super().__init__(element_tag, style, element)
         self.children = tuple(children)
@@ -427,6 +501,8 @@ class BlockLevelBox(Box):
     ``table`` generates a block-level box.
 
     """
+    __slots__ = ()
+
     clearance = None
 
 
@@ -441,6 +517,7 @@ class BlockContainerBox(ParentBox):
     box.
 
     """
+    __slots__ = ()
 
 
 class BlockBox(BlockContainerBox, BlockLevelBox):
@@ -450,6 +527,7 @@ class BlockBox(BlockContainerBox, BlockLevelBox):
     generates a block box.
 
     """
+    __slots__ = ()
 
 
 class LineBox(ParentBox):
@@ -462,6 +540,8 @@ class LineBox(ParentBox):
     be split into multiple line boxes, one for each actual line.
 
     """
+    __slots__ = ()
+
     text_overflow = 'clip'
     block_ellipsis = 'none'
 
@@ -483,6 +563,8 @@ class InlineLevelBox(Box):
     ``inline-block`` generates an inline-level box.
 
     """
+    __slots__ = ()
+
     def remove_decoration(self, start, end):
         if self.style['box_decoration_break'] == 'clone':
             return
@@ -503,6 +585,8 @@ class InlineBox(InlineLevelBox, ParentBox):
     inline box.
 
     """
+    __slots__ = ()
+
     link_annotation = None
 
     def hit_area(self):
@@ -519,13 +603,21 @@ class TextBox(InlineLevelBox):
     inline boxes" are also text boxes.
 
     """
+    __slots__ = ('pango_layout', 'text')
+
     justification_spacing = 0
 
     def __init__(self, element_tag, style, element, text):
         assert text
         super().__init__(element_tag, style, element)
+        self.pango_layout = None
         self.text = text
 
+    def _copy_slots(self, new_box):
+        super()._copy_slots(new_box)
+        new_box.pango_layout = self.pango_layout
+        new_box.text = self.text
+
     def copy_with_text(self, text):
         """Return a new TextBox identical to this one except for the text."""
         assert text
@@ -540,6 +632,7 @@ class AtomicInlineLevelBox(InlineLevelBox):
     This inline-level box cannot be split for line breaks.
 
     """
+    __slots__ = ()
 
 
 class InlineBlockBox(AtomicInlineLevelBox, BlockContainerBox):
@@ -551,6 +644,7 @@ class InlineBlockBox(AtomicInlineLevelBox, BlockContainerBox):
     an inline-block box.
 
     """
+    __slots__ = ()
 
 
 class ReplacedBox(Box):
@@ -560,6 +654,8 @@ class ReplacedBox(Box):
     and is opaque from CSS’s point of view.
 
     """
+    __slots__ = ()
+
     def __init__(self, element_tag, style, element, replacement):
         super().__init__(element_tag, style, element)
         self.replacement = replacement
@@ -572,6 +668,7 @@ class BlockReplacedBox(ReplacedBox, BlockLevelBox):
     ``table`` generates a block-level replaced box.
 
     """
+    __slots__ = ()
 
 
 class InlineReplacedBox(ReplacedBox, AtomicInlineLevelBox):
@@ -582,10 +679,13 @@ class InlineReplacedBox(ReplacedBox, AtomicInlineLevelBox):
     box.
 
     """
+    __slots__ = ()
 
 
 class TableBox(BlockLevelBox, ParentBox):
     """Box for elements with ``display: table``"""
+    __slots__ = ()
+
     # Definitions for the rules generating anonymous table boxes
     # https://www.w3.org/TR/CSS21/tables.html#anonymous-boxes
     tabular_container = True
@@ -604,10 +704,13 @@ class TableBox(BlockLevelBox, ParentBox):
 
 class InlineTableBox(TableBox):
     """Box for elements with ``display: inline-table``"""
+    __slots__ = ()
 
 
 class TableRowGroupBox(ParentBox):
     """Box for elements with ``display: table-row-group``"""
+    __slots__ = ()
+
     proper_table_child = True
     internal_table_or_caption = True
     tabular_container = True
@@ -620,6 +723,8 @@ class TableRowGroupBox(ParentBox):
 
 class TableRowBox(ParentBox):
     """Box for elements with ``display: table-row``"""
+    __slots__ = ()
+
     proper_table_child = True
     internal_table_or_caption = True
     tabular_container = True
@@ -628,6 +733,8 @@ class TableRowBox(ParentBox):
 
 class TableColumnGroupBox(ParentBox):
     """Box for elements with ``display: table-column-group``"""
+    __slots__ = ()
+
     proper_table_child = True
     internal_table_or_caption = True
     proper_parents = (TableBox, InlineTableBox)
@@ -662,6 +769,8 @@ class TableColumnGroupBox(ParentBox):
 # Not really a parent box, but pretending to be removes some corner cases.
 class TableColumnBox(ParentBox):
     """Box for elements with ``display: table-column``"""
+    __slots__ = ()
+
     proper_table_child = True
     internal_table_or_caption = True
     proper_parents = (TableBox, InlineTableBox, TableColumnGroupBox)
@@ -695,6 +804,8 @@ class TableColumnBox(ParentBox):
 
 class TableCellBox(BlockContainerBox):
     """Box for elements with ``display: table-cell``"""
+    __slots__ = ()
+
     internal_table_or_caption = True
 
     def __init__(self, *args, **kwargs):
@@ -717,6 +828,8 @@ class TableCellBox(BlockContainerBox):
 
 class TableCaptionBox(BlockBox):
     """Box for elements with ``display: table-caption``"""
+    __slots__ = ()
+
     proper_table_child = True
     internal_table_or_caption = True
     proper_parents = (TableBox, InlineTableBox)
@@ -729,6 +842,8 @@ class PageBox(ParentBox):
     During layout a new page box is created after every page break.
 
     """
+    __slots__ = ()
+
     def __init__(self, page_type, style):
         self.page_type = page_type
         # Page boxes are not linked to any element.
@@ -754,6 +869,8 @@ class PageBox(ParentBox):
 
 class MarginBox(BlockContainerBox):
     """Box in page margins, as defined in CSS3 Paged Media"""
+    __slots__ = ()
+
     def __init__(self, at_keyword, style):
         self.at_keyword = at_keyword
         # Margin boxes are not linked to any element.
@@ -766,6 +883,8 @@ class MarginBox(BlockContainerBox):
 
 class FootnoteAreaBox(BlockBox):
     """Box displaying footnotes, as defined in GCPM."""
+    __slots__ = ()
+
     def __init__(self, page, style):
         self.page = page
         # Footnote area boxes are not linked to any element.
@@ -778,6 +897,7 @@ class FootnoteAreaBox(BlockBox):
 
 class FlexContainerBox(ParentBox):
     """A box that contains only flex-items."""
+    __slots__ = ()
 
 
 class FlexBox(FlexContainerBox, BlockLevelBox):
@@ -786,6 +906,7 @@ class FlexBox(FlexContainerBox, BlockLevelBox):
     It behaves as block on the outside and as a flex container on the inside.
 
     """
+    __slots__ = ()
 
 
 class InlineFlexBox(FlexContainerBox, InlineLevelBox):
@@ -794,10 +915,12 @@ class InlineFlexBox(FlexContainerBox, InlineLevelBox):
     It behaves as inline on the outside and as a flex container on the inside.
 
     """
+    __slots__ = ()
 
 
 class GridContainerBox(ParentBox):
     """A box that contains only grid-items."""
+    __slots__ = ()
 
 
 class GridBox(GridContainerBox, BlockLevelBox):
@@ -806,6 +929,7 @@ class GridBox(GridContainerBox, BlockLevelBox):
     It behaves as block on the outside and as a grid container on the inside.
 
     """
+    __slots__ = ()
 
 
 class InlineGridBox(GridContainerBox, InlineLevelBox):
@@ -814,3 +938,4 @@ class InlineGridBox(GridContainerBox, InlineLevelBox):
     It behaves as inline on the outside and as a grid container on the inside.
 
     """
+    __slots__ = ()
@@ -219,8 +219,10 @@ def element_to_box(element, style_for, get_image_from_uri, base_url,
 
     # Scopes created by this element’s children stop here.
     for name in counter_scopes.pop():
-        counter_values[name].pop()
-        if not counter_values[name]:
+        values = counter_values[name][:-1]
+        if values:
+            counter_values[name] = values
+        else:
             counter_values.pop(name)
 
     box.children = children
@@ -245,7 +247,8 @@ def element_to_box(element, style_for, get_image_from_uri, base_url,
             box.children.append(boxes.TextBox.anonymous_from(box, '​'))
 
     if style['float'] == 'footnote':
-        counter_values['footnote'][-1] += 1
+        *values, value = counter_values['footnote']
+        counter_values['footnote'] = [*values, value + 1]
         marker_style = style_for(element, 'footnote-marker')
         marker = make_box(
             f'{element.tag}::footnote-marker', marker_style, [], element)
@@ -406,8 +409,7 @@ def compute_content_list(content_list, parent_box, counter_values, css_token,
     if parent_box.cached_counter_values is None:
         # Store the counter_values in the parent_box to make them accessible
         # in @page context.
-        parent_box.cached_counter_values = {
-            key: value.copy() for key, value in counter_values.items()}
+        parent_box.cached_counter_values = counter_values.copy()
     for type_, value in content_list:
         if type_ == 'string':
             add_text(value)
@@ -673,24 +675,30 @@ def set_content_lists(element, box, style, counter_values, target_collector,
 
 
 def update_counters(state, style):
-    """Handle the ``counter-*`` properties."""
+    """Handle the ``counter-*`` properties.
+
+    Lists of counter values are never modified, they are replaced. They can
+    thus be shared by copies of ``state``.
+
+    """
     _quote_depth, counter_values, counter_scopes = state
     sibling_scopes = counter_scopes[-1]
 
     for name, value in style['counter_reset']:
+        values = counter_values.get(name, [])
         if name in sibling_scopes:
-            counter_values[name].pop()
+            values = values[:-1]
         else:
             sibling_scopes.add(name)
-        counter_values.setdefault(name, []).append(value)
+        counter_values[name] = [*values, value]
 
     for name, value in style['counter_set']:
-        values = counter_values.setdefault(name, [])
+        values = counter_values.get(name)
         if not values:
             assert name not in sibling_scopes
             sibling_scopes.add(name)
-            values.append(0)
-        values[-1] = value
+            values = [0]
+        counter_values[name] = [*values[:-1], value]
 
     counter_increment = style['counter_increment']
     if counter_increment == 'auto':
@@ -703,12 +711,20 @@ def update_counters(state, style):
         else:
             counter_increment = []
     for name, value in counter_increment:
-        values = counter_values.setdefault(name, [])
+        values = counter_values.get(name)
         if not values:
             assert name not in sibling_scopes
             sibling_scopes.add(name)
-            values.append(0)
-        values[-1] += value
+            values = [0]
+        counter_values[name] = [*values[:-1], values[-1] + value]
+
+
+def copy_state(state):
+    """Copy counters ``state``, sharing the lists of counter values."""
+    quote_depth, counter_values, counter_scopes = state
+    return (
+        quote_depth.copy(), counter_values.copy(),
+        [scopes.copy() for scopes in counter_scopes])
 
 
 def is_whitespace(box, _has_non_whitespace=re.compile('\\S').search):
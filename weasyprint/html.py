@@ -7,10 +7,20 @@ are images with intrinsic dimensions.
 
 """
 
+import contextlib
+import os
+import pickle
 import re
+import sys
+import threading
+from hashlib import md5
 from importlib.resources import files
+from pathlib import Path
 
-from . import CSS, Attachment, css
+import cssselect2
+import tinycss2
+
+from . import CSS, VERSION, Attachment, css
 from .css import get_child_text
 from .css.counters import CounterStyle
 from .formatting_structure import boxes
@@ -18,21 +28,113 @@ from .images import SVGImage
 from .logger import LOGGER
 from .urls import get_url_attribute
 
-HTML5_UA_COUNTER_STYLE = CounterStyle()
 HTML5_UA = (files(css) / 'html5_ua.css').read_text('utf-8')
 HTML5_UA_FORM = (files(css) / 'html5_ua_form.css').read_text('utf-8')
 HTML5_PH = (files(css) / 'html5_ph.css').read_text('utf-8')
-HTML5_UA_STYLESHEET = CSS(
-    string=HTML5_UA, counter_style=HTML5_UA_COUNTER_STYLE)
-HTML5_UA_FORM_STYLESHEET = CSS(
-    string=HTML5_UA_FORM, counter_style=HTML5_UA_COUNTER_STYLE)
-HTML5_PH_STYLESHEET = CSS(string=HTML5_PH)
+_UA_STYLESHEETS_LOCK = threading.RLock()
 
 # https://html.spec.whatwg.org/multipage/#space-character
 HTML_WHITESPACE = ' \t\n\f\r'
 HTML_SPACE_SEPARATED_TOKENS_RE = re.compile(f'[^{HTML_WHITESPACE}]+')
 
 
+def __getattr__(name):
+    """Parse user-agent stylesheets and counter style on first use.
+
+    Parsing and validating stylesheets is a large part of the import time, and
+    forms and presentational hints stylesheets are often useless.
+
+    """
+    with _UA_STYLESHEETS_LOCK:
+        if name in globals():
+            # Parsed by another thread.
+            pass
+        elif name in ('HTML5_UA_COUNTER_STYLE', 'HTML5_UA_STYLESHEET'):
+            # The counter style is filled by the rules of the stylesheet.
+            counter_style = CounterStyle()
+            stylesheet = _parse_ua_stylesheet(HTML5_UA, 'ua', counter_style)
+            globals().update(
+                HTML5_UA_COUNTER_STYLE=counter_style,
+                HTML5_UA_STYLESHEET=stylesheet)
+        elif name == 'HTML5_UA_FORM_STYLESHEET':
+            counter_style = __getattr__('HTML5_UA_COUNTER_STYLE')
+            globals()[name] = _parse_ua_stylesheet(
+                HTML5_UA_FORM, 'form', counter_style)
+        elif name == 'HTML5_PH_STYLESHEET':
+            globals()[name] = _parse_ua_stylesheet(HTML5_PH, 'ph')
+        else:
+            raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+        return globals()[name]
+
+
+def _get_cache_folder():
+    """Get the user cache folder used by this version of WeasyPrint.
+
+    Return :obj:`None` if the home folder of the user can't be found.
+
+    """
+    try:
+        if sys.platform == 'win32':
+            root = os.getenv('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+        elif sys.platform == 'darwin':
+            root = Path.home() / 'Library' / 'Caches'
+        else:
+            root = os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache'
+    except RuntimeError:
+        return None
+    return Path(root) / 'weasyprint' / VERSION
+
+
+def _parse_ua_stylesheet(string, name, counter_style=None, folder=None):
+    """Get user-agent stylesheet from CSS ``string``, updating ``counter_style``.
+
+    The validated stylesheet and the counter style are serialized in
+    ``folder``, the user cache folder by default, and loaded by the following
+    Python processes instead of parsing the stylesheet again.
+
+    """
+    # Serialized objects are created by the CSS modules of WeasyPrint and by
+    # tinycss2, selectors are compiled again from their source when loaded.
+    # Cached stylesheets are ignored when Python, these libraries or these
+    # modules change.
+    css_folder = Path(css.__file__).parent
+    key = [
+        VERSION, sys.implementation.cache_tag, tinycss2.__version__,
+        cssselect2.__version__]
+    for module in sorted(css_folder.rglob('*.py')):
+        stat = module.stat()
+        key.append(
+            f'{module.relative_to(css_folder)} {stat.st_size} {stat.st_mtime_ns}')
+    key.append(string)
+    key = '\n'.join(key)
+    digest = md5(key.encode(), usedforsecurity=False).hexdigest()
+    if folder is None:
+        folder = _get_cache_folder()
+    path = None if folder is None else folder / f'ua-{name}-{digest}.pickle'
+    try:
+        stylesheet, counter_values = pickle.loads(path.read_bytes())
+    except Exception:
+        # No cache, or cache that can't be read.
+        counter_values = CounterStyle() if counter_style is None else counter_style
+        stylesheet = CSS(string=string, counter_style=counter_values)
+        if path is not None and not sys.dont_write_bytecode:
+            temporary_path = path.with_suffix(f'.{os.getpid()}')
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temporary_path.write_bytes(
+                    pickle.dumps((stylesheet, dict(counter_values))))
+                temporary_path.replace(path)
+            except Exception:
+                # Cache that can't be written, or objects that can't be
+                # serialized.
+                with contextlib.suppress(OSError):
+                    temporary_path.unlink(missing_ok=True)
+    else:
+        if counter_style is not None:
+            counter_style.update(counter_values)
+    return stylesheet
+
+
 def ascii_lower(string):
     r"""Transform (only) ASCII letters to lower case: A-Z is mapped to a-z.
 
@@ -3,27 +3,46 @@
 import io
 import math
 import struct
+from functools import cache
 from hashlib import md5
 from io import BytesIO
 from itertools import cycle
 from math import inf
-from pathlib import Path
-from urllib.parse import urlparse
-from urllib.request import url2pathname
 from xml.etree import ElementTree
 
 import pydyf
-from PIL import Image, ImageFile, ImageOps
 from tinycss2.color4 import parse_color
 
 from . import DEFAULT_OPTIONS
 from .layout.percent import percentage
 from .logger import LOGGER
+from .stats import count
 from .svg import SVG
-from .urls import URLFetchingError, fetch
 
-# Don’t crash when converting truncated images
-ImageFile.LOAD_TRUNCATED_IMAGES = True
+from .urls import (  # isort:skip
+    BufferReader, URLFetchingError, fetch, map_local_file, read_fetch_result)
+
+
+@cache
+def load_pillow():
+    """Import and return the ``PIL`` package with the modules we need.
+
+    Pillow is imported on first use, as it’s not needed by documents without
+    raster images.
+
+    """
+    import PIL.Image
+    import PIL.ImageFile
+    import PIL.ImageOps
+
+    # Don’t crash when converting truncated images
+    PIL.ImageFile.LOAD_TRUNCATED_IMAGES = True
+    return PIL
+
+
+def load_pillow_image(data):
+    """Open raster image ``data`` with Pillow."""
+    return load_pillow().Image.open(BufferReader(data))
 
 
 class ImageLoadingError(ValueError):
@@ -93,6 +112,15 @@ class RasterImage:
                 filename = None
         self.image_data = self.cache_image_data(image_data, filename)
 
+    def __getstate__(self):
+        # Only keep the image data, not the whole cache or the local filename.
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        state['image_data'] = LazyImage(
+            state['_cache'], f'{self.id}-source-{self._dpi or ""}',
+            bytes(self.image_data.data))
+        return state
+
     def get_intrinsic_size(self, resolution, font_size):
         return self.width / resolution, self.height / resolution, self.ratio
 
@@ -104,8 +132,8 @@ class RasterImage:
         ratio = 1
         if self._dpi:
             pt_to_in = 4 / 3 / 96
-            width_inches = abs(concrete_width * stream.ctm[0][0] * pt_to_in)
-            height_inches = abs(concrete_height * stream.ctm[1][1] * pt_to_in)
+            width_inches = abs(concrete_width * stream.page_ctm[0][0] * pt_to_in)
+            height_inches = abs(concrete_height * stream.page_ctm[1][1] * pt_to_in)
             dpi = max(self.width / width_inches, self.height / height_inches)
             if dpi > self._dpi:
                 ratio = self._dpi / dpi
@@ -122,19 +150,46 @@ class RasterImage:
             key = f'{self.id}-{slot}-{self._dpi or ""}'
             return LazyImage(self._cache, key, data)
 
+    def get_resized_image_data(self, width, height):
+        """Get image data resized to given size in pixels.
+
+        Resized data is stored in the cache with a key depending on the image
+        content, on the size and on the encoding options, so that documents
+        sharing the same cache resize each image only once.
+
+        """
+        data = self.image_data.data
+        digest = md5(data, usedforsecurity=False).hexdigest()
+        quality = '' if self._jpeg_quality is None else self._jpeg_quality
+        key = f'{digest}-{width}x{height}-{quality}-{int(self.optimize)}'
+        if key not in self._cache:
+            pillow_image = load_pillow_image(data)
+            image_format = pillow_image.format
+            # Decode JPEG images at a reduced scale when possible.
+            pillow_image.draft(pillow_image.mode, (width, height))
+            if pillow_image.mode != self.mode:
+                pillow_image = pillow_image.convert(self.mode)
+            # Downsample images whose resolution is higher than needed.
+            pillow_image = pillow_image.resize(
+                (width, height), load_pillow().Image.Resampling.LANCZOS,
+                reducing_gap=3)
+            image_file = io.BytesIO()
+            options = {'format': image_format, 'optimize': self.optimize}
+            if image_format == 'JPEG' and self._jpeg_quality is not None:
+                options['quality'] = self._jpeg_quality
+            pillow_image.save(image_file, **options)
+            self._cache[key] = image_file.getvalue()
+        return LazyImage(self._cache, key)
+
     def get_x_object(self, interpolate, dpi_ratio):
         if dpi_ratio == 1:
             width, height = self.width, self.height
+            image_data = self.image_data
         else:
-            thumbnail = Image.open(io.BytesIO(self.image_data.data))
             width = max(1, round(self.width * dpi_ratio))
             height = max(1, round(self.height * dpi_ratio))
-            thumbnail.thumbnail((width, height))
-            image_file = io.BytesIO()
-            thumbnail.save(
-                image_file, format=thumbnail.format, optimize=self.optimize)
-            width, height = thumbnail.width, thumbnail.height
-            self.image_data = self.cache_image_data(image_file.getvalue())
+            image_data = self.get_resized_image_data(width, height)
+        size = f'{width}x{height}'
 
         if self.mode in ('RGB', 'RGBA'):
             color_space = '/DeviceRGB'
@@ -160,7 +215,7 @@ class RasterImage:
             if self.invert_colors:
                 extra['Decode'] = pydyf.Array((1, 0) * 4)
             extra['Filter'] = '/DCTDecode'
-            return pydyf.Stream([self.image_data], extra)
+            return pydyf.Stream([image_data], extra)
 
         extra['Filter'] = '/FlateDecode'
         extra['DecodeParms'] = pydyf.Dictionary({
@@ -178,13 +233,13 @@ class RasterImage:
             extra['DecodeParms']['Colors'] = 3
         if self.mode in ('RGBA', 'LA'):
             # Remove alpha channel from image
-            pillow_image = Image.open(io.BytesIO(self.image_data.data))
+            pillow_image = load_pillow_image(image_data.data)
             alpha = pillow_image.getchannel('A')
             pillow_image = pillow_image.convert(self.mode[:-1])
             png_data = self._get_png_data(pillow_image)
             # Save alpha channel as mask
             alpha_data = self._get_png_data(alpha)
-            stream = self.cache_image_data(alpha_data, slot='streamalpha')
+            stream = self.cache_image_data(alpha_data, slot=f'streamalpha-{size}')
             extra['SMask'] = pydyf.Stream([stream], extra={
                 'Filter': '/FlateDecode',
                 'Type': '/XObject',
@@ -200,10 +255,10 @@ class RasterImage:
                 'Interpolate': 'true' if interpolate else 'false',
             })
         else:
-            png_data = self._get_png_data(
-                Image.open(io.BytesIO(self.image_data.data)))
+            png_data = self._get_png_data(load_pillow_image(image_data.data))
 
-        return pydyf.Stream([self.cache_image_data(png_data, slot='stream')], extra)
+        stream = self.cache_image_data(png_data, slot=f'stream-{size}')
+        return pydyf.Stream([stream], extra)
 
     @staticmethod
     def _get_png_data(pillow_image):
@@ -235,11 +290,12 @@ class RasterImage:
 
 
 class LazyImage(pydyf.Object):
-    def __init__(self, cache, key, data):
+    def __init__(self, cache, key, data=None):
         super().__init__()
         self._key = key
         self._cache = cache
-        cache[key] = data
+        if data is not None:
+            cache[key] = data
 
     @property
     def data(self):
@@ -253,7 +309,7 @@ class LazyLocalImage(pydyf.Object):
 
     @property
     def data(self):
-        return Path(self._filename).read_bytes()
+        return map_local_file(self._filename)
 
 
 class SVGImage:
@@ -282,33 +338,36 @@ class SVGImage:
         return width, height, ratio
 
     def draw(self, stream, concrete_width, concrete_height, image_rendering):
-        try:
-            self._svg.draw(
-                stream, concrete_width, concrete_height, self._base_url,
-                self._url_fetcher, self._context)
-        except BaseException as exception:
-            LOGGER.error('Failed to render SVG image %s', self._base_url)
-            LOGGER.debug('Error while rendering SVG image:', exc_info=exception)
+        # Draw the image once for each size, in a group shared by the document.
+        key = (self, concrete_width, concrete_height)
+        if (group_id := stream.use_group(key)) is None:
+            group = stream.add_group(
+                0, 0, concrete_width, concrete_height, transparency=False)
+            try:
+                self._svg.draw(
+                    group, concrete_width, concrete_height, self._base_url,
+                    self._url_fetcher, self._context)
+            except BaseException as exception:
+                LOGGER.error('Failed to render SVG image %s', self._base_url)
+                LOGGER.debug('Error while rendering SVG image:', exc_info=exception)
+            stream.store_group(key, group)
+            group_id = group.id
+        stream.draw_x_object(group_id)
 
 
 def get_image_from_uri(cache, url_fetcher, options, url, forced_mime_type=None,
                        context=None, orientation='from-image'):
     """Get an Image instance from an image URI."""
     if url in cache:
+        count('image_cache_hits')
         return cache[url]
+    count('image_cache_misses')
 
     try:
         with fetch(url_fetcher, url) as result:
-            parsed_url = urlparse(result.get('redirected_url'))
-            if parsed_url.scheme == 'file':
-                filename = url2pathname(parsed_url.path)
-            else:
-                filename = None
-            if 'string' in result:
-                string = result['string']
-            else:
-                string = result['file_obj'].read()
+            string, filename = read_fetch_result(url_fetcher, result)
             mime_type = forced_mime_type or result['mime_type']
+            count('image_bytes', len(string))
 
         image = None
         svg_exceptions = []
@@ -322,7 +381,7 @@ def get_image_from_uri(cache, url_fetcher, options, url, forced_mime_type=None,
         # Try pillow for raster images, or for failing SVG
         if image is None:
             try:
-                pillow_image = Image.open(BytesIO(string))
+                pillow_image = load_pillow_image(string)
             except Exception as raster_exception:
                 if mime_type == 'image/svg+xml':
                     # Tried SVGImage then Pillow for a SVG, abort
@@ -356,18 +415,19 @@ def rotate_pillow_image(pillow_image, orientation):
     If orientation is not changed, return the same image.
 
     """
+    pillow = load_pillow()
     image_format = pillow_image.format
     if orientation == 'from-image':
         if 'exif' in pillow_image.info:
-            pillow_image = ImageOps.exif_transpose(pillow_image)
+            pillow_image = pillow.ImageOps.exif_transpose(pillow_image)
     elif orientation != 'none':
         angle, flip = orientation
         if angle > 0:
-            rotation = getattr(Image.Transpose, f'ROTATE_{angle}')
+            rotation = getattr(pillow.Image.Transpose, f'ROTATE_{angle}')
             pillow_image = pillow_image.transpose(rotation)
         if flip:
             pillow_image = pillow_image.transpose(
-                Image.Transpose.FLIP_LEFT_RIGHT)
+                pillow.Image.Transpose.FLIP_LEFT_RIGHT)
 
     # Keep image format as it is discarded by transposition
     pillow_image.format = image_format
@@ -16,6 +16,7 @@ from math import inf
 
 from ..formatting_structure import boxes, build
 from ..logger import PROGRESS_LOGGER
+from ..stats import count
 from .absolute import absolute_box_layout, absolute_layout
 from .background import layout_backgrounds
 from .block import block_level_layout
@@ -122,6 +123,7 @@ def layout_document(html, root_box, context, max_loops=8):
         if loop > 0:
             PROGRESS_LOGGER.info(
                 'Step 5 - Creating layout - Repagination #%d', loop)
+            count('repaginations')
             context.footnotes = original_footnotes.copy()
 
         initial_total_pages = actual_total_pages
@@ -3,6 +3,7 @@
 from math import inf
 
 from ..formatting_structure import boxes
+from ..stats import profiled
 from .absolute import AbsolutePlaceholder, absolute_layout
 from .column import columns_layout
 from .flex import flex_layout
@@ -15,6 +16,7 @@ from .replaced import block_replaced_box_layout
 from .table import table_layout, table_wrapper_width
 
 
+@profiled('box')
 def block_level_layout(context, box, bottom_space, skip_stack,
                        containing_block, page_is_empty=True,
                        absolute_boxes=None, fixed_boxes=None,
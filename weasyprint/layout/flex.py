@@ -5,6 +5,7 @@ from math import inf, log10
 
 from ..css.properties import Dimension
 from ..formatting_structure import boxes
+from ..stats import profiled
 from . import percent
 from .absolute import AbsolutePlaceholder, absolute_layout
 from .preferred import max_content_width, min_content_width, min_max
@@ -15,6 +16,7 @@ class FlexLine(list):
     """Flex container line."""
 
 
+@profiled('box')
 def flex_layout(context, box, bottom_space, skip_stack, containing_block, page_is_empty,
                 absolute_boxes, fixed_boxes, discard):
     from . import block
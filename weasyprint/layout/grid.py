@@ -6,6 +6,7 @@ from math import inf
 from ..css.properties import Dimension
 from ..formatting_structure import boxes
 from ..logger import LOGGER
+from ..stats import profiled
 from .percent import percentage, resolve_percentages
 from .preferred import max_content_width, min_content_width
 from .table import find_in_flow_baseline
@@ -575,6 +576,7 @@ def _resolve_tracks_sizes(sizing_functions, box_size, children_positions,
     return tracks_sizes
 
 
+@profiled('box')
 def grid_layout(context, box, bottom_space, skip_stack, containing_block,
                 page_is_empty, absolute_boxes, fixed_boxes):
     context.create_block_formatting_context()
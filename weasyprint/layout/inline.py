@@ -6,6 +6,7 @@ from math import inf
 from ..css import computed_from_cascaded
 from ..css.computed_values import character_ratio, strut_layout
 from ..formatting_structure import boxes, build
+from ..stats import profiled
 from ..text.line_break import can_break_text, create_layout, split_first_line
 from .absolute import AbsolutePlaceholder, absolute_layout
 from .flex import flex_layout
@@ -654,6 +655,7 @@ def _break_waiting_children(context, box, max_x, bottom_space,
         return {children[-1][0] + 1: None}
 
 
+@profiled('box')
 def split_inline_box(context, box, position_x, max_x, bottom_space, skip_stack,
                      containing_block, absolute_boxes, fixed_boxes,
                      line_placeholders, waiting_floats, line_children):
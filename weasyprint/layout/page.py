@@ -7,6 +7,7 @@ from math import inf
 from ..css import computed_from_cascaded
 from ..formatting_structure import boxes, build
 from ..logger import PROGRESS_LOGGER
+from ..stats import frame, step
 from .absolute import absolute_box_layout, absolute_layout
 from .block import block_container_layout, block_level_layout
 from .float import float_layout
@@ -389,7 +390,7 @@ def make_margin_boxes(context, page, state):
         # TODO: get actual counter values at the time of the last page break
         if box.is_generated:
             # @margins mustn't manipulate page-context counters
-            margin_state = copy.deepcopy(state)
+            margin_state = build.copy_state(state)
             quote_depth, counter_values, counter_scopes = margin_state
             # TODO: check this, probably useless
             counter_scopes.append(set())
@@ -727,8 +728,8 @@ def make_page(context, root_box, page_type, resume_at, page_number,
             if counter_lookup.pending:
                 if (page_counter_values !=
                         counter_lookup.cached_page_counter_values):
-                    counter_lookup.cached_page_counter_values = copy.deepcopy(
-                        page_counter_values)
+                    counter_lookup.cached_page_counter_values = (
+                        page_counter_values.copy())
                 counter_lookup.pending = False
                 call_parse_again = True
 
@@ -741,8 +742,8 @@ def make_page(context, root_box, page_type, resume_at, page_number,
                     remake_state['pages_wanted'] = True
                 if refresh_missing_counters and page_counter_values != \
                         counter_lookup.cached_page_counter_values:
-                    counter_lookup.cached_page_counter_values = \
-                        copy.deepcopy(page_counter_values)
+                    counter_lookup.cached_page_counter_values = (
+                        page_counter_values.copy())
                     for counter_name in missing_counters:
                         counter_value = page_counter_values.get(
                             counter_name, None)
@@ -878,7 +879,7 @@ def remake_page(index, page_groups, context, root_box, html):
 
     # PageType for current page, values for page_maker[index + 1].
     # Don't modify actual page_maker[index] values!
-    page_state = copy.deepcopy(page_state)
+    page_state = build.copy_state(page_state)
     if next_page['break'] in ('left', 'right'):
         next_page_side = next_page['break']
     elif next_page['break'] in ('recto', 'verso'):
@@ -963,7 +964,9 @@ def make_all_pages(context, root_box, html, pages):
             remake_state['pages_wanted'] = False
             remake_state['anchors'] = []
             remake_state['content_lookups'] = []
-            page, resume_at = remake_page(i, page_groups, context, root_box, html)
+            with step('layout_page'), frame('page', i + 1):
+                page, resume_at = remake_page(
+                    i, page_groups, context, root_box, html)
             reported_footnotes = context.reported_footnotes
             yield page
         else:
@@ -93,7 +93,7 @@ def resolve_percentages(box, containing_block):
         prop = f'border_{side}_width'
         # border-{side}-width would have been resolved
         # during border conflict resolution for collapsed-borders
-        if not (collapse and hasattr(box, prop)):
+        if not collapse or getattr(box, prop) is None:
             setattr(box, prop, box.style[prop])
 
     # Shrink *content* widths and heights according to box-sizing
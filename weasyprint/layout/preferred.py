@@ -154,7 +154,7 @@ def margin_width(box, width, left=True, right=True):
 
     collapse = box.style['border_collapse'] == 'collapse'
     if left:
-        if collapse and hasattr(box, 'border_left_width'):
+        if collapse and box.border_left_width is not None:
             # In collapsed-borders mode: the computed horizontal padding of the
             # cell and, for border values, the used border-width values of the
             # cell (half the winning border-width)
@@ -164,7 +164,7 @@ def margin_width(box, width, left=True, right=True):
             # border of the table-cell
             width += box.style['border_left_width']
     if right:
-        if collapse and hasattr(box, 'border_right_width'):
+        if collapse and box.border_right_width is not None:
             # [...] the used border-width values of the cell
             width += box.border_right_width
         else:
@@ -6,10 +6,12 @@ import tinycss2.color4
 
 from ..formatting_structure import boxes
 from ..logger import LOGGER
+from ..stats import profiled
 from .percent import resolve_one_percentage, resolve_percentages
 from .preferred import table_and_columns_preferred_widths
 
 
+@profiled('table')
 def table_layout(context, table, bottom_space, skip_stack, containing_block,
                  page_is_empty, absolute_boxes, fixed_boxes):
     """Layout for a table box."""
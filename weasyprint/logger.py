@@ -15,6 +15,7 @@ Logging levels are used for specific purposes:
 
 import contextlib
 import logging
+from contextvars import ContextVar
 
 LOGGER = logging.getLogger('weasyprint')
 if not LOGGER.handlers:  # pragma: no cover
@@ -23,6 +24,18 @@ if not LOGGER.handlers:  # pragma: no cover
 
 PROGRESS_LOGGER = logging.getLogger('weasyprint.progress')
 
+_COLLECTED_RECORDS = ContextVar('collected_records', default=None)
+
+
+def _collect_record(record):
+    """Add ``record`` to the records collected in the current context."""
+    if (records := _COLLECTED_RECORDS.get()) is not None:
+        records.append(record)
+    return True
+
+
+LOGGER.addFilter(_collect_record)
+
 
 class CallbackHandler(logging.Handler):
     """A logging handler that calls a function for every message."""
@@ -56,3 +69,22 @@ def capture_logs(logger='weasyprint', level=None):
     finally:
         logger.handlers = previous_handlers
         logger.setLevel(previous_level)
+
+
+@contextlib.contextmanager
+def collect_logs():
+    """Return a context manager that collects the records logged in this context.
+
+    Unlike :func:`capture_logs`, records are still given to the handlers, and
+    records logged in other threads are not collected. Records collected by
+    nested contexts are also collected by the outer contexts.
+
+    """
+    records = []
+    token = _COLLECTED_RECORDS.set(records)
+    try:
+        yield records
+    finally:
+        _COLLECTED_RECORDS.reset(token)
+        if (parent_records := _COLLECTED_RECORDS.get()) is not None:
+            parent_records.extend(records)
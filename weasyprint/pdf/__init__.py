@@ -9,9 +9,10 @@ from .. import VERSION, Attachment
 from ..html import W3C_DATE_RE
 from ..logger import LOGGER, PROGRESS_LOGGER
 from ..matrix import Matrix
+from ..stats import step
 from . import debug, pdfa, pdfua
 from .fonts import build_fonts_dictionary
-from .stream import Stream
+from .stream import Stream, merge_registries
 
 from .anchors import (  # isort:skip
     add_annotations, add_forms, add_links, add_outlines, resolve_links,
@@ -79,6 +80,11 @@ def _use_references(pdf, resources, images):
             x_object = image.get_x_object(image_data['interpolate'], dpi_ratio)
             image_data['x_object'] = x_object
 
+        if x_object.number is not None:
+            # Group already added to PDF by other resources
+            resources['XObject'][key] = x_object.reference
+            continue
+
         pdf.add_object(x_object)
         resources['XObject'][key] = x_object.reference
 
@@ -100,9 +106,15 @@ def _use_references(pdf, resources, images):
             pattern.extra['Resources'] = _reference_resources(
                 pdf, pattern.extra['Resources'], images, resources['Font'])
 
-    # Shadings
+    # Shadings, possibly shared with other resources
     for key, shading in resources.get('Shading', {}).items():
-        pdf.add_object(shading)
+        if shading.number is None:
+            function = shading['Function']
+            if isinstance(function, pydyf.Object):
+                if function.number is None:
+                    pdf.add_object(function)
+                shading['Function'] = function.reference
+            pdf.add_object(shading)
         resources['Shading'][key] = shading.reference
 
     # Alpha states
@@ -111,6 +123,53 @@ def _use_references(pdf, resources, images):
             alpha['SMask']['G'] = alpha['SMask']['G'].reference
 
 
+def _color_space():
+    return pydyf.Dictionary({
+        'lab-d50': pydyf.Array(('/Lab', pydyf.Dictionary({
+            'WhitePoint': pydyf.Array(D50),
+            'Range': pydyf.Array((-125, 125, -125, 125)),
+        }))),
+        'lab-d65': pydyf.Array(('/Lab', pydyf.Dictionary({
+            'WhitePoint': pydyf.Array(D65),
+            'Range': pydyf.Array((-125, 125, -125, 125)),
+        }))),
+    })
+
+
+def paint_page_form(page, fonts=None):
+    """Paint ``page`` into a standalone Form XObject, in CSS pixels.
+
+    Return the form with the fonts and images it uses, so that the painted page
+    can be drawn again or included in a PDF generated by another process.
+    ``fonts`` is an optional dictionary of fonts shared with other pages.
+
+    """
+    fonts = {} if fonts is None else fonts
+    images = {}
+    left, top = -page.bleed['left'], -page.bleed['top']
+    width = page.width + page.bleed['left'] + page.bleed['right']
+    height = page.height + page.bleed['top'] + page.bleed['bottom']
+    resources = pydyf.Dictionary({
+        'ExtGState': pydyf.Dictionary(),
+        'XObject': pydyf.Dictionary(),
+        'Pattern': pydyf.Dictionary(),
+        'Shading': pydyf.Dictionary(),
+        'ColorSpace': _color_space(),
+        'Font': None,  # Will be set by _use_references
+    })
+    extra = pydyf.Dictionary({
+        'Type': '/XObject',
+        'Subtype': '/Form',
+        'BBox': pydyf.Array((left, top, left + width, top + height)),
+        'Resources': resources,
+    })
+    form = Stream(
+        fonts, (left, top, width, height), resources, images, False,
+        extra=extra, compress=True)
+    page.paint(form)
+    return form, fonts, images
+
+
 def generate_pdf(document, target, zoom, **options):
     # 0.75 = 72 PDF point per inch / 96 CSS pixel per inch
     scale = zoom * 0.75
@@ -129,17 +188,8 @@ def generate_pdf(document, target, zoom, **options):
             srgb = properties['srgb']
 
     pdf = pydyf.PDF()
-    images = {}
-    color_space = pydyf.Dictionary({
-        'lab-d50': pydyf.Array(('/Lab', pydyf.Dictionary({
-            'WhitePoint': pydyf.Array(D50),
-            'Range': pydyf.Array((-125, 125, -125, 125)),
-        }))),
-        'lab-d65': pydyf.Array(('/Lab', pydyf.Dictionary({
-            'WhitePoint': pydyf.Array(D65),
-            'Range': pydyf.Array((-125, 125, -125, 125)),
-        }))),
-    })
+    images, shadings, groups = {}, {}, {}
+    color_space = _color_space()
     pdf.add_object(color_space)
     resources = pydyf.Dictionary({
         'ExtGState': pydyf.Dictionary(),
@@ -155,7 +205,7 @@ def generate_pdf(document, target, zoom, **options):
     page_links_and_anchors = list(resolve_links(document.pages))
 
     annot_files = {}
-    pdf_pages, page_streams = [], []
+    pdf_pages, page_streams, pages_resources = [], [], []
     compress = not options['uncompressed_pdf']
     for page_number, (page, links_and_anchors) in enumerate(
             zip(document.pages, page_links_and_anchors)):
@@ -174,8 +224,24 @@ def generate_pdf(document, target, zoom, **options):
         page_rectangle = (
             left / scale, top / scale,
             (right - left) / scale, (bottom - top) / scale)
+
+        # Each page records the resources, fonts and images it needs, they are
+        # merged into the document registries once the page is painted.
+        # Shadings and groups are immutable once drawn, they are shared.
+        page_resources = pydyf.Dictionary({
+            'ExtGState': pydyf.Dictionary(),
+            'XObject': pydyf.Dictionary(),
+            'Pattern': pydyf.Dictionary(),
+            'Shading': pydyf.Dictionary(),
+            'ColorSpace': color_space.reference,
+        })
+        pdf.add_object(page_resources)
+        pages_resources.append(page_resources)
+        page_fonts = {key: font.copy() for key, font in document.fonts.items()}
+        page_images = {}
         stream = Stream(
-            document.fonts, page_rectangle, resources, images, mark, compress=compress)
+            page_fonts, page_rectangle, page_resources, page_images, mark,
+            shadings=shadings, groups=groups, compress=compress)
         stream.transform(d=-1, f=(page.height * scale))
         pdf.add_object(stream)
         page_streams.append(stream)
@@ -185,7 +251,7 @@ def generate_pdf(document, target, zoom, **options):
             'Parent': pdf.pages.reference,
             'MediaBox': pydyf.Array([left, top, right, bottom]),
             'Contents': stream.reference,
-            'Resources': resources.reference,
+            'Resources': page_resources.reference,
         })
         if mark:
             pdf_page['Tabs'] = '/S'
@@ -200,7 +266,11 @@ def generate_pdf(document, target, zoom, **options):
         add_forms(
             page.forms, matrix, pdf, pdf_page, resources, stream,
             document.font_config.font_map)
-        page.paint(stream, scale)
+        with step('paint'):
+            page.paint(stream, scale)
+        # Only keep the serialized page, not its operators.
+        stream.freeze()
+        merge_registries(document.fonts, images, page_fonts, page_images)
 
         # Bleed
         bleed = {key: value * 0.75 for key, value in page.bleed.items()}
@@ -280,8 +350,9 @@ def generate_pdf(document, target, zoom, **options):
 
     # Embedded fonts
     subset = not options['full_fonts']
-    pdf_fonts = build_fonts_dictionary(
-        pdf, document.fonts, compress, subset, options)
+    with step('fonts'):
+        pdf_fonts = build_fonts_dictionary(
+            pdf, document.fonts, compress, subset, options)
     pdf.add_object(pdf_fonts)
     if 'AcroForm' in pdf.catalog:
         # Include Dingbats for forms
@@ -293,7 +364,11 @@ def generate_pdf(document, target, zoom, **options):
         pdf.add_object(dingbats)
         pdf_fonts['ZaDb'] = dingbats.reference
     resources['Font'] = pdf_fonts.reference
-    _use_references(pdf, resources, images)
+    with step('images'):
+        _use_references(pdf, resources, images)
+        for page_resources in pages_resources:
+            page_resources['Font'] = pdf_fonts.reference
+            _use_references(pdf, page_resources, images)
 
     # Anchors
     if pdf_names:
@@ -24,26 +24,29 @@ def add_links(links_and_anchors, matrix, pdf, page, names, mark):
         x1, y1 = matrix.transform_point(*rectangle[:2])
         x2, y2 = matrix.transform_point(*rectangle[2:])
         if link_type in ('internal', 'external'):
-            box.link_annotation = pydyf.Dictionary({
+            link_annotation = pydyf.Dictionary({
                 'Type': '/Annot',
                 'Subtype': '/Link',
                 'Rect': pydyf.Array([x1, y1, x2, y2]),
                 'BS': pydyf.Dictionary({'W': 0}),
             })
             if mark:
-                box.link_annotation['Contents'] = pydyf.String(link_target)
+                link_annotation['Contents'] = pydyf.String(link_target)
             if link_type == 'internal':
-                box.link_annotation['Dest'] = pydyf.String(link_target)
+                link_annotation['Dest'] = pydyf.String(link_target)
             else:
-                box.link_annotation['A'] = pydyf.Dictionary({
+                link_annotation['A'] = pydyf.Dictionary({
                     'Type': '/Action',
                     'S': '/URI',
                     'URI': pydyf.String(link_target),
                 })
-            pdf.add_object(box.link_annotation)
+            pdf.add_object(link_annotation)
             if 'Annots' not in page:
                 page['Annots'] = pydyf.Array()
-            page['Annots'].append(box.link_annotation.reference)
+            page['Annots'].append(link_annotation.reference)
+            if box is not None:
+                # Box is None for serialized pages.
+                box.link_annotation = link_annotation
 
     for anchor in anchors:
         anchor_name, x, y = anchor
@@ -127,7 +130,7 @@ def add_forms(forms, matrix, pdf, page, resources, stream, font_map):
         input_name = element.attrib.get('name', default_name)
         # TODO: where does this 0.75 scale come from?
         font_size = style['font_size'] * 0.75
-        field_stream = stream.clone()
+        field_stream = stream.clone(resources=resources)
         field_stream.set_color(style['color'])
         field = pydyf.Dictionary({
             'Type': '/Annot',
@@ -159,7 +162,7 @@ def add_forms(forms, matrix, pdf, page, resources, stream, font_map):
             # Create stream when input is checked.
             width = rectangle[2] - rectangle[0]
             height = rectangle[1] - rectangle[3]
-            checked_stream = stream.clone(extra={
+            checked_stream = stream.clone(resources=resources, extra={
                 'Resources': resources.reference,
                 'Type': '/XObject',
                 'Subtype': '/Form',
@@ -7,21 +7,31 @@ from logging import WARNING
 from math import ceil
 
 import pydyf
-from fontTools import subset
-from fontTools.ttLib import TTFont, TTLibError, ttFont
-from fontTools.varLib.mutator import instantiateVariableFont
 
 from ..logger import LOGGER, capture_logs
 from ..text.constants import PANGO_STRETCH_PERCENT
-from ..text.ffi import FROM_UNITS, ffi, harfbuzz, harfbuzz_subset, pango
-from ..text.fonts import get_hb_object_data, get_pango_font_hb_face
+from ..text.ffi import FROM_UNITS, ffi, harfbuzz, load_harfbuzz_subset, pango
+from ..text.fonts import get_hb_object_data, get_pango_font_hb_face, load_fonttools
+from ..urls import BufferReader
+
+
+class FontContent(pydyf.Object):
+    """Raw font file content, possibly shared with Harfbuzz."""
+    def __init__(self, content):
+        super().__init__()
+        self._content = content
+
+    @property
+    def data(self):
+        return self._content
 
 
 class Font:
     def __init__(self, pango_font, description, font_size):
         self.hb_font = pango.pango_font_get_hb_font(pango_font)
         self.hb_face = get_pango_font_hb_face(pango_font)
-        self.file_content = get_hb_object_data(self.hb_face)
+        # Share the font file memory with Harfbuzz, it’s copied only if modified.
+        self.file_content = get_hb_object_data(self.hb_face, copy=False)
         self.index = harfbuzz.hb_face_get_index(self.hb_face)
 
         self.font_size = font_size
@@ -110,6 +120,32 @@ class Font:
         if b'Serif' in name.split(b' '):
             self.flags += 2 ** (2 - 1)  # Serif
 
+    def copy(self):
+        """Get a copy of the font, with no used glyphs."""
+        font = Font.__new__(Font)
+        font.__dict__.update(self.__dict__)
+        font.widths, font.cmap, font.used_in_forms = {}, {}, False
+        return font
+
+    def __getstate__(self):
+        # Harfbuzz objects can’t be serialized, keep the font file instead.
+        state = self.__dict__.copy()
+        state['file_content'] = bytes(self.file_content)
+        del state['hb_font'], state['hb_face']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # The Harfbuzz font is only needed to draw emojis, the face is needed
+        # to subset the font.
+        self.hb_font = None
+        hb_blob = harfbuzz.hb_blob_create(
+            self.file_content, len(self.file_content),
+            harfbuzz.HB_MEMORY_MODE_DUPLICATE, ffi.NULL, ffi.NULL)
+        self.hb_face = ffi.gc(
+            harfbuzz.hb_face_create(hb_blob, self.index), harfbuzz.hb_face_destroy)
+        harfbuzz.hb_blob_destroy(hb_blob)
+
     def clean(self, cmap, hinting):
         """Remove useless data from font."""
 
@@ -118,8 +154,9 @@ class Font:
 
         # Transform variable into static font.
         if 'fvar' in self.tables:
-            full_font = io.BytesIO(self.file_content)
-            ttfont = TTFont(full_font, fontNumber=self.index)
+            fonttools = load_fonttools()
+            full_font = BufferReader(self.file_content)
+            ttfont = fonttools.ttLib.TTFont(full_font, fontNumber=self.index)
             if 'wght' not in self.variations:
                 self.variations['wght'] = self.weight
             if 'opsz' not in self.variations:
@@ -139,7 +176,8 @@ class Font:
                 self.variations['ital'] = int(self.style == 2)
             partial_font = io.BytesIO()
             try:
-                ttfont = instantiateVariableFont(ttfont, self.variations)
+                ttfont = fonttools.varLib.mutator.instantiateVariableFont(
+                    ttfont, self.variations)
                 for key, (advance, bearing) in ttfont['hmtx'].metrics.items():
                     if advance < 0:
                         ttfont['hmtx'].metrics[key] = (0, bearing)
@@ -151,27 +189,29 @@ class Font:
 
         # Remove images.
         if self.png or self.svg:
-            full_font = io.BytesIO(self.file_content)
-            ttfont = TTFont(full_font, fontNumber=self.index)
+            fonttools = load_fonttools()
+            full_font = BufferReader(self.file_content)
+            ttfont = fonttools.ttLib.TTFont(full_font, fontNumber=self.index)
+            glyf_module = fonttools.ttLib.getTableModule('glyf')
             try:
                 # Add empty glyphs instead of PNG or SVG emojis.
                 if 'loca' not in self.tables or 'glyf' not in self.tables:
-                    ttfont['loca'] = ttFont.getTableClass('loca')()
-                    ttfont['glyf'] = ttFont.getTableClass('glyf')()
+                    ttfont['loca'] = fonttools.ttLib.getTableClass('loca')()
+                    ttfont['glyf'] = fonttools.ttLib.getTableClass('glyf')()
                     ttfont['glyf'].glyphOrder = ttfont.getGlyphOrder()
                     ttfont['glyf'].glyphs = {
-                        name: ttFont.getTableModule('glyf').Glyph()
+                        name: glyf_module.Glyph()
                         for name in ttfont['glyf'].glyphOrder}
                 else:
                     for glyph in ttfont['glyf'].glyphs:
-                        ttfont['glyf'][glyph] = ttFont.getTableModule('glyf').Glyph()
+                        ttfont['glyf'][glyph] = glyf_module.Glyph()
                 for table_name in ('CBDT', 'CBLC', 'SVG '):
                     if table_name in ttfont:
                         del ttfont[table_name]
                 output_font = io.BytesIO()
                 ttfont.save(output_font)
                 self.file_content = output_font.getvalue()
-            except TTLibError:
+            except fonttools.ttLib.TTLibError:
                 LOGGER.warning('Unable to save emoji font')
 
     @property
@@ -183,7 +223,7 @@ class Font:
         if not cmap:
             return
 
-        if harfbuzz_subset and harfbuzz.hb_version_atleast(4, 1, 0):
+        if load_harfbuzz_subset() and harfbuzz.hb_version_atleast(4, 1, 0):
             # 4.1.0 is required for hb_set_add_sorted_array.
             self._harfbuzz_subset(cmap, hinting)
         else:
@@ -191,6 +231,7 @@ class Font:
 
     def _harfbuzz_subset(self, cmap, hinting):
         """Subset font using Harfbuzz."""
+        harfbuzz_subset = load_harfbuzz_subset()
         hb_subset = ffi.gc(
             harfbuzz_subset.hb_subset_input_create_or_fail(),
             harfbuzz_subset.hb_subset_input_destroy)
@@ -251,26 +292,27 @@ class Font:
 
     def _fonttools_subset(self, cmap, hinting):
         """Subset font using Fonttools."""
-        full_font = io.BytesIO(self.file_content)
+        fonttools = load_fonttools()
+        full_font = BufferReader(self.file_content)
 
         # Set subset options.
-        options = subset.Options(
+        options = fonttools.subset.Options(
             retain_gids=True, passthrough_tables=True, ignore_missing_glyphs=True,
             hinting=hinting, desubroutinize=True)
         options.drop_tables += ['GSUB', 'GPOS', 'SVG']
-        subsetter = subset.Subsetter(options)
+        subsetter = fonttools.subset.Subsetter(options)
         subsetter.populate(gids=cmap)
 
         # Subset font.
         try:
-            ttfont = TTFont(full_font, fontNumber=self.index)
+            ttfont = fonttools.ttLib.TTFont(full_font, fontNumber=self.index)
             with capture_logs('fontTools', level=WARNING) as logs:
                 subsetter.subset(ttfont)
             for log in logs:
                 LOGGER.warning(
                     'fontTools warning when subsetting "%s": %s',
                     self.family.decode(), log)
-        except TTLibError:
+        except fonttools.ttLib.TTLibError:
             LOGGER.warning('Unable to subset font with fontTools')
         else:
             optimized_font = io.BytesIO()
@@ -303,7 +345,8 @@ def build_fonts_dictionary(pdf, fonts, compress, subset, options):
             font_extra = pydyf.Dictionary({'Subtype': '/OpenType'})
         else:
             font_extra = pydyf.Dictionary({'Length1': len(font.file_content)})
-        font_stream = pydyf.Stream([font.file_content], font_extra, compress=compress)
+        font_stream = pydyf.Stream(
+            [FontContent(font.file_content)], font_extra, compress=compress)
         pdf.add_object(font_stream)
         font_references_by_file_hash[file_hash] = font_stream.reference
 
@@ -314,8 +357,8 @@ def build_fonts_dictionary(pdf, fonts, compress, subset, options):
             cmap = font.cmap
         else:
             # Store width and Unicode map for all glyphs
-            full_font = io.BytesIO(font.file_content)
-            ttfont = TTFont(full_font, fontNumber=font.index)
+            full_font = BufferReader(font.file_content)
+            ttfont = load_fonttools().ttLib.TTFont(full_font, fontNumber=font.index)
             font_widths, cmap = {}, {}
             for i, glyph in enumerate(ttfont.getGlyphSet().values()):
                 font_widths[i] = glyph.width * 1000 / font.upem
@@ -396,8 +439,8 @@ def _build_bitmap_font_dictionary(font_dictionary, pdf, font, widths, compress,
         'Differences': pydyf.Array(differences),
     })
     char_procs = pydyf.Dictionary({})
-    full_font = io.BytesIO(font.file_content)
-    ttfont = TTFont(full_font, fontNumber=font.index)
+    full_font = BufferReader(font.file_content)
+    ttfont = load_fonttools().ttLib.TTFont(full_font, fontNumber=font.index)
     font_glyphs = ttfont['EBDT'].strikeData[0]
     widths = [0] * (last - first + 1)
     glyphs_info = {}
@@ -1,5 +1,7 @@
 """PDF stream."""
 
+from hashlib import md5
+
 import pydyf
 
 from ..logger import LOGGER
@@ -11,25 +13,46 @@ from .fonts import Font
 
 class Stream(pydyf.Stream):
     """PDF stream object with extra features."""
-    def __init__(self, fonts, page_rectangle, resources, images, mark, *args, **kwargs):
+    def __init__(self, fonts, page_rectangle, resources, images, mark, *args,
+                 shadings=None, groups=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.page_rectangle = page_rectangle
         self.marked = []
         self._fonts = fonts
         self._resources = resources
         self._images = images
+        self._shadings = {} if shadings is None else shadings
+        self._groups = {} if groups is None else groups
         self._mark = mark
         self._current_color = self._current_color_stroke = None
         self._current_alpha = self._current_alpha_stroke = None
         self._current_font = self._current_font_size = None
         self._old_font = self._old_font_size = None
+        self._text_matrix = None
         self._ctm_stack = [Matrix()]
+        self._parent_ctm = Matrix()
+        self._data = None
+        self._digest = None
 
         # These objects are used in text.show_first_line
         self.length = ffi.new('unsigned int *')
         self.ink_rect = ffi.new('PangoRectangle *')
         self.logical_rect = ffi.new('PangoRectangle *')
 
+    def __getstate__(self):
+        # Pango objects and groups keyed by images are only needed to draw.
+        state = self.__dict__.copy()
+        for key in ('length', 'ink_rect', 'logical_rect'):
+            del state[key]
+        state['_groups'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.length = ffi.new('unsigned int *')
+        self.ink_rect = ffi.new('PangoRectangle *')
+        self.logical_rect = ffi.new('PangoRectangle *')
+
     def clone(self, **kwargs):
         if 'fonts' not in kwargs:
             kwargs['fonts'] = self._fonts
@@ -39,16 +62,51 @@ class Stream(pydyf.Stream):
             kwargs['resources'] = self._resources
         if 'images' not in kwargs:
             kwargs['images'] = self._images
+        if 'shadings' not in kwargs:
+            kwargs['shadings'] = self._shadings
+        if 'groups' not in kwargs:
+            kwargs['groups'] = self._groups
         if 'mark' not in kwargs:
             kwargs['mark'] = self._mark
         if 'compress' not in kwargs:
             kwargs['compress'] = self.compress
         return Stream(**kwargs)
 
+    @property
+    def tagged(self):
+        """Whether marked content is included for tagged PDF."""
+        return self._mark
+
+    @property
+    def data(self):
+        if self._data is None:
+            return super().data
+        return self._data
+
+    def freeze(self):
+        """Serialize and compress the stream once for all.
+
+        The stream must not be modified after being frozen. Its operators are
+        released, only the serialized data is kept.
+
+        """
+        self._data = super().data
+        self.stream = []
+
     @property
     def ctm(self):
         return self._ctm_stack[-1]
 
+    @property
+    def page_ctm(self):
+        """Transformation matrix from the current space to the page space.
+
+        Unlike :attr:`ctm`, it includes the transformations applied to the
+        streams drawing this group or pattern.
+
+        """
+        return self.ctm @ self._parent_ctm
+
     def push_state(self):
         super().push_state()
         self._ctm_stack.append(self.ctm)
@@ -73,8 +131,25 @@ class Stream(pydyf.Stream):
             self._current_font = self._old_font
             self.stream.pop()
         else:
+            self._text_matrix = None
             super().begin_text()
 
+    def set_text_matrix(self, a, b, c, d, e, f):
+        # Text and line matrices are kept in the same text object, move the
+        # line matrix instead of setting a new one when only the origin moves.
+        if self._text_matrix and (a, b, c, d) == self._text_matrix[:4]:
+            if b == c == 0 and a and d:
+                old_e, old_f = self._text_matrix[4:]
+                self._text_matrix = (a, b, c, d, e, f)
+                super().move_text_to((e - old_e) / a, (f - old_f) / d)
+                return
+        self._text_matrix = (a, b, c, d, e, f)
+        super().set_text_matrix(a, b, c, d, e, f)
+
+    def move_text_to(self, x, y):
+        self._text_matrix = None
+        super().move_text_to(x, y)
+
     def end_text(self):
         self._old_font, self._current_font = self._current_font, None
         super().end_text()
@@ -166,7 +241,7 @@ class Stream(pydyf.Stream):
             self._fonts[key] = Font(pango_font, description, font_size)
         return self._fonts[key], font_size
 
-    def add_group(self, x, y, width, height):
+    def add_group(self, x, y, width, height, transparency=True):
         resources = pydyf.Dictionary({
             'ExtGState': pydyf.Dictionary(),
             'XObject': pydyf.Dictionary(),
@@ -180,18 +255,92 @@ class Stream(pydyf.Stream):
             'Subtype': '/Form',
             'BBox': pydyf.Array((x, y, x + width, y + height)),
             'Resources': resources,
-            'Group': pydyf.Dictionary({
+        })
+        if transparency:
+            extra['Group'] = pydyf.Dictionary({
                 'Type': '/Group',
                 'S': '/Transparency',
                 'I': 'true',
                 'CS': '/DeviceRGB',
-            }),
-        })
+            })
         group = self.clone(resources=resources, extra=extra)
         group.id = f'x{len(self._resources["XObject"])}'
+        group._parent_ctm = self.page_ctm
         self._resources['XObject'][group.id] = group
         return group
 
+    def digest(self):
+        """Get a digest of the uncompressed content and metadata of the stream.
+
+        The digest is computed once, the stream must not be modified after.
+
+        """
+        if self._digest is None:
+            digest = md5(usedforsecurity=False)
+            for item in self.stream:
+                digest.update(_digest_bytes(item))
+                digest.update(b'\n')
+            digest.update(_digest_bytes(self.extra))
+            self._digest = digest.digest()
+        return self._digest
+
+    def reuse_group(self, group):
+        """Replace ``group`` by an identical group already drawn, if possible.
+
+        ``group`` must be the last group added to this stream. Return the id of
+        the group to draw.
+
+        """
+        key = group.digest()
+        previous = self._groups.setdefault(key, group)
+        x_objects = self._resources['XObject']
+        if previous is not group and next(reversed(x_objects)) == group.id:
+            del x_objects[group.id]
+            return self.use_group(key)
+        return group.id
+
+    def discard_group(self, group):
+        """Remove ``group``, the last group added to this stream, not drawn."""
+        x_objects = self._resources['XObject']
+        if x_objects and next(reversed(x_objects)) == group.id:
+            del x_objects[group.id]
+
+    def store_group(self, key, group):
+        """Store ``group`` with ``key``, so that other streams can use it."""
+        self._groups[key] = group
+
+    def use_group(self, key):
+        """Get the name of the group stored with ``key`` for this stream.
+
+        Return ``None`` if no group has been stored with ``key``.
+
+        """
+        group = self._groups.get(key)
+        if group is None:
+            return None
+        x_objects = self._resources['XObject']
+        if x_objects.get(group.id) is group:
+            return group.id
+        for name, x_object in x_objects.items():
+            if x_object is group:
+                return name
+        # Group drawn in another stream, add it to the resources of this one.
+        name = f'x{len(x_objects)}'
+        x_objects[name] = group
+        return name
+
+    def add_form(self, form, fonts, images):
+        """Add Form XObject drawn by another stream, return its name.
+
+        ``fonts`` and ``images`` are the registries used to draw ``form``, they
+        are merged into the registries of this stream.
+
+        """
+        merge_registries(self._fonts, self._images, fonts, images)
+        name = f'x{len(self._resources["XObject"])}'
+        self._resources['XObject'][name] = form
+        return name
+
     def add_image(self, image, interpolate, ratio):
         image_name = f'i{image.id}{int(interpolate)}'
         self._resources['XObject'][image_name] = None  # Set by write_pdf
@@ -230,21 +379,32 @@ class Stream(pydyf.Stream):
         })
         pattern = self.clone(resources=resources, extra=extra)
         pattern.id = f'p{len(self._resources["Pattern"])}'
+        pattern._parent_ctm = matrix @ self._parent_ctm
         self._resources['Pattern'][pattern.id] = pattern
         return pattern
 
     def add_shading(self, shading_type, color_space, domain, coords, extend,
                     function):
-        shading = pydyf.Dictionary({
-            'ShadingType': shading_type,
-            'ColorSpace': f'/Device{color_space}',
-            'Domain': pydyf.Array(domain),
-            'Coords': pydyf.Array(coords),
-            'Function': function,
-        })
-        if extend:
-            shading['Extend'] = pydyf.Array((b'true', b'true'))
-        shading.id = f's{len(self._resources["Shading"])}'
+        # Identical functions and shadings are shared by all the streams of the
+        # document, they are keyed by their serialized values.
+        function = self._shadings.setdefault(function.data, function)
+        domain, coords = pydyf.Array(domain), pydyf.Array(coords)
+        key = (
+            shading_type, color_space, domain.data, coords.data, extend,
+            function.data)
+        if key not in self._shadings:
+            shading = pydyf.Dictionary({
+                'ShadingType': shading_type,
+                'ColorSpace': f'/Device{color_space}',
+                'Domain': domain,
+                'Coords': coords,
+                'Function': function,
+            })
+            if extend:
+                shading['Extend'] = pydyf.Array((b'true', b'true'))
+            shading.id = f's{len(self._shadings)}'
+            self._shadings[key] = shading
+        shading = self._shadings[key]
         self._resources['Shading'][shading.id] = shading
         return shading
 
@@ -276,6 +436,11 @@ class Stream(pydyf.Stream):
 
     @staticmethod
     def create_stitching_function(domain, encode, bounds, sub_functions):
+        sub_functions = tuple(sub_functions)
+        if len(sub_functions) == 1 and list(domain) == list(encode) == [0, 1]:
+            if list(sub_functions[0]['Domain']) == [0, 1]:
+                # Stitching a single function on the default domain is useless.
+                return sub_functions[0]
         return pydyf.Dictionary({
             'FunctionType': 3,
             'Domain': pydyf.Array(domain),
@@ -311,3 +476,44 @@ class Stream(pydyf.Stream):
             return element_tag[:2].upper() + element_tag[2:]
         else:
             return 'NonStruct'
+
+
+def merge_registries(fonts, images, other_fonts, other_images):
+    """Merge the fonts and images used by other streams into registries.
+
+    Used glyphs of fonts and resolutions of images are merged into the entries
+    already registered.
+
+    """
+    for key, font in other_fonts.items():
+        own_font = fonts.setdefault(key, font)
+        if own_font is not font:
+            own_font.widths.update(font.widths)
+            own_font.cmap = {**font.cmap, **own_font.cmap}
+            own_font.used_in_forms |= font.used_in_forms
+    for key, image in other_images.items():
+        own_image = images.setdefault(key, image)
+        if own_image is not image:
+            own_image['dpi_ratios'] |= image['dpi_ratios']
+
+
+def _digest_bytes(item):
+    """Get bytes identifying ``item`` in the digest of a stream.
+
+    Included streams are identified by their own digests instead of being
+    serialized and compressed.
+
+    """
+    if isinstance(item, Stream):
+        return item.digest()
+    elif isinstance(item, dict):
+        return b'<<' + b''.join(
+            b'/' + _digest_bytes(key) + b' ' + _digest_bytes(value)
+            for key, value in item.items()) + b'>>'
+    elif isinstance(item, (list, tuple)):
+        return b'[' + b' '.join(_digest_bytes(child) for child in item) + b']'
+    elif isinstance(item, bytes):
+        return item
+    elif isinstance(item, pydyf.Object):
+        return item.data
+    return str(item).encode()
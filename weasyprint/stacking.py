@@ -12,9 +12,12 @@ class StackingContext:
 
     """
     def __init__(self, box, child_contexts, blocks, floats, blocks_and_cells,
-                 page):
+                 page, dispatched_boxes):
         self.box = box
         self.page = page
+        # Children removed from the "normal" box tree, mapped to the stacking
+        # contexts replacing them in this tree (or None if they're skipped).
+        self.dispatched_boxes = dispatched_boxes
         self.block_level_boxes = blocks  # 4: In flow, non positioned
         self.float_contexts = floats  # 5: Non positioned
         self.negative_z_contexts = []  # 3: Child contexts, z-index < 0
@@ -42,13 +45,17 @@ class StackingContext:
     def from_page(cls, page):
         # Page children (the box for the root element and margin boxes)
         # as well as the page box itself are unconditionally stacking contexts.
-        child_contexts = [cls.from_box(child, page) for child in page.children]
+        dispatched_boxes = {}
+        child_contexts = [
+            cls.from_box(child, page, dispatched_boxes=dispatched_boxes)
+            for child in page.children]
         # Children are sub-contexts, remove them from the "normal" tree.
-        page = page.copy_with_children([])
-        return cls(page, child_contexts, [], [], [], page)
+        for child in page.children:
+            dispatched_boxes[id(child)] = None
+        return cls(page, child_contexts, [], [], [], page, dispatched_boxes)
 
     @classmethod
-    def from_box(cls, box, page, child_contexts=None):
+    def from_box(cls, box, page, child_contexts=None, dispatched_boxes=None):
         children = []  # What will be passed to this box
         if child_contexts is None:
             child_contexts = children
@@ -61,12 +68,33 @@ class StackingContext:
         blocks = []
         floats = []
         blocks_and_cells = []
-        box = _dispatch_children(
-            box, page, child_contexts, blocks, floats, blocks_and_cells)
-        return cls(box, children, blocks, floats, blocks_and_cells, page)
-
-
-def _dispatch(box, page, child_contexts, blocks, floats, blocks_and_cells):
+        if dispatched_boxes is None:
+            dispatched_boxes = {}
+        _dispatch_children(
+            box, page, child_contexts, blocks, floats, blocks_and_cells,
+            dispatched_boxes)
+        return cls(
+            box, children, blocks, floats, blocks_and_cells, page,
+            dispatched_boxes)
+
+    def box_children(self, box):
+        """Get the children of ``box`` drawn in the "normal" box tree.
+
+        Children defining their own stacking contexts are skipped, children
+        creating inline-level stacking contexts are replaced by these contexts.
+
+        """
+        dispatched_boxes = self.dispatched_boxes
+        children = []
+        for child in box.children:
+            child = dispatched_boxes.get(id(child), child)
+            if child is not None:
+                children.append(child)
+        return children
+
+
+def _dispatch(box, page, child_contexts, blocks, floats, blocks_and_cells,
+              dispatched_boxes):
     if isinstance(box, AbsolutePlaceholder):
         box = box._box
     style = box.style
@@ -79,7 +107,8 @@ def _dispatch(box, page, child_contexts, blocks, floats, blocks_and_cells):
         style['transform'] or  # 'transform: none' gives a "falsy" empty list
         style['overflow'] != 'visible')
     if defines_stacking_context:
-        child_contexts.append(StackingContext.from_box(box, page))
+        child_contexts.append(StackingContext.from_box(
+            box, page, dispatched_boxes=dispatched_boxes))
         return
 
     stacking_classes = (boxes.InlineBlockBox, boxes.InlineFlexBox, boxes.InlineGridBox)
@@ -88,14 +117,17 @@ def _dispatch(box, page, child_contexts, blocks, floats, blocks_and_cells):
         # "Fake" context: sub-contexts will go in this `child_contexts` list.
         # Insert at the position before creating the sub-context.
         index = len(child_contexts)
-        stacking_context = StackingContext.from_box(box, page, child_contexts)
+        stacking_context = StackingContext.from_box(
+            box, page, child_contexts, dispatched_boxes)
         child_contexts.insert(index, stacking_context)
     elif box.is_floated():
-        floats.append(StackingContext.from_box(box, page, child_contexts))
+        floats.append(StackingContext.from_box(
+            box, page, child_contexts, dispatched_boxes))
     elif isinstance(box, stacking_classes):
         # Have this fake stacking context be part of the "normal" box tree,
         # because we need its position in the middle of a tree of inline boxes.
-        return StackingContext.from_box(box, page, child_contexts)
+        return StackingContext.from_box(
+            box, page, child_contexts, dispatched_boxes)
     else:
         if isinstance(box, boxes.BlockLevelBox):
             blocks_index = len(blocks)
@@ -107,8 +139,9 @@ def _dispatch(box, page, child_contexts, blocks, floats, blocks_and_cells):
             blocks_index = None
             blocks_and_cells_index = None
 
-        box = _dispatch_children(
-            box, page, child_contexts, blocks, floats, blocks_and_cells)
+        _dispatch_children(
+            box, page, child_contexts, blocks, floats, blocks_and_cells,
+            dispatched_boxes)
 
         # Insert at the positions before dispatch the children.
         if blocks_index is not None:
@@ -120,14 +153,15 @@ def _dispatch(box, page, child_contexts, blocks, floats, blocks_and_cells):
 
 
 def _dispatch_children(box, page, child_contexts, blocks, floats,
-                       blocks_and_cells):
+                       blocks_and_cells, dispatched_boxes):
     if not isinstance(box, boxes.ParentBox):
-        return box
+        return
 
-    new_children = []
+    # Children are not copied, children removed from the "normal" tree are
+    # stored in dispatched_boxes instead.
     for child in box.children:
         result = _dispatch(
-            child, page, child_contexts, blocks, floats, blocks_and_cells)
-        if result is not None:
-            new_children.append(result)
-    return box.copy_with_children(new_children)
+            child, page, child_contexts, blocks, floats, blocks_and_cells,
+            dispatched_boxes)
+        if result is not child:
+            dispatched_boxes[id(child)] = result
@@ -0,0 +1,264 @@
+"""Rendering statistics and layout profiling.
+
+Timings and counters are collected in the :class:`Statistics` object given to
+:meth:`Statistics.collect`. The :func:`step` and :func:`count` functions can be
+called anywhere in the rendering code, they do nothing when no statistics are
+collected.
+
+Layout costs are attributed to elements and pages by the :class:`Profiler`
+given to :meth:`Profiler.collect`. Layout functions decorated by
+:func:`profiled` and :func:`frame` contexts are measured only when a profiler
+is active.
+
+"""
+
+import contextlib
+import functools
+import inspect
+import sys
+import time
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not available on Windows.
+    resource = None
+
+_STATISTICS = ContextVar('statistics', default=None)
+_PROFILER = ContextVar('profiler', default=None)
+
+
+class Statistics:
+    """Timings and counters collected while rendering a document.
+
+    New steps and counters may be added in future versions of WeasyPrint.
+
+    """
+    def __init__(self):
+        #: A :obj:`dict` whose keys are the names of the rendering steps, and
+        #: values are :obj:`dicts <dict>` with ``'wall'`` and ``'cpu'`` times
+        #: in seconds and the number of ``'calls'`` of the step. Steps can
+        #: include other steps, for example ``'layout'`` includes
+        #: ``'layout_page'``.
+        self.steps = {}
+        #: A :obj:`dict` whose keys are the names of counted objects and events
+        #: (boxes, Pango layouts, fetches, cache hits…), and values are
+        #: integers.
+        self.counters = {}
+        #: The maximum resident set size of the process in kilobytes, or
+        #: :obj:`None` if it can’t be measured on this platform.
+        self.peak_memory = None
+
+    @contextlib.contextmanager
+    def collect(self):
+        """Collect the statistics of the code run in this context."""
+        token = _STATISTICS.set(self)
+        try:
+            yield self
+        finally:
+            _STATISTICS.reset(token)
+            if resource is not None:
+                peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                if sys.platform == 'darwin':
+                    # Given in bytes instead of kilobytes.
+                    peak_memory //= 1024
+                self.peak_memory = max(self.peak_memory or 0, peak_memory)
+
+    def update(self, statistics):
+        """Add the timings and counters of another :class:`Statistics`."""
+        for name, values in statistics.steps.items():
+            step_values = self.steps.setdefault(
+                name, {'wall': 0, 'cpu': 0, 'calls': 0})
+            for key, value in values.items():
+                step_values[key] += value
+        for name, value in statistics.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        if statistics.peak_memory is not None:
+            self.peak_memory = max(
+                self.peak_memory or 0, statistics.peak_memory)
+
+    def to_dict(self):
+        """Get statistics as a :obj:`dict` that can be serialized in JSON."""
+        return {
+            'steps': {name: values.copy() for name, values in self.steps.items()},
+            'counters': self.counters.copy(),
+            'peak_memory': self.peak_memory,
+        }
+
+
+@contextlib.contextmanager
+def step(name):
+    """Measure the time spent in this context as rendering step ``name``."""
+    statistics = _STATISTICS.get()
+    if statistics is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        values = statistics.steps.setdefault(
+            name, {'wall': 0, 'cpu': 0, 'calls': 0})
+        values['wall'] += time.perf_counter() - wall
+        values['cpu'] += time.process_time() - cpu
+        values['calls'] += 1
+
+
+def collecting():
+    """Whether statistics are collected in the current context."""
+    return _STATISTICS.get() is not None
+
+
+def count(name, value=1):
+    """Add ``value`` to the counter called ``name``."""
+    statistics = _STATISTICS.get()
+    if statistics is not None:
+        statistics.counters[name] = statistics.counters.get(name, 0) + value
+
+
+class Profiler:
+    """Layout costs attributed to elements and pages.
+
+    Elements are identified by their tag, followed by their id and classes.
+    Their source line is not included, as it is not kept by the HTML parser.
+
+    """
+    def __init__(self):
+        #: A :obj:`dict` whose keys are element labels, and values are
+        #: :obj:`dicts <dict>` with the ``'time'`` spent laying out the element
+        #: in seconds, excluding the time spent in its children, and the number
+        #: of layout ``'calls'``.
+        self.elements = {}
+        #: A :obj:`dict` whose keys are page numbers, and values are
+        #: :obj:`dicts <dict>` with the ``'time'`` spent laying out the page in
+        #: seconds, and the number of ``'calls'``, more than one if the page has
+        #: been laid out again for repagination.
+        self.pages = {}
+        self._stacks = {}
+        self._events = []
+        self._frames = []
+        self._start = None
+
+    @contextlib.contextmanager
+    def collect(self):
+        """Profile the layout run in this context."""
+        if self._start is None:
+            self._start = time.perf_counter()
+        token = _PROFILER.set(self)
+        try:
+            yield self
+        finally:
+            _PROFILER.reset(token)
+
+    @contextlib.contextmanager
+    def _frame(self, name, label=None, page=None):
+        if label is None and self._frames:
+            # Inherit the element of the calling frame.
+            label = self._frames[-1][1]
+        frame = [name, label, 0]
+        self._frames.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self._frames.pop()
+            self_time = duration - frame[2]
+            if self._frames:
+                self._frames[-1][2] += duration
+            if page is not None:
+                values = self.pages.setdefault(page, {'time': 0, 'calls': 0})
+                values['time'] += duration
+                values['calls'] += 1
+            elif label is not None:
+                values = self.elements.setdefault(label, {'time': 0, 'calls': 0})
+                values['time'] += self_time
+                values['calls'] += 1
+            stack = ';'.join(
+                (frame_name if frame_label is None
+                 else f'{frame_name} {frame_label}').replace(';', ',')
+                for frame_name, frame_label, _ in (*self._frames, frame))
+            self._stacks[stack] = self._stacks.get(stack, 0) + self_time
+            event = {
+                'name': name, 'cat': 'layout', 'ph': 'X', 'pid': 1, 'tid': 1,
+                'ts': (start - self._start) * 1e6, 'dur': duration * 1e6}
+            if label is not None:
+                event['args'] = {'element': label}
+            self._events.append(event)
+
+    def collapsed_stacks(self):
+        """Get layout stacks in the "collapsed" format used by flame graphs.
+
+        Each line is a stack of semicolon-separated frames, followed by the
+        time spent in the last frame in microseconds.
+
+        """
+        return ''.join(
+            f'{stack} {round(value * 1e6)}\n'
+            for stack, value in self._stacks.items())
+
+    def chrome_trace(self):
+        """Get layout calls as a :obj:`dict` in the Chrome trace event format.
+
+        The result can be serialized in JSON and opened in trace viewers.
+
+        """
+        return {'traceEvents': list(self._events), 'displayTimeUnit': 'ms'}
+
+
+def _element_label(box):
+    label = box.element_tag
+    if box.element is not None:
+        if element_id := box.element.get('id'):
+            label += f'#{element_id}'
+        if classes := box.element.get('class'):
+            label += ''.join(f'.{name}' for name in classes.split())
+    return label
+
+
+def frame(name, page=None):
+    """Measure the layout run in this context as frame ``name``.
+
+    If ``page`` is given, the time is attributed to this page number.
+
+    """
+    profiler = _PROFILER.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    if page is not None:
+        return profiler._frame(f'{name} {page}', page=page)
+    return profiler._frame(name)
+
+
+def profiled(box=None):
+    """Decorate a layout function to measure its calls.
+
+    The time spent in the function is attributed to the element of the box
+    given as the argument called ``box``, or to the element of the calling
+    function if ``box`` is :obj:`None`.
+
+    """
+    def decorator(function):
+        name = function.__name__
+        index = None
+        if box is not None:
+            # Find the position of the box argument once, not at each call.
+            index = tuple(inspect.signature(function).parameters).index(box)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _PROFILER.get()
+            if profiler is None:
+                return function(*args, **kwargs)
+            if index is None:
+                label = None
+            else:
+                argument = args[index] if index < len(args) else kwargs[box]
+                label = _element_label(argument)
+            with profiler._frame(name, label):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
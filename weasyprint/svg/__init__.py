@@ -339,6 +339,7 @@ class SVG:
         self.symbols = {}
 
         self.use_cache = {}
+        self.path_cache = {}
 
         self.cursor_position = [0, 0]
         self.cursor_d_position = [0, 0]
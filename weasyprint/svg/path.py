@@ -3,7 +3,7 @@
 from math import atan2, cos, isclose, pi, radians, sin, tan
 
 from ..matrix import Matrix
-from .utils import normalize, point
+from .utils import PointError, normalize, point
 
 PATH_LETTERS = 'achlmqstvzACHLMQSTVZ'
 
@@ -17,13 +17,44 @@ def path(svg, node, font_size):
     """Draw path node."""
     string = node.get('d', '')
 
+    # Paths are parsed once for each size context of the document.
+    key = (string, font_size, svg.inner_width, svg.inner_height)
+    if key not in svg.path_cache:
+        svg.path_cache[key] = _parse_path(svg, string, font_size)
+    operations, vertices, valid = svg.path_cache[key]
+
+    for name, *arguments in operations:
+        getattr(svg.stream, name)(*arguments)
+    node.vertices.extend(vertices)
+    if not valid:
+        raise PointError
+
+
+def _parse_path(svg, string, font_size):
+    """Get the drawing operations and the vertices of a path.
+
+    Return the list of operations, the list of vertices and whether the whole
+    path is valid.
+
+    """
+    operations, vertices = [], []
+    try:
+        _parse_path_operations(svg, string, font_size, operations, vertices)
+    except PointError:
+        # Keep the operations drawn before the error.
+        return operations, vertices, False
+    return operations, vertices, True
+
+
+def _parse_path_operations(svg, string, font_size, operations, vertices):
+    """Append the drawing operations and the vertices of a path."""
     for letter in PATH_LETTERS:
         string = string.replace(letter, f' {letter} ')
     string = normalize(string)
 
     # TODO: get current point
     current_point = 0, 0
-    svg.stream.move_to(*current_point)
+    operations.append(('move_to', *current_point))
     last_letter = None
 
     while string:
@@ -31,7 +62,7 @@ def path(svg, node, font_size):
         if string.split(' ', 1)[0] in PATH_LETTERS:
             letter, string = (f'{string} ').split(' ', 1)
             if last_letter in (None, 'z', 'Z') and letter not in 'mM':
-                node.vertices.append(current_point)
+                vertices.append(current_point)
                 first_path_point = current_point
         elif letter == 'M':
             letter = 'L'
@@ -117,7 +148,7 @@ def path(svg, node, font_size):
                 angle2 += 2 * pi
 
             # Store the tangent angles
-            node.vertices.append((-angle1, -angle2))
+            vertices.append((-angle1, -angle2))
 
             # Fix angles to follow large arc flag
             if isclose(abs(angle2 - angle1), pi):
@@ -157,7 +188,7 @@ def path(svg, node, font_size):
                 point3 = matrix.transform_point(
                     xc + rx * cos(angle2),
                     yc + rx * sin(angle2))
-                svg.stream.curve_to(*point1, *point2, *point3)
+                operations.append(('curve_to', *point1, *point2, *point3))
 
             current_point = x3, y3
 
@@ -174,9 +205,9 @@ def path(svg, node, font_size):
                 y1 += y
                 y2 += y
                 y3 += y
-            node.vertices.append((
+            vertices.append((
                 atan2(y1 - y2, x1 - x2), atan2(y3 - y2, x3 - x2)))
-            svg.stream.curve_to(x1, y1, x2, y2, x3, y3)
+            operations.append(('curve_to', x1, y1, x2, y2, x3, y3))
             current_point = x3, y3
 
         elif letter in 'hH':
@@ -187,8 +218,8 @@ def path(svg, node, font_size):
             if letter == 'h':
                 x += old_x
             angle = 0 if x > old_x else pi
-            node.vertices.append((pi - angle, angle))
-            svg.stream.line_to(x, old_y)
+            vertices.append((pi - angle, angle))
+            operations.append(('line_to', x, old_y))
             current_point = x, old_y
 
         elif letter in 'lL':
@@ -199,19 +230,19 @@ def path(svg, node, font_size):
                 x += old_x
                 y += old_y
             angle = atan2(y - old_y, x - old_x)
-            node.vertices.append((pi - angle, angle))
-            svg.stream.line_to(x, y)
+            vertices.append((pi - angle, angle))
+            operations.append(('line_to', x, y))
             current_point = x, y
 
         elif letter in 'mM':
             # Current point move
             x, y, string = point(svg, string, font_size)
             if last_letter and last_letter not in 'zZ':
-                node.vertices.append(None)
+                vertices.append(None)
             if letter == 'm':
                 x += current_point[0]
                 y += current_point[1]
-            svg.stream.move_to(x, y)
+            operations.append(('move_to', x, y))
             current_point = x, y
 
         elif letter in 'qQtT':
@@ -235,8 +266,8 @@ def path(svg, node, font_size):
             yq1 = y2 * 2 / 3 + y1 / 3
             xq2 = x2 * 2 / 3 + x3 / 3
             yq2 = y2 * 2 / 3 + y3 / 3
-            svg.stream.curve_to(xq1, yq1, xq2, yq2, x3, y3)
-            node.vertices.append((0, 0))
+            operations.append(('curve_to', xq1, yq1, xq2, yq2, x3, y3))
+            vertices.append((0, 0))
             current_point = x3, y3
 
         elif letter in 'sS':
@@ -251,9 +282,9 @@ def path(svg, node, font_size):
                 x3 += x
                 y2 += y
                 y3 += y
-            node.vertices.append((
+            vertices.append((
                 atan2(y1 - y2, x1 - x2), atan2(y3 - y2, x3 - x2)))
-            svg.stream.curve_to(x1, y1, x2, y2, x3, y3)
+            operations.append(('curve_to', x1, y1, x2, y2, x3, y3))
             current_point = x3, y3
 
         elif letter in 'vV':
@@ -264,18 +295,18 @@ def path(svg, node, font_size):
             if letter == 'v':
                 y += old_y
             angle = pi / 2 if y > old_y else -pi / 2
-            node.vertices.append((pi - angle, angle))
-            svg.stream.line_to(old_x, y)
+            vertices.append((pi - angle, angle))
+            operations.append(('line_to', old_x, y))
             current_point = old_x, y
 
         elif letter in 'zZ' and first_path_point:
             # End of path
-            node.vertices.append(None)
-            svg.stream.close()
+            vertices.append(None)
+            operations.append(('close',))
             current_point = first_path_point
 
         if letter not in 'zZ':
-            node.vertices.append(current_point)
+            vertices.append(current_point)
 
         string = string.strip()
         last_letter = letter
@@ -3,11 +3,13 @@
 import os
 import sys
 from contextlib import suppress
+from functools import cache
+from hashlib import md5
+from importlib import import_module
 
 import cffi
 
-ffi = cffi.FFI()
-ffi.cdef('''
+CDEF = '''
     // HarfBuzz
 
     typedef ... hb_font_t;
@@ -16,8 +18,16 @@ ffi.cdef('''
     typedef int hb_bool_t;
     typedef uint32_t hb_tag_t;
     typedef uint32_t hb_codepoint_t;
+    typedef enum {
+        HB_MEMORY_MODE_DUPLICATE,
+        HB_MEMORY_MODE_READONLY,
+        HB_MEMORY_MODE_WRITABLE,
+        HB_MEMORY_MODE_READONLY_MAY_MAKE_WRITABLE
+    } hb_memory_mode_t;
+    typedef void (*hb_destroy_func_t) (void *user_data);
     hb_tag_t hb_tag_from_string (const char *str, int len);
     void hb_tag_to_string (hb_tag_t tag, char *buf);
+    hb_face_t * hb_face_create (hb_blob_t *blob, unsigned int index);
     void hb_face_destroy (hb_face_t *face);
     hb_blob_t * hb_face_reference_blob (hb_face_t *face);
     unsigned int hb_face_get_index (const hb_face_t *face);
@@ -29,6 +39,9 @@ ffi.cdef('''
     hb_blob_t * hb_ot_color_glyph_reference_png (hb_font_t *font, hb_codepoint_t glyph);
     bool hb_ot_color_has_svg (hb_face_t *face);
     hb_blob_t * hb_ot_color_glyph_reference_svg (hb_face_t *face, hb_codepoint_t glyph);
+    hb_blob_t * hb_blob_create (
+        const char *data, unsigned int length, hb_memory_mode_t mode,
+        void *user_data, hb_destroy_func_t destroy);
     void hb_blob_destroy (hb_blob_t *blob);
     unsigned int hb_face_get_table_tags (
         const hb_face_t *face, unsigned int start_offset, unsigned int *table_count,
@@ -407,12 +420,16 @@ ffi.cdef('''
     } FcSetName;
 
     FcConfig * FcInitLoadConfigAndFonts (void);
+    FcConfig * FcConfigCreate (void);
     void FcConfigDestroy (FcConfig *config);
+    FcBool FcConfigParseAndLoad (
+        FcConfig *config, const FcChar8 *file, FcBool complain);
     FcBool FcConfigAppFontAddFile (FcConfig *config, const FcChar8 *file);
     FcBool FcConfigParseAndLoadFromMemory (
         FcConfig *config, const FcChar8 *buffer, FcBool complain);
 
     FcFontSet * FcConfigGetFonts (FcConfig *config, FcSetName set);
+    FcBool FcFontSetAdd (FcFontSet *s, FcPattern *font);
     FcStrList * FcConfigGetConfigFiles (FcConfig *config);
     FcChar8 * FcStrListNext (FcStrList *list);
 
@@ -421,6 +438,7 @@ ffi.cdef('''
 
     FcPattern * FcPatternCreate (void);
     FcPattern * FcPatternDestroy (FcPattern *p);
+    void FcPatternReference (FcPattern *p);
     FcBool FcPatternAddString (FcPattern *p, const char *object, const FcChar8 *s);
     FcResult FcPatternGetString (FcPattern *p, const char *object, int n, FcChar8 **s);
     FcPattern * FcFontMatch (FcConfig *config, FcPattern *p, FcResult *result);
@@ -436,7 +454,18 @@ ffi.cdef('''
     void pango_fc_font_map_config_changed (PangoFcFontMap *fcfontmap);
     hb_face_t* pango_fc_font_map_get_hb_face (
          PangoFcFontMap* fcfontmap, PangoFcFont* fcfont);
-''')
+'''
+
+# Name of the module generated by "python -m weasyprint.text.ffi_build", depending
+# on the C definitions to ignore outdated modules.
+MODULE_NAME = f'_ffi_{md5(CDEF.encode(), usedforsecurity=False).hexdigest()[:16]}'
+
+try:
+    # Use the out-of-line module if available, to avoid parsing C definitions.
+    ffi = import_module(f'.{MODULE_NAME}', __package__).ffi
+except ImportError:
+    ffi = cffi.FFI()
+    ffi.cdef(CDEF)
 
 
 def _dlopen(ffi, *names, allow_fail=False):
@@ -481,10 +510,6 @@ pango = _dlopen(
 harfbuzz = _dlopen(
     ffi, 'libharfbuzz-0', 'harfbuzz', 'harfbuzz-0.0',
     'libharfbuzz.so.0', 'libharfbuzz.0.dylib', 'libharfbuzz-0.dll')
-harfbuzz_subset = _dlopen(
-    ffi, 'libharfbuzz-subset-0', 'harfbuzz-subset', 'harfbuzz-subset-0.0',
-    'libharfbuzz-subset.so.0', 'libharfbuzz-subset.0.dylib', 'libharfbuzz-subset-0.dll',
-    allow_fail=True)
 fontconfig = _dlopen(
     ffi, 'libfontconfig-1', 'fontconfig-1', 'fontconfig',
     'libfontconfig.so.1', 'libfontconfig.1.dylib', 'libfontconfig-1.dll')
@@ -494,6 +519,27 @@ pangoft2 = _dlopen(
 
 gobject.g_type_init()
 
+
+@cache
+def load_harfbuzz_subset():
+    """Load the HarfBuzz subset library, only needed to embed fonts.
+
+    Return :obj:`None` if the library is not available.
+
+    """
+    return _dlopen(
+        ffi, 'libharfbuzz-subset-0', 'harfbuzz-subset', 'harfbuzz-subset-0.0',
+        'libharfbuzz-subset.so.0', 'libharfbuzz-subset.0.dylib',
+        'libharfbuzz-subset-0.dll', allow_fail=True)
+
+
+def __getattr__(name):
+    """Keep ``harfbuzz_subset`` available, loaded on first access."""
+    if name == 'harfbuzz_subset':
+        return load_harfbuzz_subset()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 # Call once to avoid int overflows.
 TO_UNITS = pango.pango_units_from_double(1)
 FROM_UNITS = pango.pango_units_to_double(1)
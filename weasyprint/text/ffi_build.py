@@ -0,0 +1,25 @@
+"""Generate the out-of-line module of the C definitions used for text layout.
+
+Run ``python -m weasyprint.text.ffi_build`` after installing WeasyPrint. The
+generated module includes the parsed C definitions, making the import of
+WeasyPrint faster. It is ignored when the C definitions change.
+
+"""
+
+from pathlib import Path
+
+import cffi
+
+from .ffi import CDEF, MODULE_NAME
+
+
+def build():
+    """Generate the out-of-line module, return its path."""
+    ffi = cffi.FFI()
+    ffi.cdef(CDEF)
+    ffi.set_source(f'{__package__}.{MODULE_NAME}', None)
+    return ffi.compile(tmpdir=Path(__file__).parents[2], verbose=False)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    print(build())
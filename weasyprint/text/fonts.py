@@ -1,5 +1,7 @@
 """Interface with external libraries managing fonts installed on the system."""
 
+import threading
+from functools import cache
 from hashlib import md5
 from io import BytesIO
 from pathlib import Path
@@ -8,10 +10,8 @@ from tempfile import mkdtemp
 from warnings import warn
 from xml.etree.ElementTree import Element, SubElement, tostring
 
-from fontTools.ttLib import TTFont, woff2
-
 from ..logger import LOGGER
-from ..urls import FILESYSTEM_ENCODING, fetch
+from ..urls import FILESYSTEM_ENCODING, BufferReader, fetch, read_fetch_result
 
 from .constants import (  # isort:skip
     CAPS_KEYS, EAST_ASIAN_KEYS, FONTCONFIG_STRETCH, FONTCONFIG_STYLE, FONTCONFIG_WEIGHT,
@@ -21,6 +21,22 @@ from .ffi import (  # isort:skip
     unicode_to_char_p)
 
 
+@cache
+def load_fonttools():
+    """Import and return the ``fontTools`` package with the modules we need.
+
+    fontTools is imported on first use, as it’s only needed to decode web fonts
+    and to embed fonts in PDF files.
+
+    """
+    import fontTools.subset
+    import fontTools.ttLib
+    import fontTools.ttLib.woff2
+    import fontTools.varLib.mutator
+
+    return fontTools
+
+
 def _check_font_configuration(font_config):  # pragma: no cover
     """Check whether the given font_config has fonts.
 
@@ -67,8 +83,64 @@ def _check_font_configuration(font_config):  # pragma: no cover
         warn('No fonts configured in FontConfig. Expect ugly output.')
 
 
-_check_font_configuration(ffi.gc(
-    fontconfig.FcInitLoadConfigAndFonts(), fontconfig.FcConfigDestroy))
+# Base Fontconfig configurations and Pango font maps, including the system fonts,
+# shared by font configurations without @font-face fonts. Pango objects can’t be
+# shared between threads, each thread has its own base.
+_BASE = threading.local()
+
+
+def _create_font_map(config):
+    """Create a Pango font map using ``config``, and a ratio cache."""
+    font_map = ffi.gc(pangoft2.pango_ft2_font_map_new(), gobject.g_object_unref)
+    pangoft2.pango_fc_font_map_set_config(
+        ffi.cast('PangoFcFontMap *', font_map), config)
+    # pango_fc_font_map_set_config keeps a reference to config.
+    fontconfig.FcConfigDestroy(config)
+    return config, font_map, {}
+
+
+def _base_font_map():
+    """Get the base configuration, font map and ratios of the current thread."""
+    if not hasattr(_BASE, 'font_map'):
+        # Load the main config file and the fonts.
+        config = ffi.gc(
+            fontconfig.FcInitLoadConfigAndFonts(), fontconfig.FcConfigDestroy)
+        _BASE.font_map = _create_font_map(config)
+    return _BASE.font_map
+
+
+def _overlay_font_map():
+    """Create a configuration, its font map and ratios, without installed fonts.
+
+    Only the main config file is loaded, installed fonts are not scanned. They
+    are added later by :func:`_share_installed_fonts`.
+
+    """
+    config = ffi.gc(fontconfig.FcConfigCreate(), fontconfig.FcConfigDestroy)
+    # Errors in the main config file are already reported for the base.
+    fontconfig.FcConfigParseAndLoad(config, ffi.NULL, False)
+    return _create_font_map(config)
+
+
+def _share_installed_fonts(config):
+    """Add the installed fonts of the base configuration to ``config``.
+
+    The font patterns of the base configuration are referenced by the
+    application fonts of ``config``, that must already exist.
+
+    """
+    installed_fonts = fontconfig.FcConfigGetFonts(
+        _base_font_map()[0], fontconfig.FcSetSystem)
+    if installed_fonts == ffi.NULL:  # pragma: no cover
+        return
+    fonts = fontconfig.FcConfigGetFonts(config, fontconfig.FcSetApplication)
+    for i in range(installed_fonts.nfont):
+        pattern = installed_fonts.fonts[i]
+        fontconfig.FcPatternReference(pattern)
+        fontconfig.FcFontSetAdd(fonts, pattern)
+
+
+_check_font_configuration(_base_font_map()[0])
 
 
 class FontConfiguration:
@@ -78,9 +150,15 @@ class FontConfiguration:
     installed for the current user, and fonts referenced by cascading
     stylesheets.
 
-    When created, an instance of this class gathers available fonts. It can
-    then be given to :class:`weasyprint.HTML` methods or to
-    :class:`weasyprint.CSS` to find fonts in ``@font-face`` rules.
+    An instance of this class can be given to :class:`weasyprint.HTML`
+    methods or to :class:`weasyprint.CSS` to find fonts in ``@font-face``
+    rules.
+
+    Installed fonts are gathered once per thread, in a base font map shared
+    by all the configurations. A configuration gets its own font map only
+    when its first ``@font-face`` font is added. This font map references the
+    installed fonts of the base instead of scanning them again, and the base
+    font map is never modified.
 
     """
     _folder = None  # required by __del__ when code stops before __init__ finishes
@@ -92,19 +170,56 @@ class FontConfiguration:
         https://mces.blogspot.fr/2015/05/how-to-use-custom-application-fonts.html
 
         """
-        # Load the main config file and the fonts.
-        self._config = ffi.gc(
-            fontconfig.FcInitLoadConfigAndFonts(), fontconfig.FcConfigDestroy)
-        self.font_map = ffi.gc(
-            pangoft2.pango_ft2_font_map_new(), gobject.g_object_unref)
-        pangoft2.pango_fc_font_map_set_config(
-            ffi.cast('PangoFcFontMap *', self.font_map), self._config)
-        # pango_fc_font_map_set_config keeps a reference to config.
-        fontconfig.FcConfigDestroy(self._config)
+        # Configuration, font map and character ratios including @font-face
+        # fonts, None when the base configuration and font map are used.
+        self._own_font_map = None
 
         # Temporary folder storing fonts.
         self._folder = None
 
+    @property
+    def _config(self):
+        return (self._own_font_map or _base_font_map())[0]
+
+    @property
+    def font_map(self):
+        """Pango font map including installed and ``@font-face`` fonts."""
+        return (self._own_font_map or _base_font_map())[1]
+
+    @property
+    def character_ratios(self):
+        """Cache of ex and ch font size ratios, measured with the font map.
+
+        Keys are characters and font style keys, values are ratios.
+
+        """
+        return (self._own_font_map or _base_font_map())[2]
+
+    def warm_up(self, families=('serif', 'sans-serif', 'monospace')):
+        """Load the faces of the given font ``families``.
+
+        Faces loaded before the first ``@font-face`` font is added are kept in
+        the base font map, and are available for the next documents rendered
+        in the same thread.
+
+        """
+        font_map = self.font_map
+        context = ffi.gc(
+            pango.pango_font_map_create_context(font_map),
+            gobject.g_object_unref)
+        for family in families:
+            font_description = ffi.gc(
+                pango.pango_font_description_new(),
+                pango.pango_font_description_free)
+            family_p, _ = unicode_to_char_p(family)
+            pango.pango_font_description_set_family(font_description, family_p)
+            pango.pango_font_description_set_absolute_size(
+                font_description, 16 * TO_UNITS)
+            font = pango.pango_font_map_load_font(
+                font_map, context, font_description)
+            if font != ffi.NULL:
+                gobject.g_object_unref(font)
+
     def add_font_face(self, rule_descriptors, url_fetcher):
         """Add a font face to the Fontconfig configuration."""
 
@@ -158,11 +273,10 @@ class FontConfiguration:
                     LOGGER.debug('Failed to load local font %r', font_name.decode())
                     continue
 
-            # Get font content.
+            # Get font content, mapping local files instead of copying them.
             try:
                 with fetch(url_fetcher, url) as result:
-                    string = 'string' in result
-                    font = result['string'] if string else result['file_obj'].read()
+                    font, _ = read_fetch_result(url_fetcher, result)
             except Exception as exception:
                 LOGGER.debug('Failed to load font at %r (%s)', url, exception)
                 continue
@@ -171,14 +285,15 @@ class FontConfiguration:
             try:
                 # Decode woff and woff2 fonts.
                 if font[:3] == b'wOF':
+                    fonttools = load_fonttools()
                     out = BytesIO()
                     woff_version_byte = font[3:4]
                     if woff_version_byte == b'F':  # woff font
-                        ttfont = TTFont(BytesIO(font))
+                        ttfont = fonttools.ttLib.TTFont(BufferReader(font))
                         ttfont.flavor = ttfont.flavorData = None
                         ttfont.save(out)
                     elif woff_version_byte == b'2':  # woff2 font
-                        woff2.decompress(BytesIO(font), out)
+                        fonttools.ttLib.woff2.decompress(BufferReader(font), out)
                     font = out.getvalue()
             except Exception as exc:
                 LOGGER.debug('Failed to handle woff font at %r (%s)', url, exc)
@@ -230,12 +345,22 @@ class FontConfiguration:
                 b'<!DOCTYPE fontconfig SYSTEM "urn:fontconfig:fonts.dtd">')
             xml = b'\n'.join((*header, tostring(root, encoding='utf-8')))
 
-            # Register font and configuration in Fontconfig.
+            # Register font and configuration in Fontconfig, in a
+            # configuration owned by this instance to keep the base intact.
             # TODO: We should mask local fonts with the same name
             # too as explained in Behdad's blog entry.
+            overlay = self._own_font_map is None
+            if overlay:
+                self._own_font_map = _overlay_font_map()
+            # Available fonts change, measured ratios may be wrong.
+            self._own_font_map[2].clear()
             fontconfig.FcConfigParseAndLoadFromMemory(self._config, xml, True)
             font_added = fontconfig.FcConfigAppFontAddFile(
                 self._config, str(font_path).encode(FILESYSTEM_ENCODING))
+            if overlay:
+                # Application fonts are created by the first added font, even
+                # when it can’t be loaded.
+                _share_installed_fonts(self._config)
             if font_added:
                 return pangoft2.pango_fc_font_map_config_changed(
                     ffi.cast('PangoFcFontMap *', self.font_map))
@@ -349,12 +474,16 @@ def get_pango_font_hb_face(pango_font):
     return pangoft2.pango_fc_font_map_get_hb_face(fontmap, fc_font)
 
 
-def get_hb_object_data(hb_object, ot_color=None, glyph=None):
+def get_hb_object_data(hb_object, ot_color=None, glyph=None, copy=True):
     """Get binary data out of given Harfbuzz font or face.
 
     If ``ot_color`` is 'svg', return the SVG color glyph reference. If it’s 'png',
     return the PNG color glyph reference. Otherwise, return the whole face blob.
 
+    If ``copy`` is ``False``, return a buffer sharing the memory of the Harfbuzz
+    blob, usually a memory map of the font file, instead of bytes. The blob is
+    kept alive as long as the buffer is used.
+
     """
     if ot_color == 'png':
         hb_blob = harfbuzz.hb_ot_color_glyph_reference_png(hb_object, glyph)
@@ -364,7 +493,13 @@ def get_hb_object_data(hb_object, ot_color=None, glyph=None):
         hb_blob = harfbuzz.hb_face_reference_blob(hb_object)
     with ffi.new('unsigned int *') as length:
         hb_data = harfbuzz.hb_blob_get_data(hb_blob, length)
-        data = None if hb_data == ffi.NULL else ffi.unpack(hb_data, int(length[0]))
+        if hb_data == ffi.NULL:
+            data = None
+        elif copy:
+            data = ffi.unpack(hb_data, int(length[0]))
+        else:
+            hb_data = ffi.gc(hb_data, lambda _: harfbuzz.hb_blob_destroy(hb_blob))
+            return ffi.buffer(hb_data, int(length[0]))
         harfbuzz.hb_blob_destroy(hb_blob)
         return data
 
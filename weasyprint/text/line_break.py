@@ -5,9 +5,10 @@ from math import inf
 
 import pyphen
 
+from ..stats import count, profiled
 from .constants import LST_TO_ISO, PANGO_DIRECTION, PANGO_WRAP_MODE
-from .ffi import FROM_UNITS, TO_UNITS, ffi, gobject, pango, pangoft2, unicode_to_char_p
-from .fonts import font_features, get_font_description
+from .ffi import FROM_UNITS, TO_UNITS, ffi, gobject, pango, unicode_to_char_p
+from .fonts import FontConfiguration, font_features, get_font_description
 
 
 def line_size(line, style):
@@ -57,7 +58,11 @@ def first_line_metrics(first_line, text, layout, resume_at, space_collapse,
 class Layout:
     """Object holding PangoLayout-related cdata pointers."""
     def __init__(self, context, style, justification_spacing=0,
-                 max_width=None):
+                 max_width=None, font_config=None):
+        if font_config is None:
+            font_config = (
+                FontConfiguration() if context is None else context.font_config)
+        self.font_config = font_config
         self.justification_spacing = justification_spacing
         self.setup(context, style)
         self.max_width = max_width
@@ -67,13 +72,8 @@ class Layout:
         self.style = style
         self.first_line_direction = 0
 
-        if context is None:
-            font_map = ffi.gc(
-                pangoft2.pango_ft2_font_map_new(), gobject.g_object_unref)
-        else:
-            font_map = context.font_config.font_map
         pango_context = ffi.gc(
-            pango.pango_font_map_create_context(font_map),
+            pango.pango_font_map_create_context(self.font_config.font_map),
             gobject.g_object_unref)
         pango.pango_context_set_round_glyph_positions(pango_context, False)
         pango.pango_context_set_base_dir(
@@ -95,6 +95,7 @@ class Layout:
         assert not isinstance(style['font_family'], str), (
             'font_family should be a list')
         font_description = get_font_description(style)
+        count('pango_layouts')
         self.layout = ffi.gc(
             pango.pango_layout_new(pango_context),
             gobject.g_object_unref)
@@ -246,6 +247,7 @@ def create_layout(text, style, context, max_width, justification_spacing):
     return layout
 
 
+@profiled()
 def split_first_line(text, style, context, max_width, justification_spacing,
                      is_line_start=True, minimum=False):
     """Fit as much as possible in the available width for one line of text.
@@ -2,18 +2,22 @@
 
 import codecs
 import contextlib
+import io
+import mmap
 import os.path
 import re
 import sys
 import traceback
+import weakref
 import zlib
 from gzip import GzipFile
 from pathlib import Path
 from urllib.parse import quote, unquote, urljoin, urlsplit
-from urllib.request import Request, pathname2url, urlopen
+from urllib.request import Request, pathname2url, url2pathname, urlopen
 
 from . import __version__
 from .logger import LOGGER
+from .stats import collecting, count
 
 # See https://stackoverflow.com/a/11687993/1162888
 # Both are needed in Python 3 as the re module does not like to mix
@@ -36,6 +40,10 @@ HTTP_HEADERS = {
 }
 
 
+# Memory maps of local files, shared while at least one user keeps a reference.
+MAPPED_FILES = weakref.WeakValueDictionary()
+
+
 class StreamingGzipFile(GzipFile):
     def __init__(self, fileobj):
         GzipFile.__init__(self, fileobj=fileobj)
@@ -254,13 +262,18 @@ class URLFetchingError(IOError):
 @contextlib.contextmanager
 def fetch(url_fetcher, url):
     """Call an url_fetcher, fill in optional data, and clean up."""
+    count('fetches')
     try:
         result = url_fetcher(url)
     except Exception as exception:
         raise URLFetchingError(f'{type(exception).__name__}: {exception}')
     result.setdefault('redirected_url', url)
     result.setdefault('mime_type', None)
+    if 'string' in result:
+        count('fetched_bytes', len(result['string']))
     if 'file_obj' in result:
+        if collecting():
+            result['file_obj'] = CountingReader(result['file_obj'])
         try:
             yield result
         finally:
@@ -274,3 +287,121 @@ def fetch(url_fetcher, url):
                     url, traceback.format_exc())
     else:
         yield result
+
+
+def read_fetch_result(url_fetcher, result):
+    """Get the content of ``result``, given by :func:`fetch`.
+
+    Return ``(content, filename)``. Local files fetched by the default URL
+    fetcher are mapped in memory instead of being copied, ``filename`` is then
+    the path of the mapped file. Otherwise, ``filename`` is :obj:`None`.
+
+    """
+    if 'string' in result:
+        return result['string'], None
+    if url_fetcher is default_url_fetcher:
+        parsed_url = urlsplit(result['redirected_url'])
+        filename = url2pathname(parsed_url.path)
+        if parsed_url.scheme == 'file' and Path(filename).is_file():
+            content = map_local_file(filename)
+            count('fetched_bytes', len(content))
+            return content, filename
+    return result['file_obj'].read(), None
+
+
+def map_local_file(filename):
+    """Get the content of a local file as a read-only memory map.
+
+    The content of the file is never copied in memory. The same map is returned
+    for the same unmodified file while it is used somewhere else.
+
+    """
+    path = os.path.realpath(filename)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if (mapping := MAPPED_FILES.get(key)) is not None:
+        return mapping
+    if stat.st_size == 0:
+        # Empty files can’t be mapped.
+        return b''
+    # Don’t keep a file descriptor open for each map when possible.
+    kwargs = {'trackfd': False} if sys.version_info >= (3, 13) else {}
+    with open(path, 'rb') as fd:
+        mapping = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ, **kwargs)
+    MAPPED_FILES[key] = mapping
+    return mapping
+
+
+class CountingReader(io.RawIOBase):
+    """Read-only file object counting the bytes read from another file object.
+
+    Seeking and the ``name`` attribute are forwarded to the wrapped object.
+
+    """
+    def __init__(self, file_obj):
+        self._file_obj = file_obj
+
+    @property
+    def name(self):
+        return self._file_obj.name
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        seekable = getattr(self._file_obj, 'seekable', None)
+        return seekable is not None and seekable()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file_obj.seek(offset, whence)
+
+    def tell(self):
+        return self._file_obj.tell()
+
+    def read(self, size=-1):
+        data = self._file_obj.read(size)
+        count('fetched_bytes', len(data))
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._file_obj.close()
+        super().close()
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only file object reading bytes-like objects without copying them."""
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._view[self._position:self._position + len(buffer)]
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        self._view.release()
+        super().close()